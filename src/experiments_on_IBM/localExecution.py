@@ -0,0 +1,186 @@
+import os
+import json
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def simulate_shard(simulator, circuits, shots, seeds):
+    """
+    Run a shard of transpiled circuits on a simulator, every circuit with its own seed.
+    Defined at module level so it can be sent to the worker processes.
+
+    Args:
+        simulator: The AerSimulator to run on, with the noise model of the fake backend.
+        circuits (list): Transpiled circuits.
+        shots (int): Number of shots of every circuit.
+        seeds (list): Simulator seed of every circuit.
+
+    Returns:
+        list: The counts of every circuit, as dictionaries {bit string: count}.
+    """
+    return [simulator.run(circuit, shots=shots, seed_simulator=seed).result().get_counts()
+            for circuit, seed in zip(circuits, seeds)]
+
+
+class LocalExecution:
+    """
+    Offline replacement of execute(batch, backend=ch_backend, shots=shots) of Coherent_err_imbq_quito.ipynb: runs
+    the circuits of a batch on AerSimulator with the noise model of a fake backend, and keeps their counts on disk.
+
+    Every circuit is transpiled for the simulator and keyed by the SHA-256 hash of its OpenQASM text, the backend,
+    shots and seed. Identical circuits of one batch, e.g. repeated KIK experiments, are told apart by their
+    occurrence, so they stay independent samples. The simulator seed of a circuit is derived from its key, so the
+    counts do not depend on how the batch is sharded, and running a batch again only simulates the circuits that
+    are not on disk yet. Entries are JSON files written to a temporary file and renamed into place, so concurrent
+    processes never see a partially written entry.
+
+    qiskit and qiskit_aer are imported on first use, so the module can be imported without them. The default backend
+    FakeQuitoV2 comes from qiskit_ibm_runtime; without that package a GenericBackendV2 with the coupling map of
+    ibmq_quito is used, whose noise model is seeded but not the one of the device. Gates defined only
+    by a pulse calibration, as in Kik.construct_circuit with method_1='gate', have no definition the simulator can
+    run; build the KIK circuits from gates, e.g. the circuit followed by its inverse, to run them locally.
+
+    Attributes:
+        backend: The fake backend whose noise model is simulated, default_backend() by default.
+        directory (str): Directory holding the cached counts.
+        max_workers (int): Number of worker processes. With 1 the circuits run in-process.
+        shard_size (int): Maximum number of circuits simulated together in one task.
+        transpile_options (dict): Keyword arguments of transpile, e.g. initial_layout=[1, 2].
+        hits (int): Number of circuits served from disk.
+        misses (int): Number of circuits simulated.
+    """
+    DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'kik_counts')
+    QUITO_COUPLING_MAP = [[0, 1], [1, 0], [1, 2], [2, 1], [1, 3], [3, 1], [3, 4], [4, 3]]
+
+    def __init__(self, backend=None, directory=DEFAULT_DIRECTORY, max_workers=1, shard_size=32,
+                 transpile_options=None):
+        self.backend = self.default_backend() if backend is None else backend
+        self.directory = directory
+        self.max_workers = max_workers
+        self.shard_size = shard_size
+        self.transpile_options = dict(transpile_options or {})
+        self.hits = 0
+        self.misses = 0
+        self._simulator = None
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def default_backend():
+        """Return FakeQuitoV2, or a seeded GenericBackendV2 on the qubits of ibmq_quito without qiskit_ibm_runtime."""
+        try:
+            from qiskit_ibm_runtime.fake_provider import FakeQuitoV2
+        except ImportError:
+            from qiskit.providers.fake_provider import GenericBackendV2
+            return GenericBackendV2(5, coupling_map=LocalExecution.QUITO_COUPLING_MAP, seed=0)
+        return FakeQuitoV2()
+
+    @property
+    def simulator(self):
+        """The AerSimulator of the backend, built on first use."""
+        if self._simulator is None:
+            from qiskit_aer import AerSimulator
+            self._simulator = AerSimulator.from_backend(self.backend)
+        return self._simulator
+
+    def transpile(self, circuits, seed=0):
+        """Transpile the circuits for the simulator, deterministically for a given seed."""
+        from qiskit import transpile
+        options = dict({'seed_transpiler': seed}, **self.transpile_options)
+        return transpile(list(circuits), self.simulator, **options)
+
+    def keys(self, transpiled, shots, seed):
+        """
+        Return the key of every transpiled circuit.
+
+        Returns:
+            list: Tuples (backend, OpenQASM text, shots, seed, occurrence of the circuit in the batch).
+        """
+        from qiskit import qasm2
+        occurrences, keys = {}, []
+        for circuit in transpiled:
+            text = qasm2.dumps(circuit)
+            occurrences[text] = occurrences.get(text, -1) + 1
+            keys.append((self.backend.name, text, shots, seed, occurrences[text]))
+        return keys
+
+    def path_of(self, key):
+        """Return the file of the given key."""
+        return os.path.join(self.directory, hashlib.sha256(repr(key).encode()).hexdigest() + '.json')
+
+    @staticmethod
+    def seed_of(key):
+        """Return the simulator seed of a circuit, derived from its key."""
+        return int(hashlib.sha256(repr(key).encode()).hexdigest()[:8], 16)
+
+    def load(self, key):
+        """Return the counts stored under key, or None."""
+        try:
+            with open(self.path_of(key)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key, counts):
+        """Store the counts of a circuit under key."""
+        path = self.path_of(key)
+        temporary = path + '.' + str(os.getpid()) + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(counts, file)
+        os.replace(temporary, path)
+
+    def run(self, circuits, shots=20000, seed=0):
+        """
+        Run a batch of circuits, simulating only those whose counts are not on disk.
+
+        Args:
+            circuits (list): The circuits of the batch, e.g. from Batches.build_batch_kik.
+            shots (int): Number of shots of every circuit.
+            seed (int): Seed of the batch. Running again with another seed gives new samples.
+
+        Returns:
+            list: The counts of every circuit in batch order, as expected by ReadoutMitigation.
+        """
+        transpiled = self.transpile(circuits, seed)
+        keys = self.keys(transpiled, shots, seed)
+        counts = [self.load(key) for key in keys]
+        missing = [i for i, value in enumerate(counts) if value is None]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if not missing:
+            return counts
+
+        shards = [list(range(start, min(start + self.shard_size, len(missing))))
+                  for start in range(0, len(missing), self.shard_size)]
+        arguments = [([transpiled[missing[j]] for j in shard], [self.seed_of(keys[missing[j]]) for j in shard])
+                     for shard in shards]
+        if self.max_workers == 1 or len(shards) == 1:
+            results = [simulate_shard(self.simulator, shard, shots, seeds) for shard, seeds in arguments]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(shards)),
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = [executor.submit(simulate_shard, self.simulator, shard, shots, seeds)
+                           for shard, seeds in arguments]
+                results = [future.result() for future in futures]
+
+        for shard, shard_counts in zip(shards, results):
+            for j, value in zip(shard, shard_counts):
+                counts[missing[j]] = value
+                self.save(keys[missing[j]], value)
+        return counts
+
+    def clear(self):
+        """Delete all cached counts."""
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        """
+        Return the statistics of the cache.
+
+        Returns:
+            dict: Hits, misses and number of stored circuits.
+        """
+        entries = sum(name.endswith('.json') for name in os.listdir(self.directory))
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
@@ -0,0 +1,233 @@
+import numpy as np
+
+
+class RcBatchGenerator:
+    """
+    Fast generation of the randomized-compiling (RC) batches of the Batches class of Coherent_err_imbq_quito.ipynb.
+
+    Instead of building and transpiling a fresh QuantumCircuit per realization, one template is built and
+    transpiled per (scheme, cycle count, state), in which every RC gate is a U(theta, phi, lambda) gate with free
+    parameters. For every transpiled instruction depending on these parameters, its four bound versions for I, X, Y
+    and Z are made once. The Pauli frames of all realizations are then sampled at once with NumPy and stamped into a
+    copy of the template by swapping in the bound instructions, without transpiling or binding parameters again. I,
+    X, Y and Z are U gates up to a global phase, so the realizations are the circuits of the notebook; their global
+    phase is set to zero, as it is not observable. The one difference is state 3, which applies Z to both qubits,
+    whereas the if/elif of bulid_z_state_variation applies Z to the first qubit only.
+
+    The schemes follow the notebook:
+        'kik': rc_on_kik_circ, every KI and every K of a cycle dressed by its own frame, pq before and rs after.
+        'cycle': rc_on_kik_cycle_circ, every KI K cycle dressed by one frame, pq before and after.
+        'edge': rc_on_edge_circ, all cycles dressed by one frame, pq before and after.
+
+    KI and K are the forward circuit and its inverse by default. The circuits of Kik.ki(1) and Kik.k(1) can be passed
+    instead, since gates with a pulse calibration are kept as they are by transpile.
+
+    qiskit is imported on first use, so the module can be imported without it.
+
+    Attributes:
+        forward: The circuit K, e.g. a CNOT on qubits, on the register of the batch.
+        inverse: The circuit KI.
+        qubits (list): The two qubits of the CNOT, measured into the classical bits of the same index.
+        backend: The backend the templates are transpiled for, e.g. LocalExecution.simulator.
+        transpile_options (dict): Keyword arguments of transpile.
+        rng (np.random.Generator): Generator of the Pauli frames.
+        templates (dict): Transpiled templates with their stamping tables, by (scheme, cycles, state).
+    """
+    SCHEMES = ('kik', 'cycle', 'edge')
+    LEFT_RC_GATE = 0  # Index of the table of the RC gates before the gate of interest
+    RIGHT_RC_GATE = 1  # Index of the table of the RC gates after the gate of interest
+    # Paulis of the two qubits of the 16 RC gates, 0..3 for I, X, Y, Z, from add_rc_gates_cx of the notebook
+    RC_TABLES = np.array([
+        [[0, 0], [0, 1], [0, 2], [0, 3], [2, 0], [2, 1], [2, 2], [2, 3],
+         [1, 0], [1, 1], [1, 2], [1, 3], [3, 0], [3, 1], [3, 2], [3, 3]],
+        [[0, 0], [0, 1], [3, 2], [3, 3], [2, 1], [2, 0], [1, 3], [1, 2],
+         [1, 1], [1, 0], [2, 3], [2, 2], [3, 0], [3, 1], [0, 2], [0, 3]]])
+    # (theta, phi, lambda) of U equal to I, X, Y and Z up to a global phase
+    PAULI_ANGLES = np.array([[0, 0, 0], [np.pi, 0, np.pi], [np.pi, np.pi / 2, np.pi / 2], [0, 0, np.pi]])
+
+    def __init__(self, forward, qubits, backend, inverse=None, transpile_options=None, seed=None):
+        self.forward = forward
+        self.inverse = forward.inverse() if inverse is None else inverse
+        self.qubits = list(qubits)
+        self.backend = backend
+        self.transpile_options = dict(transpile_options or {})
+        self.rng = np.random.default_rng(seed)
+        self.templates = {}
+
+    def slots(self, scheme, cycles):
+        """
+        Return the layout of a template as parts in time order: 'ki' and 'k' for the circuits, and (draw, table)
+        for an RC gate using the Pauli frame of the given draw from RC_TABLES[table].
+
+        Returns:
+            tuple: The parts and the number of frames drawn per realization.
+        """
+        left, right = self.LEFT_RC_GATE, self.RIGHT_RC_GATE
+        if scheme == 'kik':
+            parts = []
+            for cycle in range(cycles):
+                parts += [(2 * cycle, left), 'ki', (2 * cycle, right)]
+                parts += [(2 * cycle + 1, left), 'k', (2 * cycle + 1, right)]
+            return parts, 2 * cycles
+        if scheme == 'cycle':
+            parts = []
+            for cycle in range(cycles):
+                parts += [(cycle, left), 'ki', 'k', (cycle, left)]
+            return parts, cycles
+        if scheme == 'edge':
+            return [(0, left)] + ['ki', 'k'] * cycles + [(0, left)], 1
+        raise ValueError("Unknown RC scheme: " + str(scheme))
+
+    def prepare_state(self, circuit, state):
+        """
+        Apply Z to qubits[i] for every set bit i of state.
+
+        This matches bulid_z_state_variation for the states 0, 1 and 2, but state 3 gets Z on both qubits, whereas the
+        notebook applies it to the first qubit only.
+        """
+        for i, qubit in enumerate(self.qubits):
+            if (state >> i) & 1:
+                circuit.z(qubit)
+
+    def template(self, scheme, cycles, state=0):
+        """
+        Return the transpiled template of a scheme, cycle count and state, built on first use.
+
+        Returns:
+            dict: The transpiled template, the draw and table of every RC gate, and for every instruction of the
+            template depending on the frames its position, its RC gate and qubit as an index into the Paulis of
+            sample_paulis, and its bound versions for I, X, Y and Z.
+        """
+        key = (scheme, cycles, state)
+        if key in self.templates:
+            return self.templates[key]
+
+        from qiskit import QuantumCircuit, transpile
+        from qiskit.circuit import ParameterVector
+        parts, _ = self.slots(scheme, cycles)
+        rc_gates = [part for part in parts if not isinstance(part, str)]
+        parameters = ParameterVector('frame', 3 * len(self.qubits) * len(rc_gates))
+
+        circuit = QuantumCircuit(*self.forward.qregs, *self.forward.cregs)
+        circuit.barrier()
+        self.prepare_state(circuit, state)
+        circuit.barrier()
+        position = 0
+        for part in parts:
+            if part == 'ki' or part == 'k':
+                circuit.compose(self.inverse if part == 'ki' else self.forward, inplace=True)
+            else:
+                for qubit in self.qubits:
+                    circuit.u(*parameters[position:position + 3], qubit)
+                    position += 3
+            circuit.barrier()
+        for qubit in self.qubits:
+            circuit.measure(qubit, qubit)
+
+        options = dict({'seed_transpiler': 0}, **self.transpile_options)
+        transpiled = transpile(circuit, self.backend, **options)
+
+        positions, owners, choices = [], [], []
+        for position, instruction in enumerate(transpiled.data):
+            expressions = [p for p in instruction.operation.params if hasattr(p, 'parameters')]
+            if not expressions:
+                continue
+            # The three parameters of one U gate, so one RC gate on one qubit, are numbered 3 * owner .. 3 * owner + 2
+            owner = {parameter.index // 3 for p in expressions for parameter in p.parameters}
+            if len(owner) != 1:
+                raise ValueError("Transpiling merged the RC gates of the template")
+            owner = owner.pop()
+            choice = []
+            for angles in self.PAULI_ANGLES:
+                values = dict(zip(parameters[3 * owner:3 * owner + 3], angles))
+                operation = instruction.operation.copy()
+                operation.params = [float(p.bind({q: values[q] for q in p.parameters})) if hasattr(p, 'parameters')
+                                    else p for p in operation.params]
+                choice.append(instruction.replace(operation=operation))
+            positions.append(position)
+            owners.append(owner)
+            choices.append(choice)
+
+        self.templates[key] = {'circuit': transpiled, 'draws': np.array([gate[0] for gate in rc_gates], dtype=int),
+                               'tables': np.array([gate[1] for gate in rc_gates], dtype=int), 'positions': positions,
+                               'owners': np.array(owners, dtype=int), 'choices': choices}
+        return self.templates[key]
+
+    def sample_paulis(self, draws, tables, n_draws, realizations):
+        """
+        Sample the Pauli frames of all realizations and return the Pauli of every RC gate on every qubit.
+
+        Returns:
+            np.array: Array of shape (realizations, RC gates * qubits) of Paulis 0..3 for I, X, Y, Z.
+        """
+        frames = self.rng.integers(0, len(self.RC_TABLES[0]), size=(realizations, n_draws))
+        paulis = self.RC_TABLES[tables[None, :], frames[:, draws]]
+        return np.reshape(paulis, (realizations, -1))
+
+    def realizations(self, scheme, cycles, realizations, state=0):
+        """
+        Return transpiled RC realizations of a scheme, as rc_on_kik_circ, rc_on_kik_cycle_circ or rc_on_edge_circ.
+
+        Args:
+            scheme (str): One of SCHEMES.
+            cycles (int): Number of KI K cycles.
+            realizations (int): Number of realizations.
+            state (int): Initial state, as in prepare_state.
+
+        Returns:
+            list: The transpiled circuits.
+        """
+        template = self.template(scheme, cycles, state)
+        paulis = self.sample_paulis(template['draws'], template['tables'], self.slots(scheme, cycles)[1],
+                                    realizations)[:, template['owners']]
+        circuits = []
+        for row in paulis:
+            data = list(template['circuit'].data)
+            for position, choice, pauli in zip(template['positions'], template['choices'], row):
+                data[position] = choice[pauli]
+            circuit = template['circuit'].copy_empty_like()
+            circuit.global_phase = 0
+            for instruction in data:
+                # The instructions come from a valid circuit on the same qubits, so the checks of append are skipped
+                circuit._append(instruction)
+            circuits.append(circuit)
+        return circuits
+
+    def calibration_circuits(self):
+        """
+        Return the transpiled circuits of creat_calibration_circ and bulid_z_state_variation, one per basis state.
+        """
+        from qiskit import QuantumCircuit, transpile
+        circuits = []
+        for is_z in (False, True):
+            for state in range(2 ** len(self.qubits)):
+                circuit = QuantumCircuit(*self.forward.qregs, *self.forward.cregs)
+                circuit.barrier()
+                for i, qubit in enumerate(self.qubits):
+                    if (state >> i) & 1 and is_z:
+                        circuit.z(qubit)
+                    elif (state >> i) & 1:
+                        circuit.x(qubit)
+                circuit.barrier()
+                for qubit in self.qubits:
+                    circuit.measure(qubit, qubit)
+                circuits.append(circuit)
+        options = dict({'seed_transpiler': 0}, **self.transpile_options)
+        return transpile(circuits, self.backend, **options)
+
+    def build_batch(self, scheme, n_cycles, realizations, states=(0,)):
+        """
+        Build a batch as build_batch_rc_on_kik, build_batch_rc_on_kik_cycle or build_batch_rc_on_edge_circ: the
+        calibration circuits, the state variation circuits, and the realizations of every cycle count from 1 to
+        n_cycles and every state.
+
+        Returns:
+            tuple: The transpiled circuits, and the size of every group of them for ReadoutMitigation.split.
+        """
+        circuits = self.calibration_circuits()
+        sizes = [2 ** len(self.qubits)] * 2
+        for cycles in range(1, n_cycles + 1):
+            for state in states:
+                circuits += self.realizations(scheme, cycles, realizations, state)
+                sizes.append(realizations)
+        return circuits, sizes
@@ -0,0 +1,180 @@
+import numpy as np
+
+
+class ReadoutMitigation:
+    """
+    Readout-error mitigation and survival probabilities for batches of measured circuits, the vectorised form of the
+    Data class of Coherent_err_imbq_quito.ipynb.
+
+    Counts are given as a list of dictionaries from bit strings to counts, one per circuit, as returned by
+    Result.get_counts() for a list of circuits. They are turned into one array of shape (circuits, 2^k) of outcome
+    probabilities on the k measured classical bits. The outcome index follows the bit strings: clbits[0] is the least
+    significant bit, so with clbits [1, 2] the states '000', '010', '100', '110' of the notebook are outcomes 0..3.
+
+    The detector matrix is either the full 2^k x 2^k matrix of the notebook, which needs the 2^k calibration
+    circuits, or the tensor product of one 2x2 matrix per qubit, which can be calibrated from the two circuits
+    preparing all zeros and all ones. The tensored inverse is applied qubit by qubit and never forms a 2^k x 2^k
+    matrix, so it scales beyond a few qubits. Either way all circuits are mitigated in one pass.
+
+    Attributes:
+        clbits (list): The measured classical bits.
+        k (int): Number of measured bits.
+        inverse (np.array): Inverse of the full detector matrix, or None.
+        qubit_inverses (list): Inverses of the 2x2 detector matrices of clbits, or None.
+    """
+
+    def __init__(self, clbits):
+        """
+        Args:
+            clbits (list): The measured classical bits, e.g. the qubits [1, 2] of the quito experiments.
+        """
+        self.clbits = list(clbits)
+        self.k = len(self.clbits)
+        self.inverse = None
+        self.qubit_inverses = None
+
+    def counts_to_probabilities(self, counts):
+        """
+        Convert the counts of a batch of circuits into outcome probabilities.
+        Every distinct bit string is decoded once, and the counts of all circuits are summed in one bincount.
+
+        Args:
+            counts (list): One dictionary {bit string: count} per circuit.
+
+        Returns:
+            np.array: Array of shape (circuits, 2^k), every row normalised by the shots of its circuit.
+        """
+        indices, rows, values = {}, [], []
+        keys, outcomes = [], []
+        for row, circuit_counts in enumerate(counts):
+            for key, value in circuit_counts.items():
+                if key not in indices:
+                    indices[key] = len(keys)
+                    keys.append(key.replace(' ', ''))
+                rows.append(row)
+                outcomes.append(indices[key])
+                values.append(value)
+
+        dim = 2 ** self.k
+        if keys:
+            width = max(len(key) for key in keys)
+            chars = np.array([list(key.zfill(width)) for key in keys]) == '1'
+            # Character -1 - b of a bit string is classical bit b
+            bits = chars[:, [width - 1 - b for b in self.clbits]]
+            codes = bits.astype(int) @ (1 << np.arange(self.k))
+            flat = np.asarray(rows) * dim + codes[np.asarray(outcomes, dtype=int)]
+        else:
+            flat = np.zeros(0, dtype=int)
+        tensor = np.bincount(flat, weights=np.asarray(values, dtype=float), minlength=len(counts) * dim)
+        tensor = np.reshape(tensor, (len(counts), dim))
+        return tensor / np.maximum(np.sum(tensor, axis=-1, keepdims=True), 1)
+
+    def calibrate(self, calibration_counts, prepared=None, is_tensored=False):
+        """
+        Build the inverse detector matrix from calibration circuits.
+
+        Args:
+            calibration_counts (list): Counts of the calibration circuits, or their probabilities as an array.
+            prepared (list): Index of the basis state prepared by every calibration circuit. By default circuit j
+                prepares state j, as creat_calibration_circ of the notebook; for is_tensored with two circuits, all
+                zeros and all ones.
+            is_tensored (bool): Whether to build one 2x2 matrix per qubit instead of the full matrix.
+
+        Returns:
+            ReadoutMitigation: self, calibrated.
+        """
+        probabilities = self.as_probabilities(calibration_counts)
+        if prepared is None:
+            if is_tensored and len(probabilities) == 2:
+                prepared = [0, 2 ** self.k - 1]
+            else:
+                prepared = np.arange(len(probabilities))
+        prepared = np.asarray(prepared, dtype=int)
+
+        if not is_tensored:
+            if len(probabilities) != 2 ** self.k or set(prepared) != set(range(2 ** self.k)):
+                raise ValueError("The full detector matrix needs one calibration circuit per basis state")
+            # Column j is the outcome distribution of prepared state j
+            matrix = np.zeros((2 ** self.k, 2 ** self.k))
+            matrix[:, prepared] = probabilities.T
+            self.inverse, self.qubit_inverses = np.linalg.inv(matrix), None
+            return self
+
+        self.qubit_inverses = []
+        for i in range(self.k):
+            marginals = self.qubit_marginals(probabilities, i)
+            bits = (prepared >> i) & 1
+            if not (np.any(bits == 0) and np.any(bits == 1)):
+                raise ValueError("Bit %d is not prepared in both states by the calibration circuits" % self.clbits[i])
+            matrix = np.stack([np.mean(marginals[bits == b], axis=0) for b in (0, 1)], axis=-1)
+            self.qubit_inverses.append(np.linalg.inv(matrix))
+        self.inverse = None
+        return self
+
+    def qubit_marginals(self, probabilities, i):
+        """Return the outcome distribution of bit clbits[i] of every circuit, an array of shape (circuits, 2)."""
+        tensor = np.reshape(probabilities, (len(probabilities),) + (2,) * self.k)
+        axis = 1 + self.k - 1 - i
+        return np.sum(tensor, axis=tuple(a for a in range(1, self.k + 1) if a != axis))
+
+    def as_probabilities(self, counts):
+        """Return counts converted by counts_to_probabilities, or probabilities given as an array unchanged."""
+        if isinstance(counts, np.ndarray):
+            return counts
+        return self.counts_to_probabilities(counts)
+
+    def mitigate(self, counts):
+        """
+        Apply the inverse detector matrix to the outcome distributions of all circuits. Without calibration the
+        distributions are returned unchanged, as in the notebook with is_to_calibrate off.
+
+        Args:
+            counts (list): Counts of the circuits, or their probabilities as an array of shape (circuits, 2^k).
+
+        Returns:
+            np.array: Mitigated probabilities of shape (circuits, 2^k).
+        """
+        probabilities = self.as_probabilities(counts)
+        if self.inverse is not None:
+            return probabilities @ self.inverse.T
+        if self.qubit_inverses is None:
+            return probabilities
+
+        tensor = np.reshape(probabilities, (len(probabilities),) + (2,) * self.k)
+        for i, inverse in enumerate(self.qubit_inverses):
+            axis = 1 + self.k - 1 - i
+            tensor = np.moveaxis(np.tensordot(inverse, tensor, axes=([1], [axis])), 0, axis)
+        return np.reshape(tensor, probabilities.shape)
+
+    def survival_probabilities(self, counts, state=0):
+        """
+        Return the mitigated probability of measuring the given basis state, for every circuit.
+
+        Args:
+            counts (list): Counts of the circuits, or their probabilities as an array.
+            state (int): Outcome index of the initial state, the ground state by default.
+
+        Returns:
+            np.array: One survival probability per circuit.
+        """
+        return self.mitigate(counts)[:, state]
+
+    @staticmethod
+    def split(values, sizes):
+        """
+        Split per-circuit values into the consecutive groups of a batch, replacing hand-typed slices such as
+        rc_b1[4:19]. With equal sizes the groups are returned as the rows of one array.
+
+        Args:
+            values (np.array): Values of the circuits of a batch, in batch order.
+            sizes (list): Number of circuits of every group, e.g. [4] + [15] * 6.
+
+        Returns:
+            list or np.array: The groups.
+        """
+        values = np.asarray(values)
+        if sum(sizes) != len(values):
+            raise ValueError("Group sizes add up to %d, but there are %d values" % (sum(sizes), len(values)))
+        if len(set(sizes)) == 1:
+            return np.reshape(values, (len(sizes), sizes[0]) + values.shape[1:])
+        return np.split(values, np.cumsum(sizes)[:-1])
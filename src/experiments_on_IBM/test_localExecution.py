@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+import unittest
+import importlib.util
+from localExecution import LocalExecution
+
+HAS_AER = importlib.util.find_spec('qiskit') is not None and importlib.util.find_spec('qiskit_aer') is not None
+
+
+@unittest.skipUnless(HAS_AER, "qiskit and qiskit_aer are not installed")
+class TestLocalExecution(unittest.TestCase):
+    """The counts cache on a GenericBackendV2, in a temporary directory."""
+    SHOTS = 2000
+
+    def setUp(self):
+        from qiskit import QuantumCircuit
+        from qiskit.providers.fake_provider import GenericBackendV2
+        self.directories = []
+        self.backend = GenericBackendV2(5, coupling_map=LocalExecution.QUITO_COUPLING_MAP, seed=0)
+        self.circuits = []
+        for angle in (0.3, 1.1, 2.0):
+            circuit = QuantumCircuit(5, 5)
+            circuit.ry(angle, 1)
+            circuit.cx(1, 2)
+            circuit.measure([1, 2], [1, 2])
+            self.circuits.append(circuit)
+
+    def tearDown(self):
+        for directory in self.directories:
+            shutil.rmtree(directory)
+
+    def execution(self, **kwargs):
+        self.directories.append(tempfile.mkdtemp())
+        return LocalExecution(self.backend, self.directories[-1], **kwargs)
+
+    def test_sharding_does_not_change_counts(self):
+        batch = self.circuits + self.circuits[:1]
+        counts = self.execution(shard_size=32).run(batch, self.SHOTS)
+        self.assertEqual(self.execution(shard_size=1).run(batch, self.SHOTS), counts)
+        self.assertEqual(self.execution(shard_size=2, max_workers=2).run(batch, self.SHOTS), counts)
+
+    def test_repeat_run_hits_cache(self):
+        execution = self.execution()
+        counts = execution.run(self.circuits, self.SHOTS)
+        self.assertEqual((execution.hits, execution.misses), (0, 3))
+        self.assertEqual(execution.run(self.circuits, self.SHOTS), counts)
+        self.assertEqual((execution.hits, execution.misses), (3, 3))
+        self.assertEqual(execution.stats()['entries'], 3)
+        execution.run(self.circuits, self.SHOTS, seed=1)
+        self.assertEqual(execution.misses, 6)
+
+    def test_repeated_circuits_are_independent(self):
+        execution = self.execution()
+        batch = [self.circuits[1]] * 3
+        keys = execution.keys(execution.transpile(batch), self.SHOTS, 0)
+        self.assertEqual(len({execution.seed_of(key) for key in keys}), 3)
+        counts = execution.run(batch, self.SHOTS)
+        self.assertNotEqual(counts[0], counts[1])
+        self.assertNotEqual(counts[1], counts[2])
+
+    def test_default_backend(self):
+        self.assertEqual(LocalExecution.default_backend().num_qubits, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import importlib.util
+import numpy as np
+from rcBatchGenerator import RcBatchGenerator
+
+HAS_QISKIT = importlib.util.find_spec('qiskit') is not None
+
+
+@unittest.skipUnless(HAS_QISKIT, "qiskit is not installed")
+class TestRcBatchGenerator(unittest.TestCase):
+    """Stamped realizations are the circuits built directly from the same Pauli frames."""
+    QUBITS = [1, 2]
+    SEED = 7
+    REALIZATIONS = 3
+
+    def setUp(self):
+        from qiskit import QuantumCircuit
+        from qiskit.providers.fake_provider import GenericBackendV2
+        self.forward = QuantumCircuit(3, 3)
+        self.forward.cx(*self.QUBITS)
+        self.backend = GenericBackendV2(3, coupling_map=[[0, 1], [1, 0], [1, 2], [2, 1]], seed=0)
+
+    @staticmethod
+    def apply_pauli(circuit, pauli, qubit):
+        [circuit.id, circuit.x, circuit.y, circuit.z][pauli](qubit)
+
+    def direct_circuits(self, generator, scheme, cycles, state):
+        """The realizations built gate by gate from the frames the generator draws with the same seed."""
+        from qiskit import QuantumCircuit
+        parts, n_draws = generator.slots(scheme, cycles)
+        frames = np.random.default_rng(self.SEED).integers(0, len(RcBatchGenerator.RC_TABLES[0]),
+                                                           size=(self.REALIZATIONS, n_draws))
+        circuits = []
+        for frame in frames:
+            circuit = QuantumCircuit(3)
+            generator.prepare_state(circuit, state)
+            for part in parts:
+                if part == 'ki' or part == 'k':
+                    circuit.compose(generator.inverse if part == 'ki' else generator.forward, inplace=True)
+                else:
+                    draw, table = part
+                    for i, qubit in enumerate(self.QUBITS):
+                        self.apply_pauli(circuit, RcBatchGenerator.RC_TABLES[table][frame[draw]][i], qubit)
+            circuits.append(circuit)
+        return circuits
+
+    def test_realizations_match_direct_circuits(self):
+        from qiskit.quantum_info import Operator
+        for scheme in RcBatchGenerator.SCHEMES:
+            for state in range(4):
+                generator = RcBatchGenerator(self.forward, self.QUBITS, self.backend, seed=self.SEED)
+                stamped = generator.realizations(scheme, 2, self.REALIZATIONS, state)
+                for circuit, direct in zip(stamped, self.direct_circuits(generator, scheme, 2, state)):
+                    unitary = Operator.from_circuit(circuit.remove_final_measurements(inplace=False))
+                    self.assertTrue(unitary.equiv(Operator(direct)), "%s, state %d" % (scheme, state))
+
+    def test_rc_tables_conjugate_cx(self):
+        from qiskit import QuantumCircuit
+        from qiskit.quantum_info import Operator
+        cx = QuantumCircuit(2)
+        cx.cx(0, 1)
+        left, right = RcBatchGenerator.RC_TABLES[RcBatchGenerator.LEFT_RC_GATE], \
+            RcBatchGenerator.RC_TABLES[RcBatchGenerator.RIGHT_RC_GATE]
+        for before, after in zip(left, right):
+            # Paulis of the control and target qubit, before and after the CNOT
+            circuit = QuantumCircuit(2)
+            for qubit in range(2):
+                self.apply_pauli(circuit, before[qubit], qubit)
+            circuit.cx(0, 1)
+            for qubit in range(2):
+                self.apply_pauli(circuit, after[qubit], qubit)
+            self.assertTrue(Operator(circuit).equiv(Operator(cx)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+from readoutMitigation import ReadoutMitigation
+
+
+class TestReadoutMitigation(unittest.TestCase):
+    """Mitigation recovers known outcome distributions from synthetic counts of a known assignment matrix."""
+    CLBITS = [1, 2]
+    WIDTH = 3
+    SHOTS = 10 ** 6
+    # Readout matrices of the classical bits CLBITS[0] and CLBITS[1], column j the outcomes of prepared bit j
+    QUBIT_MATRICES = [np.array([[0.97, 0.05], [0.03, 0.95]]), np.array([[0.92, 0.08], [0.08, 0.92]])]
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        # CLBITS[0] is the least significant bit of the outcome index
+        self.tensored = np.kron(self.QUBIT_MATRICES[1], self.QUBIT_MATRICES[0])
+        # A correlated assignment matrix, which only the full mitigation can undo
+        correlated = self.tensored + 0.02 * self.rng.random((4, 4))
+        self.full = correlated / np.sum(correlated, axis=0)
+        self.true = self.rng.dirichlet(np.ones(4), size=5)
+
+    def counts_of(self, probabilities):
+        """Counts of every distribution on the bit strings of the WIDTH-bit register, unmeasured bits at 0."""
+        counts = []
+        for row in np.atleast_2d(probabilities):
+            circuit_counts = {}
+            for outcome, probability in enumerate(row):
+                bits = ['0'] * self.WIDTH
+                for i, clbit in enumerate(self.CLBITS):
+                    bits[self.WIDTH - 1 - clbit] = str((outcome >> i) & 1)
+                circuit_counts[''.join(bits)] = int(round(probability * self.SHOTS))
+            counts.append(circuit_counts)
+        return counts
+
+    def test_counts_to_probabilities(self):
+        counts = [{'010': 3, '100': 1}, {'110': 2, '001': 2}]
+        np.testing.assert_allclose(ReadoutMitigation(self.CLBITS).counts_to_probabilities(counts),
+                                   [[0, 0.75, 0.25, 0], [0.5, 0, 0, 0.5]])
+
+    def test_full(self):
+        mitigation = ReadoutMitigation(self.CLBITS).calibrate(self.counts_of(self.full.T))
+        measured = self.counts_of(self.true @ self.full.T)
+        np.testing.assert_allclose(mitigation.mitigate(measured), self.true, atol=1e-5)
+        np.testing.assert_allclose(mitigation.survival_probabilities(measured, state=2), self.true[:, 2], atol=1e-5)
+
+    def test_tensored(self):
+        calibration = self.counts_of(self.tensored.T[[0, 3]])
+        mitigation = ReadoutMitigation(self.CLBITS).calibrate(calibration, is_tensored=True)
+        for inverse, matrix in zip(mitigation.qubit_inverses, self.QUBIT_MATRICES):
+            np.testing.assert_allclose(inverse, np.linalg.inv(matrix), atol=1e-5)
+        measured = self.counts_of(self.true @ self.tensored.T)
+        np.testing.assert_allclose(mitigation.mitigate(measured), self.true, atol=1e-5)
+
+    def test_tensored_from_all_basis_states(self):
+        mitigation = ReadoutMitigation(self.CLBITS).calibrate(self.counts_of(self.tensored.T), is_tensored=True)
+        np.testing.assert_allclose(mitigation.mitigate(self.true @ self.tensored.T), self.true, atol=1e-5)
+
+    def test_full_needs_every_basis_state(self):
+        with self.assertRaises(ValueError):
+            ReadoutMitigation(self.CLBITS).calibrate(self.counts_of(self.full.T[[0, 3]]))
+
+    def test_split(self):
+        groups = ReadoutMitigation.split(np.arange(10), [4, 6])
+        self.assertEqual([len(group) for group in groups], [4, 6])
+        self.assertEqual(ReadoutMitigation.split(np.arange(6), [3, 3]).shape, (2, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
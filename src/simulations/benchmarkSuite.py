@@ -0,0 +1,170 @@
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import numpy as np
+from utilities import Utilities
+from iDGate import IDGate
+from cXGate import CXGate
+from initialState import InitialState
+from kikCalculation import KikCalculation
+from quantumFourierTransform import QuantumFourierTransform
+
+
+class BenchmarkSuite:
+    """
+    Benchmarks of the simulation hot paths for a range of numbers of qubits.
+
+    Every case is timed as the best of `repeat` runs, and its peak memory is measured in one more run with
+    tracemalloc, which also sees NumPy allocations. The gate caches are cleared before every run, so all runs build
+    their superoperators from scratch. Results are written as JSON and can be compared against a stored baseline;
+    a case regresses when its time or peak memory exceeds the baseline by more than the threshold.
+
+    Attributes:
+        repeat (int): Number of timed runs of every case.
+        seed (int): Seed of the random operators the cases act on.
+    """
+    CASES = ['make_liouville', 'recursive_kron', 'run_pauli_combinations', 'dress_by_rc_gate', 'add_coherent_error',
+             'compute_qft', 'calculate_values_of_all_errors']
+    QUBITS = [2, 3, 4, 5, 6]
+    THRESHOLD = 0.2
+
+    def __init__(self, repeat=3, seed=0):
+        self.repeat = repeat
+        self.seed = seed
+
+    def random_operator(self, dim):
+        """Return a random complex dim x dim matrix."""
+        rng = np.random.default_rng(self.seed)
+        return rng.normal(size=(dim, dim)) + 1j * rng.normal(size=(dim, dim))
+
+    def case_make_liouville(self, n):
+        oper = self.random_operator(2 ** n)
+        return lambda: Utilities.make_liouville(oper)
+
+    def case_recursive_kron(self, n):
+        opers = [self.random_operator(2)] * n
+        return lambda: Utilities.recursive_kron(opers)
+
+    def case_run_pauli_combinations(self, n):
+        oper = self.random_operator(4 ** n)
+        return lambda: IDGate(n).run_pauli_combinations(oper)
+
+    def case_dress_by_rc_gate(self, n):
+        oper = self.random_operator(4 ** n)
+        return lambda: CXGate(n, 0, 1).dress_by_rc_gate(oper)
+
+    def case_add_coherent_error(self, n):
+        oper = self.random_operator(4 ** n)
+        cx_obj = CXGate(n, 0, 1)
+        cx_obj.set_rotation_as_coherent_error(QuantumFourierTransform.rot_cont_coh_error_cx,
+                                              QuantumFourierTransform.rot_uncont_coh_error_cx)
+        return lambda: cx_obj.add_coherent_error(False, QuantumFourierTransform.CONTROLLABLE_COHERENT_ERROR_CX,
+                                                 QuantumFourierTransform.UNCONTROLLABLE_COHERENT_ERROR_CX, oper)
+
+    def case_compute_qft(self, n):
+        return lambda: QuantumFourierTransform(n).compute_qft(False)
+
+    def case_calculate_values_of_all_errors(self, n):
+        rho_0 = InitialState(n).generate_excited_state()
+        return lambda: KikCalculation(n, rho_0, QuantumFourierTransform(n)).calculate_values_of_all_errors([], [], [], [])
+
+    @staticmethod
+    def clear_caches():
+        """Drop every cached gate, so a run measures the full build."""
+        QuantumFourierTransform.gate_cache.clear()
+        CXGate.coherent_error_cache.clear()
+
+    def measure(self, function):
+        """
+        Return the best wall time in seconds over `repeat` runs and the peak memory in bytes of one run.
+        """
+        seconds = []
+        for _ in range(self.repeat):
+            self.clear_caches()
+            start = time.perf_counter()
+            function()
+            seconds.append(time.perf_counter() - start)
+
+        self.clear_caches()
+        tracemalloc.start()
+        try:
+            function()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return min(seconds), peak_bytes
+
+    def run(self, cases=None, qubits=None, log=None):
+        """
+        Run the benchmarks.
+
+        Args:
+            cases (list): Names of the cases, all CASES by default.
+            qubits (list): Numbers of qubits, QUBITS by default.
+            log (file): Optional stream on which every result is printed as it is measured.
+
+        Returns:
+            dict: The environment of the run under "meta" and one entry per case and n under "results".
+        """
+        results = []
+        for name in cases or self.CASES:
+            for n in qubits or self.QUBITS:
+                seconds, peak_bytes = self.measure(getattr(self, 'case_' + name)(n))
+                results.append({"case": name, "n": n, "seconds": seconds, "peak_bytes": peak_bytes})
+                if log is not None:
+                    print("%-32s n=%d %10.4f s %12d bytes" % (name, n, seconds, peak_bytes), file=log, flush=True)
+        meta = {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                "repeat": self.repeat}
+        return {"meta": meta, "results": results}
+
+    @staticmethod
+    def compare(current, baseline, threshold=THRESHOLD):
+        """
+        Compare a run against a baseline run.
+
+        Args:
+            current (dict): The result of run.
+            baseline (dict): A stored result of run.
+            threshold (float): Allowed relative increase of time and peak memory.
+
+        Returns:
+            list: One message per regressed case, metric and n. Cases missing from the baseline are skipped.
+        """
+        reference = {(entry["case"], entry["n"]): entry for entry in baseline["results"]}
+        regressions = []
+        for entry in current["results"]:
+            base = reference.get((entry["case"], entry["n"]))
+            if base is None:
+                continue
+            for metric in ("seconds", "peak_bytes"):
+                if base[metric] > 0 and entry[metric] > base[metric] * (1 + threshold):
+                    regressions.append("%s n=%d %s: %.6g -> %.6g (+%.0f%%)"
+                                       % (entry["case"], entry["n"], metric, base[metric], entry[metric],
+                                          100 * (entry[metric] / base[metric] - 1)))
+        return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the simulation hot paths.")
+    parser.add_argument('--cases', nargs='+', choices=BenchmarkSuite.CASES, default=BenchmarkSuite.CASES)
+    parser.add_argument('--qubits', nargs='+', type=int, default=BenchmarkSuite.QUBITS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="JSON file the results are written to.")
+    parser.add_argument('--baseline', help="JSON file of a previous run to compare against.")
+    parser.add_argument('--threshold', type=float, default=BenchmarkSuite.THRESHOLD,
+                        help="Allowed relative increase of time and peak memory.")
+    args = parser.parse_args()
+
+    result = BenchmarkSuite(args.repeat).run(args.cases, args.qubits, log=sys.stdout)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(result, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = BenchmarkSuite.compare(result, json.load(file), args.threshold)
+        for message in regressions:
+            print("REGRESSION " + message)
+        sys.exit(1 if regressions else 0)
@@ -1,10 +1,9 @@
-import numpy
 import numpy as np
-import qiskit.quantum_info as qi
-from scipy.linalg import expm
+import scipy.sparse as sp
 from utilities import Utilities
 from quantumGate import QuantumGate
-from qiskit import QuantumRegister, QuantumCircuit
+from superoperatorCache import SuperoperatorCache
+from profiler import Profiler
 
 
 class CXGate(QuantumGate):
@@ -28,8 +27,11 @@ class CXGate(QuantumGate):
     NUM_RC_CX = 16
     LEFT_RC = 0
     RIGHT_RC = 1
+    RC_TWIRL = None
+    RC_TWIRL_SPARSE = None
+    coherent_error_cache = SuperoperatorCache()
 
-    def __init__(self, n_qubits, control, target):
+    def __init__(self, n_qubits, control, target, is_sparse=False):
         """
         Initializes the CXGate class with a given number of qubits, control qubit, and target qubit.
 
@@ -37,8 +39,9 @@ class CXGate(QuantumGate):
             n_qubits (int): The number of qubits in the quantum system.
             control (int): The control qubit for the CNOT gate.
             target (int): The target qubit for the CNOT gate.
+            is_sparse (bool): Whether the gate and its channels are built as scipy.sparse matrices.
         """
-        super().__init__(n_qubits)
+        super().__init__(n_qubits, is_sparse)
         self.c = control
         self.t = target
 
@@ -49,20 +52,18 @@ class CXGate(QuantumGate):
         Returns:
             numpy.ndarray: The matrix representation of the CNOT gate.
         """
-        qc = QuantumCircuit(QuantumRegister(self.n))
+        return Utilities.controlled_not(self.c, self.t, self.n, is_sparse=self.is_sparse)
 
-        # Dictionary to store (c, t) to (cc, tt) mappings for different values of n
-        transformations = {
-            3: {(1, 0): (2, 1), (2, 1): (1, 0)},
-            4: {(1, 0): (3, 2), (2, 0): (3, 1), (3, 1): (2, 0), (3, 2): (1, 0)}
-        }
-
-        # Get the transformed (cc, tt) pair if present, otherwise use the original (c, t)
-        cc, tt = transformations.get(self.n, {}).get((self.c, self.t), (self.c, self.t))
+    def get_permutation(self):
+        """
+        Returns the CNOT gate as an index permutation of the computational basis states.
 
-        qc.cx(tt, cc)
-        return qi.Operator(qc).data.real
+        Returns:
+            numpy.ndarray: The permutation perm such that the gate maps basis state i to basis state perm[i].
+        """
+        return Utilities.controlled_not(self.c, self.t, self.n, as_permutation=True)
 
+    @Profiler.profiled('cx.adc')
     def apply_channel_in_ls(self, error_channel):
         """
         Applies a given error channel to the Liouville matrix representation of the CNOT gate.
@@ -73,20 +74,22 @@ class CXGate(QuantumGate):
         Returns:
             numpy.ndarray: The modified Liouville matrix representation after applying the error channel.
         """
-        return np.dot(self.adc_channel(error_channel), self.get_liouville_matrix())
+        return Utilities.compose(self.adc_channel(error_channel), self.get_liouville_matrix())
 
     def adc_channel(self, p):
         """
         Computes the Amplitude Damping Channel (ADC) for the CNOT gate.
 
         Args:
-            p (float): The probability parameter for the amplitude damping channel.
+            p (float or numpy.ndarray): The probability parameter for the amplitude damping channel. An array of
+                probabilities gives a stack of channels.
 
         Returns:
             numpy.ndarray: The ADC matrix for the CNOT gate.
         """
-        k0 = [[1, 0], [0, np.sqrt(1 - p)]]
-        k1 = [[0, np.sqrt(p)], [0, 0]]
+        k0, k1 = self.adc_kraus(p)
+        if self.is_sparse:
+            k0, k1 = sp.csr_matrix(k0), sp.csr_matrix(k1)
 
         k0_1 = Utilities().create_kron_product(k0, k0, self.t, self.n)
         k1_1 = Utilities().create_kron_product(k1, k1, self.t, self.n)
@@ -94,10 +97,29 @@ class CXGate(QuantumGate):
         k0_2 = Utilities().create_kron_product(k0, k0, self.c, self.n)
         k1_2 = Utilities().create_kron_product(k1, k1, self.c, self.n)
 
-        channel1 = np.kron(k0_1, np.conj(k0_1)) + np.kron(k1_1, np.conj(k1_1))
-        channel2 = np.kron(k0_2, np.conj(k0_2)) + np.kron(k1_2, np.conj(k1_2))
+        channel1 = Utilities.make_liouville(k0_1) + Utilities.make_liouville(k1_1)
+        channel2 = Utilities.make_liouville(k0_2) + Utilities.make_liouville(k1_2)
+
+        return Utilities.compose(channel1, channel2)
+
+    @staticmethod
+    def adc_kraus(p):
+        """
+        Returns the single-qubit Kraus operators of the Amplitude Damping Channel (ADC).
+
+        Args:
+            p (float or numpy.ndarray): The probability parameter for the amplitude damping channel. An array of
+                probabilities gives stacked Kraus operators.
 
-        return np.dot(channel1, channel2)
+        Returns:
+            list of numpy.ndarray: The Kraus operators k0 and k1.
+        """
+        k0 = np.zeros(np.shape(p) + (2, 2))
+        k1 = np.zeros(np.shape(p) + (2, 2))
+        k0[..., 0, 0] = 1
+        k0[..., 1, 1] = np.sqrt(1 - np.asarray(p))
+        k1[..., 0, 1] = np.sqrt(p)
+        return [k0, k1]
 
     def get_rc_in_circ(self, item):
         """
@@ -135,23 +157,168 @@ class CXGate(QuantumGate):
 
         return [ul, ur]
 
+    @classmethod
+    def rc_twirl_tensor(cls):
+        """
+        Returns the RC dressing as a linear map on the 2-qubit block of a superoperator, built once per class.
+
+        The map sends the (row, column) indices of the control and target qubits of a superoperator obj to those of
+        the average of L(ul) obj L(ur) over the 16 RC pairs, as a tensor of shape (2,) * 16 ordered as
+        [output rows, output columns, input rows, input columns], each as (i_c, i_t, j_c, j_t).
+
+        Returns:
+            numpy.ndarray: The RC dressing map.
+        """
+        if cls.RC_TWIRL is None:
+            twirl = 0
+            for i in range(cls.NUM_RC_CX):
+                ul = Utilities.make_liouville(np.kron(Utilities.lr[i][cls.LEFT_RC], Utilities.lr[i][cls.RIGHT_RC]))
+                ur = Utilities.make_liouville(np.kron(Utilities.rr[i][cls.LEFT_RC], Utilities.rr[i][cls.RIGHT_RC]))
+                twirl = twirl + np.einsum('ab,cd->adbc', ul, ur)
+            cls.RC_TWIRL = np.reshape(twirl / cls.NUM_RC_CX, [2] * 16)
+        return cls.RC_TWIRL
+
+    @Profiler.profiled('cx.rc_dressing')
     def dress_by_rc_gate(self, obj):
         """
         Dresses up the CNOT gate with Randomized Compiling (RC) gates.
 
+        The RC gates only act on the control and target qubits, so the dressing is applied to those indices of obj
+        only, without building the n-qubit RC gates.
+
         Args:
-            obj (numpy.ndarray): The object to be dressed by the RC gates.
+            obj (numpy.ndarray): The object to be dressed by the RC gates, or a stack of them.
 
         Returns:
             numpy.ndarray: The dressed CNOT gate in matrix form.
-        """        dressed_cx = np.dot(IDGate(self.n).get_liouville_matrix(), 0)
+        """
+        if sp.issparse(obj):
+            return self.dress_sparse_by_rc_gate(obj)
+
+        size = 4 ** self.n
+        tensor = np.reshape(obj, np.shape(obj)[:-2] + (2,) * (4 * self.n))
+        n = self.n
+        # Liouville axes of the local block, counted from the end so stacked objects are supported
+        axes = [q - 4 * n for q in (self.c, self.t, n + self.c, n + self.t, 2 * n + self.c, 2 * n + self.t,
+                                    3 * n + self.c, 3 * n + self.t)]
+        dressed = np.tensordot(self.rc_twirl_tensor(), tensor, axes=(list(range(8, 16)), axes))
+        dressed = np.moveaxis(dressed, list(range(8)), axes)
+        return np.reshape(dressed, np.shape(obj)[:-2] + (size, size))
+
+    def dress_sparse_by_rc_gate(self, obj):
+        """
+        Dresses up a sparse CNOT gate with Randomized Compiling (RC) gates, keeping the product sparse.
+
+        The dressing map of rc_twirl_tensor is applied to the nonzero entries of obj directly, so the n-qubit RC
+        gates are never built.
+
+        Args:
+            obj (scipy.sparse.csr_matrix): The object to be dressed by the RC gates.
+
+        Returns:
+            scipy.sparse.csr_matrix: The dressed CNOT gate.
+        """
+        if CXGate.RC_TWIRL_SPARSE is None:
+            twirl = np.reshape(self.rc_twirl_tensor(), (256, 256))
+            CXGate.RC_TWIRL_SPARSE = sp.csc_matrix(np.where(np.abs(twirl) > 1e-12, twirl, 0))
+        twirl = CXGate.RC_TWIRL_SPARSE
+
+        n = self.n
+        # Bits of a Liouville row or column index holding (i_c, i_t, j_c, j_t), most significant first
+        shifts = [2 * n - 1 - q for q in (self.c, self.t, n + self.c, n + self.t)]
+        mask = sum(1 << shift for shift in shifts)
+
+        def local(index):
+            return sum(((index >> shift) & 1) << (3 - k) for k, shift in enumerate(shifts))
+
+        def place(index, code):
+            return (index & ~mask) | sum(((code >> (3 - k)) & 1) << shift for k, shift in enumerate(shifts))
+
+        # Every entry of obj is sent to the entries of its column of the dressing map
+        coo = obj.tocoo()
+        rows, cols = coo.row.astype(np.int64), coo.col.astype(np.int64)
+        code = local(rows) * 16 + local(cols)
+        starts = twirl.indptr[code]
+        counts = twirl.indptr[code + 1] - starts
+        owner = np.repeat(np.arange(len(code)), counts)
+        entry = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(np.sum(counts))
+        out_code = twirl.indices[entry]
+        return sp.csr_matrix((coo.data[owner] * twirl.data[entry],
+                              (place(rows[owner], out_code >> 4), place(cols[owner], out_code & 15))), shape=obj.shape)
+
+    @staticmethod
+    @Profiler.profiled('cx.expm')
+    def two_qubit_exponential(a, cont, b, uncont):
+        """
+        Returns exp(i a cont - i b uncont) for two 2-qubit generators.
+
+        When both generators are Pauli strings the exponential is taken in closed form: as a product of two rotations
+        if they commute, and as a single rotation of angle sqrt(a^2 + b^2) if they anticommute. Any other generator
+        falls back to expm on the 4x4 matrix.
+
+        Args:
+            a (float or numpy.ndarray): Coefficient of cont, or an array of coefficients.
+            cont (numpy.ndarray): The 4x4 generator of the controlled error.
+            b (float or numpy.ndarray): Coefficient of uncont, or an array of coefficients.
+            uncont (numpy.ndarray): The 4x4 generator of the uncontrolled error.
+
+        Returns:
+            numpy.ndarray: The 4x4 unitary, stacked like a and b.
+        """
+        a = np.asarray(a)[..., None, None]
+        b = np.asarray(b)[..., None, None]
+        identity = np.eye(4)
+        is_pauli = all(np.allclose(p, np.conj(p).T) and np.allclose(np.dot(p, p), identity) for p in (cont, uncont))
+
+        if is_pauli and np.allclose(np.dot(cont, uncont), np.dot(uncont, cont)):
+            return np.matmul(np.cos(a) * identity + 1j * np.sin(a) * cont, np.cos(b) * identity - 1j * np.sin(b) * uncont)
+        if is_pauli and np.allclose(np.dot(cont, uncont), -np.dot(uncont, cont)):
+            # (a cont - b uncont)^2 = (a^2 + b^2) I
+            r = np.sqrt(a ** 2 + b ** 2)
+            return np.cos(r) * identity + 1j * np.sinc(r / np.pi) * (a * cont - b * uncont)
+        from scipy.linalg import expm
+        return expm(1j * a * cont - 1j * b * uncont)
+
+    def local_coherent_error(self, is_backword, A, B):
+        """
+        Returns the coherent error unitary of the CNOT gate restricted to its control and target qubits.
+
+        Args:
+            is_backword (bool): Indicates if the gate is applied in a backward direction.
+            A (float or numpy.ndarray): Coefficient for the controlled coherent error.
+            B (float or numpy.ndarray): Coefficient for the uncontrolled coherent error.
 
-        for i in range(self.NUM_RC_CX):
-            get_rc = self.get_rc_in_circ(i)
-            dressed_cx = dressed_cx + np.dot(np.dot(Utilities().make_liouville(get_rc[self.LEFT_RC]), obj),
-                                             Utilities().make_liouville(get_rc[self.RIGHT_RC]))
+        Returns:
+            numpy.ndarray: The 4x4 unitary acting on (control, target).
+        """
+        cont = np.kron(self.rotate_cont_coh_error[0], self.rotate_cont_coh_error[1])
+        uncont = np.kron(self.rotate_uncont_coh_error[0], self.rotate_uncont_coh_error[1])
+        return self.two_qubit_exponential(-np.asarray(A) if is_backword else A, cont, B, uncont)
+
+    @Profiler.profiled('cx.coherent_error')
+    def coherent_error_in_ls(self, is_backword, A, B):
+        """
+        Returns the coherent error of the CNOT gate on n qubits in Liouville space.
+        Scalar errors are cached by (n, qubits, direction, A, B, rotation axes), so sweeps only build each error once.
+
+        Args:
+            is_backword (bool): Indicates if the gate is applied in a backward direction.
+            A (float or numpy.ndarray): Coefficient for the controlled coherent error.
+            B (float or numpy.ndarray): Coefficient for the uncontrolled coherent error.
+
+        Returns:
+            numpy.ndarray: The Liouville matrix of the coherent error, stacked like A and B.
+        """
+        def build():
+            local = Utilities.embed_operator(self.local_coherent_error(is_backword, A, B), [self.c, self.t], self.n)
+            return Utilities.make_liouville(sp.csr_matrix(local) if self.is_sparse else local)
 
-        return np.dot(dressed_cx, 1 / self.NUM_RC_CX)
+        if np.ndim(A) or np.ndim(B):
+            return build()
+        key = (self.n, self.c, self.t, is_backword, A, B, self.is_sparse,
+               tuple(np.asarray(m).tobytes() for m in self.rotate_cont_coh_error),
+               tuple(np.asarray(m).tobytes() for m in self.rotate_uncont_coh_error))
+        return self.coherent_error_cache.get_or_build(key, build)
 
     def add_coherent_error(self, is_backword, A, B, obj):
         """
@@ -159,29 +326,15 @@ class CXGate(QuantumGate):
 
         Args:
             is_backword (bool): Indicates if the gate is applied in a backward direction.
-            A (float): Coefficient for the controlled coherent error.
-            B (float): Coefficient for the uncontrolled coherent error.
+            A (float or numpy.ndarray): Coefficient for the controlled coherent error.
+            B (float or numpy.ndarray): Coefficient for the uncontrolled coherent error.
             obj (numpy.ndarray): The object to which the coherent error is added.
 
         Returns:
             numpy.ndarray: The modified CNOT gate with added coherent errors.
         """
-        cont = self.rotate_cont_coh_error[0] if self.c == 0 else (self.rotate_cont_coh_error[1] if self.t == 0 else I)
-        uncont = self.rotate_uncont_coh_error[0] if self.c == 0 else (self.rotate_uncont_coh_error[1] if self.t == 0 else I)
-
-        for i in range(1, self.n):
-            if i == self.t:
-                cont = np.kron(cont, self.rotate_cont_coh_error[1])
-                uncont = np.kron(uncont, self.rotate_uncont_coh_error[1])
-            elif i == self.c:
-                cont = np.kron(cont, self.rotate_cont_coh_error[0])
-                uncont = np.kron(uncont, self.rotate_uncont_coh_error[0])
-            else:
-                cont = np.kron(cont, I)
-                uncont = np.kron(uncont, I)
-
-        cx_err = Utilities.make_liouville(expm((-1j if is_backword else 1j) * A * cont - 1j * B * uncont))
+        cx_err = self.coherent_error_in_ls(is_backword, A, B)
         if is_backword:
-            return np.dot(cx_err, obj)
+            return Utilities.compose(cx_err, obj)
         else:
-            return np.dot(obj, cx_err)
+            return Utilities.compose(obj, cx_err)
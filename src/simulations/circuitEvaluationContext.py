@@ -0,0 +1,61 @@
+from utilities import Utilities
+from profiler import Profiler
+
+
+class CircuitEvaluationContext:
+    """
+    Builds the KIK operators (backward circuit after forward circuit) of a quantum circuit implementation at most
+    once per parameter point, so that all error quantities evaluated at that point can share them.
+
+    Attributes:
+        obj_quantum_cir: The quantum circuit implementation object.
+        builds (int): Number of forward/backward circuit builds done.
+        builds_saved (int): Number of forward/backward circuit builds avoided by reusing a KIK operator.
+    """
+
+    def __init__(self, obj_quantum_cir):
+        """
+        Initializes an empty context.
+
+        :param obj_quantum_cir: The quantum circuit implementation object.
+        """
+        self.obj_quantum_cir = obj_quantum_cir
+        self.kik_operators = {}
+        self.builds = 0
+        self.builds_saved = 0
+
+    def parameter_point(self):
+        """Return the error parameters the circuits currently depend on."""
+        cir = self.obj_quantum_cir
+        return (getattr(cir, 'controllable_coh_err_cx', None), getattr(cir, 'uncontrollable_coh_err_cx', None),
+                cir.two_qubit_error, cir.one_qubit_error)
+
+    @Profiler.profiled('kik.kik_operator')
+    def kik_operator(self, is_add_rc):
+        """
+        Return the backward circuit times the forward circuit, with or without RC, building it on first use.
+
+        :param is_add_rc: Whether the circuits are dressed by RC gates.
+        :return: The KIK operator in Liouville space.
+        """
+        key = (is_add_rc,) + self.parameter_point()
+        if key in self.kik_operators:
+            self.builds_saved += 2
+            return self.kik_operators[key]
+
+        if is_add_rc:
+            combined = Utilities.compose(self.obj_quantum_cir.backward_circuit_with_rc(),
+                                         self.obj_quantum_cir.forward_circuit_with_rc())
+        else:
+            combined = Utilities.compose(self.obj_quantum_cir.backward_circuit(), self.obj_quantum_cir.forward_circuit())
+        self.builds += 2
+        self.kik_operators[key] = combined
+        return combined
+
+    def report(self):
+        """
+        Return how many circuit builds were done and how many were saved.
+
+        :return: Dictionary with the number of builds and saved builds.
+        """
+        return {"builds": self.builds, "builds_saved": self.builds_saved}
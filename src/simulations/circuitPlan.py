@@ -0,0 +1,159 @@
+import numpy as np
+from utilities import Utilities
+from cXGate import CXGate
+from zGate import ZGate
+from gateFusion import GateFusion
+from dependencyCache import DependencyCache
+from profiler import Profiler
+
+
+class CircuitPlan:
+    """
+    Execution plan of a circuit given as a gate list, compiled once and evaluated for many error parameters.
+
+    Compiling fuses the gate list with GateFusion and splits every block at its noisy CNOTs. The single-qubit gates
+    between them are multiplied into static 4^k x 4^k superoperators, and the block qubits are turned into the
+    Liouville axes the block acts on. Everything that depends on the error parameters is the noisy CNOT on two
+    qubits, which is the same for all CNOTs of one direction and orientation. Evaluating the plan therefore builds
+    these few 16x16 channels for the given (theta_A, theta_B, p), multiplies them into the blocks and applies the
+    blocks to the identity; no gate objects, gate lists or cache keys are made.
+
+    For scalar parameters the intermediates are kept in a DependencyCache with the dependencies in DEPENDENCIES: the
+    ADC channels depend on p only and the coherent errors on theta_A and theta_B only, so a sweep over one parameter
+    rebuilds only what depends on it, and evaluating twice at the same point returns the stored circuit.
+
+    Attributes:
+        n (int): Number of qubits.
+        is_add_rc (bool): Whether the CNOTs are dressed by RC gates.
+        dtype (np.dtype): Precision of the evaluated superoperator.
+        steps (list): Per block its qubits, its static superoperators and the noisy CNOTs between them.
+        cx_gates (dict): Two-qubit CXGate per (control position, target position), with the coherent error axes set.
+        intermediates (DependencyCache): The intermediates of the last scalar parameters.
+    """
+    DEPENDENCIES = {'adc': ('p',), 'coherent': ('cont', 'uncont'), 'cx': ('cont', 'uncont', 'p'),
+                    'circuit': ('cont', 'uncont', 'p')}
+
+    def __init__(self, n, steps, cx_gates, is_add_rc, dtype=np.complex128):
+        self.n = n
+        self.steps = steps
+        self.cx_gates = cx_gates
+        self.is_add_rc = is_add_rc
+        self.dtype = np.dtype(dtype)
+        self.intermediates = DependencyCache()
+
+    @staticmethod
+    def compile(sequence, n, rot_cont_coh_error, rot_uncont_coh_error, is_add_rc, dtype=np.complex128):
+        """
+        Compile a gate list into a plan.
+
+        Args:
+            sequence (list): Gates in time order, in the form used by GateFusion.
+            n (int): Number of qubits.
+            rot_cont_coh_error (list): Rotation axes of the controllable coherent error of the CNOTs.
+            rot_uncont_coh_error (list): Rotation axes of the uncontrollable coherent error of the CNOTs.
+            is_add_rc (bool): Whether the CNOTs are dressed by RC gates.
+            dtype (type): Precision of the evaluated superoperator.
+
+        Returns:
+            CircuitPlan: The plan.
+        """
+        steps, cx_gates = [], {}
+        for qubits, gates in GateFusion.fuse(sequence):
+            k = len(qubits)
+            position = {q: i for i, q in enumerate(qubits)}
+            statics, noisy = [], []
+            unitary = np.eye(2 ** k)
+            for gate in gates:
+                if gate[0] == 'cx':
+                    # A block with one qubit has no CNOT, so every CNOT acts on a 2-qubit block
+                    orientation = (position[gate[1]], position[gate[2]])
+                    if orientation not in cx_gates:
+                        cx_gates[orientation] = CXGate(2, *orientation)
+                        cx_gates[orientation].set_rotation_as_coherent_error(rot_cont_coh_error, rot_uncont_coh_error)
+                    statics.append(Utilities.make_liouville(unitary))
+                    noisy.append(orientation + (gate[3],))
+                    unitary = np.eye(2 ** k)
+                else:
+                    oper = Utilities.H if gate[0] == 'h' else ZGate(1, gate[2], gate[3], 0).get_matrix()
+                    unitary = np.dot(Utilities.embed_operator(oper, [position[gate[1]]], k), unitary)
+            statics.append(Utilities.make_liouville(unitary))
+            steps.append((qubits, statics, noisy))
+        return CircuitPlan(n, steps, cx_gates, is_add_rc, dtype)
+
+    def adjoint(self):
+        """
+        Return the plan of the inverse circuit, with the noisy CNOTs of the other direction. The blocks and the
+        static superoperators within them are taken in reverse order and replaced by their conjugate transposes,
+        since the Liouville matrix of an adjoint unitary is the adjoint of its Liouville matrix.
+
+        Returns:
+            CircuitPlan: The plan of the inverse circuit, sharing cx_gates with this one.
+        """
+        steps = [(qubits, [np.ascontiguousarray(static.conj().T) for static in reversed(statics)],
+                  [key[:2] + (not key[2],) for key in reversed(noisy)])
+                 for qubits, statics, noisy in reversed(self.steps)]
+        return CircuitPlan(self.n, steps, self.cx_gates, self.is_add_rc, self.dtype)
+
+    def tracked(self, key, parameters, builder):
+        """
+        Return the intermediate of the given key from the DependencyCache, or build it when parameters is None.
+        """
+        if parameters is None:
+            return builder()
+        return self.intermediates.get_or_build(key, self.DEPENDENCIES[key[0]], parameters, builder)
+
+    def noisy_cx(self, cont, uncont, p, parameters=None):
+        """
+        Build the two-qubit noisy CNOTs of the plan for one parameter point, or a stack of them for arrays.
+        The order of ADC and coherent error is the one of CXGate.add_coherent_error.
+
+        Returns:
+            dict: Superoperator per (control position, target position, is_inverse).
+        """
+        channels = {}
+        for step in self.steps:
+            for key in step[2]:
+                if key in channels:
+                    continue
+                cx_obj = self.cx_gates[key[:2]]
+                adc = self.tracked(('adc',) + key[:2], parameters, lambda: cx_obj.apply_channel_in_ls(p))
+                coherent = self.tracked(('coherent',) + key, parameters,
+                                        lambda: cx_obj.coherent_error_in_ls(key[2], cont, uncont))
+
+                def build():
+                    cx_err = Utilities.compose(coherent, adc) if key[2] else Utilities.compose(adc, coherent)
+                    return cx_obj.dress_by_rc_gate(cx_err) if self.is_add_rc else cx_err
+
+                channels[key] = self.tracked(('cx',) + key, parameters, build)
+        return channels
+
+    @Profiler.profiled('plan.evaluate')
+    def evaluate(self, cont, uncont, p):
+        """
+        Evaluate the plan.
+
+        Args:
+            cont (float or np.array): Controllable coherent error (theta_A), or an array of them.
+            uncont (float or np.array): Uncontrollable coherent error (theta_B), or an array of them.
+            p (float or np.array): Strength p of the ADC, or an array of them.
+
+        Returns:
+            np.array: The 4^n x 4^n superoperator of the circuit, stacked like the broadcast parameters. The circuit
+            of scalar parameters is shared with later evaluations at the same point and is read-only.
+        """
+        parameters = None
+        if not (np.ndim(cont) or np.ndim(uncont) or np.ndim(p)):
+            parameters = {'cont': cont, 'uncont': uncont, 'p': p}
+
+        def build():
+            channels = self.noisy_cx(cont, uncont, p, parameters)
+            circuit = np.eye(4 ** self.n, dtype=self.dtype)
+            for qubits, statics, noisy in self.steps:
+                block = statics[0]
+                for static, key in zip(statics[1:], noisy):
+                    block = np.matmul(static, np.matmul(channels[key], block))
+                circuit = Utilities.apply_local_superoperator(block.astype(self.dtype, copy=False), circuit, qubits,
+                                                              self.n)
+            return circuit
+
+        return self.tracked(('circuit',), parameters, build)
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class DensityMatrixEngine:
+    """
+    Contains static methods for evolving an n-qubit density matrix by applying operators only to the qubits they act
+    on, instead of embedding them as 4^n x 4^n superoperators.
+
+    The density matrix is kept as an n-index tensor of shape (2,) * 2n, where the first n axes are the row indices
+    and the last n axes the column indices of the qubits 0..n-1. Qubit 0 is the most significant one, which matches
+    Utilities.single_q_gate_for_n_q and the row-major vectorisation used by Utilities.make_liouville.
+    """
+
+    @staticmethod
+    def to_tensor(rho, n):
+        """
+        Reshape a density matrix (2^n x 2^n) or a vectorised state (4^n) into the n-index tensor form.
+
+        Args:
+            rho (np.array): The density matrix or its row-major vectorisation.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The density matrix as a tensor of shape (2,) * 2n.
+        """
+        return np.reshape(np.asarray(rho, dtype=complex), [2] * (2 * n))
+
+    @staticmethod
+    def to_matrix(rho, n):
+        """
+        Reshape an n-index tensor back into a 2^n x 2^n density matrix.
+
+        Args:
+            rho (np.array): The density matrix as a tensor of shape (2,) * 2n.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The 2^n x 2^n density matrix.
+        """
+        return np.reshape(rho, (2 ** n, 2 ** n))
+
+    @staticmethod
+    def apply_operator(rho, oper, qubits, n):
+        """
+        Compute oper * rho * oper^dagger for an operator acting on the given qubits only.
+
+        Args:
+            rho (np.array): The density matrix as a tensor of shape (2,) * 2n.
+            oper (np.array): The 2^k x 2^k operator, with qubits[0] as its most significant qubit.
+            qubits (list): The k qubits the operator acts on.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The transformed density matrix as a tensor of shape (2,) * 2n.
+        """
+        k = len(qubits)
+        oper = np.reshape(oper, [2] * (2 * k))
+        rows = list(qubits)
+        cols = [n + q for q in qubits]
+
+        rho = np.tensordot(oper, rho, axes=(list(range(k, 2 * k)), rows))
+        rho = np.moveaxis(rho, list(range(k)), rows)
+        rho = np.tensordot(np.conj(oper), rho, axes=(list(range(k, 2 * k)), cols))
+        return np.moveaxis(rho, list(range(k)), cols)
+
+    @staticmethod
+    def apply_kraus(rho, kraus, qubits, n):
+        """
+        Apply a channel given by its Kraus operators to the given qubits.
+
+        Args:
+            rho (np.array): The density matrix as a tensor of shape (2,) * 2n.
+            kraus (list): The Kraus operators of the channel.
+            qubits (list): The qubits the channel acts on.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The transformed density matrix as a tensor of shape (2,) * 2n.
+        """
+        result = DensityMatrixEngine.apply_operator(rho, kraus[0], qubits, n)
+        for k in kraus[1:]:
+            result = result + DensityMatrixEngine.apply_operator(rho, k, qubits, n)
+        return result
@@ -0,0 +1,120 @@
+import numpy as np
+from quantumFourierTransform import QuantumFourierTransform
+from densityMatrixEngine import DensityMatrixEngine
+from utilities import Utilities
+from cXGate import CXGate
+from zGate import ZGate
+
+
+class DensityMatrixFourierTransform(QuantumFourierTransform):
+    """
+    Density-matrix engine for the Quantum Fourier Transform (QFT) and its inverse.
+
+    Runs the same gate sequence as QuantumFourierTransform.compute_qft and compute_inverse_qft, with the same error
+    model, but evolves a 2^n x 2^n density matrix and applies every gate only to the qubits it acts on. Memory
+    therefore grows as 4^n instead of 16^n.
+    """
+
+    def apply_cx(self, rho, c, t, is_inverse, is_add_rc):
+        """
+        Apply the CNOT gate with coherent error and ADC, optionally dressed by RC gates, to a density matrix.
+
+        Args:
+            rho (np.array): The density matrix as a tensor of shape (2,) * 2n.
+            c (int): The control qubit.
+            t (int): The target qubit.
+            is_inverse (bool): Indicates if the gate belongs to the inverse circuit.
+            is_add_rc (bool): Indicates if the gate is dressed by Randomized Compiling gates.
+
+        Returns:
+            np.array: The transformed density matrix.
+        """
+        before, after = self.noisy_cx_unitaries(c, t, is_inverse)
+        if not is_add_rc:
+            return self.apply_noisy_cx(rho, before, after, c, t)
+
+        dressed_cx = 0
+        for i in range(CXGate.NUM_RC_CX):
+            ul = np.kron(Utilities.lr[i][CXGate.LEFT_RC], Utilities.lr[i][CXGate.RIGHT_RC])
+            ur = np.kron(Utilities.rr[i][CXGate.LEFT_RC], Utilities.rr[i][CXGate.RIGHT_RC])
+            dressed_cx = dressed_cx + self.apply_noisy_cx(rho, np.dot(before, ur), np.dot(ul, after), c, t)
+        return dressed_cx / CXGate.NUM_RC_CX
+
+    def noisy_cx_unitaries(self, c, t, is_inverse):
+        """
+        Return the 4x4 unitaries applied to the control and target qubits before and after the ADC of the CNOT.
+        The ordering is the one of CXGate.add_coherent_error: the error follows the ADC backward and precedes the
+        CNOT forward.
+        """
+        cx_obj = CXGate(self.n_qubits, c, t)
+        cx_obj.set_rotation_as_coherent_error(self.rot_cont_coh_error_cx, self.rot_uncont_coh_error_cx)
+        coh_err = cx_obj.local_coherent_error(is_inverse, self.controllable_coh_err, self.uncontrollable_coh_err)
+        if is_inverse:
+            return Utilities.cnot1, coh_err
+        return np.dot(Utilities.cnot1, coh_err), Utilities.I4
+
+    def apply_noisy_cx(self, rho, before, after, c, t):
+        """
+        Apply the unitary before the ADC, the ADC on both qubits and the unitary after it.
+        """
+        kraus = CXGate.adc_kraus(self.avg_two_qubit_error)
+        rho = DensityMatrixEngine.apply_operator(rho, before, [c, t], self.n_qubits)
+        rho = DensityMatrixEngine.apply_kraus(rho, kraus, [t], self.n_qubits)
+        rho = DensityMatrixEngine.apply_kraus(rho, kraus, [c], self.n_qubits)
+        return DensityMatrixEngine.apply_operator(rho, after, [c, t], self.n_qubits)
+
+    def apply_z(self, rho, rn, sign_rot, target):
+        """
+        Apply a Z-rotation to the target qubit of a density matrix.
+        """
+        return DensityMatrixEngine.apply_operator(rho, ZGate(1, rn, sign_rot, 0).get_matrix(), [target], self.n_qubits)
+
+    def apply_h(self, rho, target):
+        """
+        Apply a Hadamard gate to the target qubit of a density matrix.
+        """
+        return DensityMatrixEngine.apply_operator(rho, Utilities.H, [target], self.n_qubits)
+
+    def apply_gates_to_state(self, rho, t, c, rn, is_inverse, is_add_rc):
+        """
+        Apply the z-rotation, cx with error and ADC, followed by further z-rotations, to a density matrix.
+        The gate order is the one of QuantumFourierTransform.apply_gates.
+        """
+        if is_inverse:
+            rho = self.apply_z(rho, rn, -1, c)
+            rho = self.apply_cx(rho, c, t, is_inverse, is_add_rc)
+            rho = self.apply_z(rho, rn, +1, c)
+            rho = self.apply_cx(rho, c, t, is_inverse, is_add_rc)
+            return self.apply_z(rho, rn, -1, t)
+
+        rho = self.apply_z(rho, rn, +1, t)
+        rho = self.apply_cx(rho, c, t, is_inverse, is_add_rc)
+        rho = self.apply_z(rho, rn, -1, c)
+        rho = self.apply_cx(rho, c, t, is_inverse, is_add_rc)
+        return self.apply_z(rho, rn, +1, c)
+
+    def apply_qft(self, rho, is_add_rc):
+        """
+        Apply the Quantum Fourier Transform to a density matrix given as a tensor of shape (2,) * 2n.
+        """
+        for i, pairs in self.gate_table:
+            for c, rn in pairs:
+                rho = self.apply_gates_to_state(rho, i, c, rn, False, is_add_rc)
+            rho = self.apply_h(rho, i)
+        return rho
+
+    def apply_inverse_qft(self, rho, is_add_rc):
+        """
+        Apply the inverse Quantum Fourier Transform to a density matrix given as a tensor of shape (2,) * 2n.
+        """
+        for i, pairs in reversed(self.gate_table):
+            rho = self.apply_h(rho, i)
+            for c, rn in reversed(pairs):
+                rho = self.apply_gates_to_state(rho, i, c, rn, True, is_add_rc)
+        return rho
+
+    def apply_kik(self, rho, is_add_rc):
+        """
+        Apply the backward circuit after the forward circuit, i.e. the KIK operator, to a density matrix.
+        """
+        return self.apply_inverse_qft(self.apply_qft(rho, is_add_rc), is_add_rc)
@@ -0,0 +1,144 @@
+import numpy as np
+from kikCalculation import KikCalculation
+from densityMatrixEngine import DensityMatrixEngine
+from pauliTransferMatrix import PauliTransferMatrix
+from utilities import Utilities
+
+
+class DensityMatrixKikCalculation(KikCalculation):
+    """
+    Calculates the same four incoherent infidelities as KikCalculation, using a DensityMatrixFourierTransform
+    instead of full superoperators.
+
+    The Pauli-twirled quantities only need the PTM diagonal of the KIK operator on the Pauli strings that overlap
+    with rho_0, which is 2^n strings for a computational basis state. Each of them is obtained by applying the
+    KIK operator to the Pauli string as a density matrix: one application per string for the power of the twirl,
+    and order applications per string for the twirl of the powers. A general state has up to 4^n strings, so the
+    number of strings is limited by max_pauli_strings.
+
+    rho_0 is a single state; for several states, use one instance per state. The batch method evaluates the
+    parameter points one after the other by setting the errors of the circuit, so no superoperator is built.
+
+    Attributes:
+        max_pauli_strings (int): Largest number of Pauli strings of rho_0 the twirled quantities are computed for.
+    """
+
+    PAULI_BASIS = [Utilities.I, Utilities.X, Utilities.Y, Utilities.Z]
+    MAX_PAULI_STRINGS = 4096
+
+    def __init__(self, n, rho_0, obj_quantum_cir, max_pauli_strings=MAX_PAULI_STRINGS):
+        if np.ndim(rho_0) != 1:
+            raise ValueError("DensityMatrixKikCalculation takes a single initial state, not a stack of states")
+        super().__init__(n, rho_0, obj_quantum_cir)
+        self.rho_0_tensor = DensityMatrixEngine.to_tensor(rho_0, n)
+        self.max_pauli_strings = max_pauli_strings
+
+    def survival_probability(self, rho):
+        """Overlap of rho with rho_0, equal to np.dot(rho_0, rho) for the vectorised states."""
+        return np.sum(self.rho_0_tensor * rho)
+
+    def pauli_strings_of_initial_state(self):
+        """
+        Return the indices of the Pauli strings with a non-zero coefficient in rho_0, in the order of
+        PauliTransferMatrix.BASIS with qubit 0 as the most significant digit.
+        """
+        coefficients = PauliTransferMatrix.state_to_ptm(np.reshape(self.rho_0_tensor, 4 ** self.n), self.n)
+        support = np.flatnonzero(np.abs(coefficients) > 1e-12)
+        if len(support) > self.max_pauli_strings:
+            raise ValueError("rho_0 has %d Pauli strings, more than max_pauli_strings = %d; every string costs up to "
+                             "order KIK applications" % (len(support), self.max_pauli_strings))
+        return support
+
+    def pauli_string(self, index):
+        """Return the Pauli string of the given index as a tensor of shape (2,) * 2n."""
+        digits = [(index // 4 ** (self.n - 1 - q)) % 4 for q in range(self.n)]
+        return DensityMatrixEngine.to_tensor(Utilities.recursive_kron([self.PAULI_BASIS[d] for d in digits]), self.n)
+
+    def kik_twirled_survival_probabilities(self, order, is_twirl_of_powers):
+        """
+        Compute the survival probabilities after 0..order applications of the Pauli-twirled KIK operator.
+
+        Args:
+            order (int): Order of the expansion.
+            is_twirl_of_powers (bool): If True the k-th survival probability uses the twirl of the k-th power of the
+                KIK operator, otherwise the k-th power of the twirled KIK operator.
+
+        Returns:
+            list: The survival probabilities of order 0..order.
+        """
+        dim = 2 ** self.n
+        list_sp = [self.survival_probability(self.rho_0_tensor)] + [0] * order
+        for index in self.pauli_strings_of_initial_state():
+            sigma = self.pauli_string(index)
+            # rho_0 = sum_i c_i sigma_i / 2^n and each twirled term is scaled by the PTM diagonal d_i
+            weight = np.sum(np.conj(sigma) * self.rho_0_tensor) * self.survival_probability(sigma) / dim
+
+            k_sigma = sigma
+            for k in range(1, order + 1):
+                if is_twirl_of_powers or k == 1:
+                    k_sigma = self.obj_quantum_cir.apply_kik(k_sigma, False)
+                    d_k = np.sum(np.conj(sigma) * k_sigma) / dim
+                else:
+                    d_k = d_1 ** k
+                if k == 1:
+                    d_1 = d_k
+                list_sp[k] += d_k * weight
+        return list_sp
+
+    def kik_survival_probabilities(self, is_add_rc, order):
+        """
+        Compute the survival probabilities after 0..order applications of the KIK operator.
+        """
+        rho = self.rho_0_tensor
+        list_sp = [self.survival_probability(rho)]
+        for _ in range(order):
+            rho = self.obj_quantum_cir.apply_kik(rho, is_add_rc)
+            list_sp.append(self.survival_probability(rho))
+        return list_sp
+
+    def pauli_and_total_coh_error(self, order=2, context=None):
+        """
+        Calculate incoherent infidelity containing information about total coherent error and incoherent Pauli error.
+        """
+        return self.incoherent_infidelity(order, self.kik_survival_probabilities(True, order))
+
+    def pauli_and_unc_coh_error(self, order=2, context=None):
+        """
+        Calculate incoherent infidelity containing information about uncontrollable coherent errors and incoherent Pauli error.
+        """
+        return self.incoherent_infidelity(order, self.kik_twirled_survival_probabilities(order, False))
+
+    def pauli_error(self, order=2, context=None):
+        """
+        Calculate the incoherent infidelity containing information about incoherent Pauli error only.
+        """
+        return self.incoherent_infidelity(order, self.kik_twirled_survival_probabilities(order, True))
+
+    def native_error(self, order=2, context=None):
+        """
+        Calculate the incoherent infidelity of the native noise.
+        """
+        return self.incoherent_infidelity(order, self.kik_survival_probabilities(False, order))
+
+    def calculate_values_of_all_errors_batch(self, cont, uncont, p, order=2):
+        """
+        Calculate the four error quantities for many parameter points, one point after the other, restoring the
+        errors of the circuit afterwards.
+
+        :param cont: Controllable coherent errors (theta_A) of the points.
+        :param uncont: Uncontrollable coherent errors (theta_B) of the points.
+        :param p: Strengths p of the ADC of the points.
+        :param order: Order of the expansion.
+        :return: Arrays of controllable coherent error, uncontrollable coherent error, Pauli error and native error.
+        """
+        cont, uncont, p = np.broadcast_arrays(np.atleast_1d(cont), np.atleast_1d(uncont), np.atleast_1d(p))
+        circuit = self.obj_quantum_cir
+        saved = (circuit.controllable_coh_err_cx, circuit.uncontrollable_coh_err_cx, circuit.two_qubit_error)
+        values = [], [], [], []
+        try:
+            for a, b, p_ in zip(cont.ravel(), uncont.ravel(), p.ravel()):
+                circuit.controllable_coh_err_cx, circuit.uncontrollable_coh_err_cx, circuit.two_qubit_error = a, b, p_
+                self.calculate_values_of_all_errors(*values, order=order)
+        finally:
+            circuit.controllable_coh_err_cx, circuit.uncontrollable_coh_err_cx, circuit.two_qubit_error = saved
+        return tuple(np.reshape(np.array(v), cont.shape) for v in values)
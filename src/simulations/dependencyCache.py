@@ -0,0 +1,67 @@
+import numpy as np
+
+
+class DependencyCache:
+    """
+    Cache of intermediates that each depend on a subset of the error parameters.
+
+    Every entry records the names and values of the parameters it was built from. It is reused as long as these
+    values are unchanged, so changing one parameter only rebuilds the entries that depend on it, and an entry can
+    never be stale even when a parameter is changed without going through a setter. invalidate drops the entries
+    depending on a parameter right away, which setters use to free their memory early. Stored arrays are made
+    read-only, since the same object is handed out to every caller.
+
+    Attributes:
+        builds (int): Number of entries built.
+        reuses (int): Number of lookups served from the cache.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.builds = 0
+        self.reuses = 0
+
+    def get_or_build(self, key, dependencies, parameters, builder):
+        """
+        Return the entry stored under key if its dependencies still have the same values, building it otherwise.
+
+        Args:
+            key (tuple): Hashable description of the intermediate.
+            dependencies (tuple): Names of the parameters the intermediate depends on.
+            parameters (dict): Current scalar value of every parameter.
+            builder (callable): Function without arguments returning the intermediate.
+
+        Returns:
+            The intermediate.
+        """
+        values = tuple(parameters[name] for name in dependencies)
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] == values:
+            self.reuses += 1
+            return entry[2]
+
+        value = builder()
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        self.entries[key] = (dependencies, values, value)
+        self.builds += 1
+        return value
+
+    def invalidate(self, parameter):
+        """Drop every entry depending on the given parameter."""
+        self.entries = {key: entry for key, entry in self.entries.items() if parameter not in entry[0]}
+
+    def clear(self):
+        """Drop all entries and reset the statistics."""
+        self.entries = {}
+        self.builds = 0
+        self.reuses = 0
+
+    def stats(self):
+        """
+        Return the build/reuse statistics of the cache.
+
+        Returns:
+            dict: Builds, reuses and number of entries.
+        """
+        return {"builds": self.builds, "reuses": self.reuses, "entries": len(self.entries)}
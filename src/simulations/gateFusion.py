@@ -0,0 +1,47 @@
+class GateFusion:
+    """
+    Contains static methods for fusing a gate sequence into blocks of gates acting on few qubits, before any
+    superoperator is built.
+
+    Gates are tuples ('z', qubit, rn, sign_rot), ('h', qubit) and ('cx', control, target, is_inverse), in time
+    order. Consecutive gates are grouped greedily into blocks acting on at most max_qubits qubits. Each block is
+    later turned into one 4^k x 4^k superoperator, in which consecutive single-qubit gates and diagonal phases are
+    multiplied as 2^k x 2^k unitaries, and applied to the circuit with one local contraction instead of one full
+    4^n x 4^n product per gate.
+    """
+    MAX_QUBITS = 2
+
+    @staticmethod
+    def gate_qubits(gate):
+        """Return the qubits a gate acts on, the control first for a CNOT."""
+        if gate[0] == 'cx':
+            return [gate[1], gate[2]]
+        return [gate[1]]
+
+    @staticmethod
+    def fuse(sequence, max_qubits=MAX_QUBITS):
+        """
+        Group a gate sequence into blocks.
+
+        Args:
+            sequence (list): Gates in time order.
+            max_qubits (int): Maximum number of qubits of a block.
+
+        Returns:
+            list: Blocks (qubits, gates) in time order, with qubits in order of first use and gates a tuple of the
+            gates of the block in time order.
+        """
+        blocks = []
+        qubits, gates = [], []
+        for gate in sequence:
+            new_qubits = [q for q in GateFusion.gate_qubits(gate) if q not in qubits]
+            if gates and len(qubits) + len(new_qubits) > max_qubits:
+                blocks.append((tuple(qubits), tuple(gates)))
+                qubits, gates = [], []
+                new_qubits = GateFusion.gate_qubits(gate)
+            qubits += new_qubits
+            gates.append(gate)
+        if gates:
+            blocks.append((tuple(qubits), tuple(gates)))
+        return blocks
+
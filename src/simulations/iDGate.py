@@ -1,6 +1,7 @@
 import numpy as np
 from quantumGate import QuantumGate
 from utilities import Utilities
+from pauliTransferMatrix import PauliTransferMatrix
 
 
 class IDGate(QuantumGate):
@@ -16,14 +17,15 @@ class IDGate(QuantumGate):
     Attributes:
         n_qubits (int): The number of qubits in the quantum system.
     """
-    def __init__(self, n_qubits):
+    def __init__(self, n_qubits, is_sparse=False):
         """
         Initializes the IDGate class with a given number of qubits.
 
         Args:
             n_qubits (int): The number of qubits.
+            is_sparse (bool): Whether the gate is built as scipy.sparse matrices.
         """
-        super().__init__(n_qubits)
+        super().__init__(n_qubits, is_sparse)
 
     def get_matrix(self):
         """
@@ -32,11 +34,13 @@ class IDGate(QuantumGate):
         Returns:
             np.ndarray: The matrix representation of the identity gate.
         """
-        return Utilities.single_q_gate_for_n_q(0, self.n, Utilities.I)
+        return Utilities.single_q_gate_for_n_q(0, self.n, Utilities.I, self.is_sparse)
 
     def run_pauli_combinations(self, oper):
         """
         Compute the inverse operation in Liouville space for a given number 'n' of qubits.
+        This is the average of oper dressed by all 4^n Pauli strings, i.e. its Pauli twirl, which is evaluated in the
+        Pauli-transfer-matrix basis instead of summing the 4^n terms.
 
         Args:
             oper (np.ndarray): The quantum operator to compute the inverse operation on.
@@ -44,21 +48,7 @@ class IDGate(QuantumGate):
         Returns:
             np.ndarray: The inverse operation in Liouville space.
         """
-        init = Utilities.recursive_kron([Utilities.I] * self.n)
-        dressed_oper = np.dot(np.kron(init, init), 0)
-
-        def generate_pauli_combinations(depth, indices):
-            nonlocal dressed_oper
-            if depth == self.n:
-                combined_pauli = Utilities.recursive_kron([Utilities.pauli[i] for i in indices])
-                sig_b_L = Utilities.make_liouville(combined_pauli)
-                dressed_oper = dressed_oper + np.dot(np.dot(sig_b_L, oper), sig_b_L)
-                return
-            for i in range(4):
-                generate_pauli_combinations(depth + 1, indices + [i])
-
-        generate_pauli_combinations(0, [])
-        return np.dot(dressed_oper, 1 / (4 ** self.n))
+        return PauliTransferMatrix.twirl(oper, self.n)
 
     def dress_id_operator_by_rc_gates(self, oper, n):
         """
@@ -72,4 +62,4 @@ class IDGate(QuantumGate):
             np.ndarray: The dressed operator.
         """
         """Dress up the Identity gate with Randomised Compiling gates."""
-        return self.run_pauli_combinations(oper, n)
+        return self.run_pauli_combinations(oper)
@@ -1,8 +1,14 @@
+import numpy as np
+
 
 class InitialState:
     """
     Represents the initial state of a quantum system in Liouville space.
-    
+
+    States are returned as NumPy vectors of length 4^n, the row-major vectorisation of the density matrix, with
+    qubit 0 as the most significant bit. Several states are returned as a stack of shape (number of states, 4^n),
+    which KikCalculation evaluates together.
+
     Attributes:
         n_qubits (int): The number of qubits in the quantum system.
         size (int): The size of the quantum system's state vector.
@@ -10,7 +16,7 @@ class InitialState:
     def __init__(self, n_qubits):
         """
         Initializes the InitialState instance with the given number of qubits.
-        
+
         Args:
             n_qubits (int): The number of qubits in the quantum system.
         """
@@ -20,13 +26,13 @@ class InitialState:
     def generate_excited_state(self):
         """
         Generates the excited state of the quantum system.
-        
+
         Returns:
-            list: A vector representing the excited state of the quantum system.
+            np.ndarray: A vector representing the excited state of the quantum system.
         """
-        rho_0 = [0] * self.size
+        rho_0 = np.zeros(self.size)
 
-        # Set the last element of the list to 1 to represent the excited state
+        # Set the last element of the vector to 1 to represent the excited state
         rho_0[self.size - 1] = 1
 
         return rho_0
@@ -34,14 +40,69 @@ class InitialState:
     def generate_ground_state(self):
         """
         Generates the ground state of the quantum system.
-        
+
         Returns:
-            list: A vector representing the ground state of the quantum system.
+            np.ndarray: A vector representing the ground state of the quantum system.
         """
-        rho_0 = [0] * self.size
+        rho_0 = np.zeros(self.size)
 
-        # Set the first element of the list to 1 to represent the excited state
+        # Set the first element of the vector to 1 to represent the ground state
         rho_0[0] = 1
 
         return rho_0
 
+    def basis_index(self, bits):
+        """
+        Returns the index of a computational basis state.
+
+        Args:
+            bits (str, list or int): The bits of the state with qubit 0 first, e.g. '0101' or [0, 1, 0, 1], or
+                the index itself.
+
+        Returns:
+            int: The index of the basis state, between 0 and 2^n - 1.
+        """
+        if isinstance(bits, (int, np.integer)):
+            index = int(bits)
+        else:
+            bits = ''.join(str(int(bit)) for bit in bits)
+            if len(bits) != self.n or set(bits) - {'0', '1'}:
+                raise ValueError("Basis state %r is not a string of %d bits" % (bits, self.n))
+            index = int(bits, 2)
+        if not 0 <= index < 2 ** self.n:
+            raise ValueError("Basis state index %d out of range for %d qubits" % (index, self.n))
+        return index
+
+    def generate_basis_state(self, bits):
+        """
+        Generates the projector onto a computational basis state, a product of |0> and |1> states.
+
+        Args:
+            bits (str, list or int): The basis state, as accepted by basis_index.
+
+        Returns:
+            np.ndarray: A vector representing the basis state.
+        """
+        return self.generate_basis_states([bits])[0]
+
+    def generate_basis_states(self, states=None):
+        """
+        Generates a stack of computational basis states.
+
+        Args:
+            states (list): The basis states, as accepted by basis_index. All 2^n basis states in the order of their
+                index by default.
+
+        Returns:
+            np.ndarray: Array of shape (number of states, 4^n) with one state per row.
+        """
+        if states is None:
+            indices = np.arange(2 ** self.n)
+        else:
+            indices = np.array([self.basis_index(bits) for bits in states], dtype=int)
+        rho_0 = np.zeros((len(indices), self.size))
+
+        # |j><j| is the diagonal element (j, j) of the 2^n x 2^n density matrix
+        rho_0[np.arange(len(indices)), indices * (2 ** self.n + 1)] = 1
+
+        return rho_0
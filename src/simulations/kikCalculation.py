@@ -1,8 +1,9 @@
 import numpy as np
-from sympy import factorial
-from iDGate import IDGate
-import matplotlib.pyplot as plt
-import matplotlib.ticker as tck
+import scipy.sparse as sp
+from utilities import Utilities
+from pauliTransferMatrix import PauliTransferMatrix
+from circuitEvaluationContext import CircuitEvaluationContext
+from profiler import Profiler
 
 
 # Color parameters
@@ -17,26 +18,38 @@ class KikCalculation:
     A class to represent a quantum circuit for calculating Four types of errors
     total coherent errors (controllable and uncontrollable) and incoherent Pauli errors and native error.
     """
+    # Coefficient tables of the series expansion, by order
+    COEFFICIENTS = {}
 
     def __init__(self, n, rho_0, obj_quantum_cir):
         """
         Initializes a new instance of the QuantumCircuit class.
 
         :param n: Number of qubits.
-        :param rho_0: Initial state.
+        :param rho_0: Initial state of length 4^n, or a stack of states of shape (number of states, 4^n) as made by
+                      InitialState.generate_basis_states. For a stack, every survival probability and error quantity
+                      gets a trailing axis with one value per state.
         :param obj_quantum_cir: The quantum circuit implementation object.
         """
         self.n = n
         self.rho_0 = rho_0
         self.obj_quantum_cir = obj_quantum_cir
+        self.evaluation_context = None
+
+    @staticmethod
+    def coefficient_table(order):
+        """
+        Compute all coefficients of the series expansion of the given order as a NumPy array.
+        (n!)^2 / ((n-k)! (n+k)!) is accumulated as a running product, so no factorials are formed.
+        """
+        k = np.arange(1, order + 1)
+        ratios = np.cumprod((order - k + 1) / (order + k))
+        signs = np.where(k % 2 == 0, 1.0, -1.0)
+        return np.concatenate(([2 - (1 / order)], signs * (2 * (2 * order - 1) / order) * ratios))
 
     def co_(self, n, k):
         """Compute coefficients for the series expansion."""
-        if k == 0:
-            return 2 - (1 / n)
-        else:
-            g = (-1) ** k * (2 * (2 * n - 1) / n) * (factorial(n) ** 2) / (factorial(n - k) * factorial(n + k))
-            return float(g)
+        return float(self.COEFFICIENTS.setdefault(n, self.coefficient_table(n))[k])
 
     # list_sp : list of survival of probabilities
     # order : order of incoherent infidelity
@@ -52,62 +65,114 @@ class KikCalculation:
         if len(list_sp) < order + 1:
             raise ValueError("list_sp doesn't have enough values for the given order")
 
-        inc_inf = sum(self.co_(order, i) * list_sp[i] for i in range(order + 1))
+        coefficients = self.COEFFICIENTS.setdefault(order, self.coefficient_table(order))
+        inc_inf = sum(coefficients[i] * list_sp[i] for i in range(order + 1))
         return inc_inf
 
-    def pauli_and_total_coh_error(self):
+    def initial_state(self, oper):
+        """
+        Return rho_0 in the precision of oper, so a single precision operator is applied in single precision.
+        A real rho_0 is cast to the real type of oper and a complex one to the complex type of oper, so the imaginary
+        part of a complex initial state is kept.
+
+        :param oper: The KIK operator in Liouville space, or a stack of them.
+        :return: rho_0 as a NumPy array.
+        """
+        rho_0 = np.asarray(self.rho_0)
+        if np.iscomplexobj(rho_0):
+            return rho_0.astype(np.result_type(oper.dtype, np.complex64), copy=False)
+        return rho_0.astype(np.finfo(oper.dtype).dtype, copy=False)
+
+    @Profiler.profiled('kik.survival_probabilities')
+    def survival_probabilities(self, oper, order):
+        """
+        Compute the survival probabilities of rho_0 after 0..order applications of oper.
+        oper is applied to the state repeatedly, so no power of oper is ever formed. A stack of operators gives a
+        stack of survival probabilities. The states of a stacked rho_0 are the columns of one matrix, so every
+        application of oper is a single matrix-matrix product for all of them.
+
+        :param oper: The KIK operator in Liouville space as a dense or sparse matrix, or a stack of them.
+        :param order: Order of the expansion.
+        :return: List of order + 1 survival probabilities.
+        """
+        rho_0 = self.initial_state(oper)
+        columns = rho_0.T if rho_0.ndim > 1 else rho_0[:, None]
+        rho = columns
+        list_sp = [np.sum(rho_0 * rho_0, axis=-1)]
+        for _ in range(order):
+            rho = oper @ rho if sp.issparse(oper) else np.matmul(oper, rho)
+            overlaps = np.sum(rho * columns, axis=-2)
+            list_sp.append(overlaps if rho_0.ndim > 1 else overlaps[..., 0])
+        return list_sp
+
+    @Profiler.profiled('kik.twirled_survival_probabilities')
+    def twirled_survival_probabilities(self, oper, order, is_twirl_of_powers):
+        """
+        Compute the survival probabilities of rho_0 for the Pauli-twirled KIK operator in the PTM basis.
+        Only the Pauli strings present in rho_0 contribute, so only their PTM diagonals are computed. For a stack of
+        states these are the strings present in any of them, and all states are weighted in one matrix product.
+
+        :param oper: The KIK operator in Liouville space, or a stack of them.
+        :param order: Order of the expansion.
+        :param is_twirl_of_powers: If True the k-th probability uses the twirl of oper^k, otherwise the k-th power of
+                                   the twirl of oper.
+        :return: List of order + 1 survival probabilities.
+        """
+        oper = Utilities.to_dense(oper)
+        rho_0 = self.initial_state(oper)
+        coefficients = PauliTransferMatrix.state_to_ptm(rho_0, self.n)
+        support = np.flatnonzero(np.any(np.abs(np.atleast_2d(coefficients)) > 1e-12, axis=0))
+        # rho_0 . rho_k = sum_i conj(w_i) d_i r_i with w the Pauli coefficients of conj(rho_0)
+        weights = (np.conj(PauliTransferMatrix.state_to_ptm(np.conj(rho_0), self.n)[..., support])
+                   * coefficients[..., support])
+
+        if is_twirl_of_powers:
+            diagonals = PauliTransferMatrix.twirl_power_diagonals(oper, self.n, order, support)
+        else:
+            diagonal = PauliTransferMatrix.twirl_diagonal(oper, self.n)[..., support]
+            diagonals = [diagonal ** k for k in range(1, order + 1)]
+        return [np.sum(rho_0 * rho_0, axis=-1)] + [np.matmul(d, weights.T) for d in diagonals]
+
+    @Profiler.profiled('kik.pauli_and_total_coh_error')
+    def pauli_and_total_coh_error(self, order=2, context=None):
         """
         Calculate incoherent infidelity containing information about total coherent error and incoherent Pauli error.
         """
-        combined_rc = np.dot(self.obj_quantum_cir.backward_circuit_with_rc(), self.obj_quantum_cir.forward_circuit_with_rc())
-        squared_combined_rc = np.dot(combined_rc, combined_rc)
-        rho_1 = np.dot(combined_rc, self.rho_0)
-        rho_2 = np.dot(squared_combined_rc, self.rho_0)
-        return self.incoherent_infidelity(2, [np.dot(self.rho_0, self.rho_0), np.dot(self.rho_0, rho_1), np.dot(self.rho_0, rho_2)])
+        combined_rc = (context or CircuitEvaluationContext(self.obj_quantum_cir)).kik_operator(True)
+        return self.incoherent_infidelity(order, self.survival_probabilities(combined_rc, order))
 
-    def pauli_and_unc_coh_error(self):
+    @Profiler.profiled('kik.pauli_and_unc_coh_error')
+    def pauli_and_unc_coh_error(self, order=2, context=None):
         """
         Calculate incoherent infidelity containing information about uncontrollable coherent errors and incoherent Pauli error.
         """
-        combined = np.dot(self.obj_quantum_cir.backward_circuit(), self.obj_quantum_cir.forward_circuit())
-        rc_uiu = IDGate(self.n).run_pauli_combinations(combined)
-        squared_rc_uiu = np.dot(rc_uiu, rc_uiu)
-        rho_1 = np.dot(rc_uiu, self.rho_0)
-        rho_2 = np.dot(squared_rc_uiu, self.rho_0)
-        return self.incoherent_infidelity(2, [np.dot(self.rho_0, self.rho_0), np.dot(self.rho_0, rho_1), np.dot(self.rho_0, rho_2)])
+        combined = (context or CircuitEvaluationContext(self.obj_quantum_cir)).kik_operator(False)
+        return self.incoherent_infidelity(order, self.twirled_survival_probabilities(combined, order, False))
 
-    def pauli_error(self):
+    @Profiler.profiled('kik.pauli_error')
+    def pauli_error(self, order=2, context=None):
         """
         Calculate the incoherent infidelity containing information about incoherent Pauli error only.
         """
-        combined = np.dot(self.obj_quantum_cir.backward_circuit(), self.obj_quantum_cir.forward_circuit())
-        squared_combined = np.dot(combined, combined)
-
-        rc_uiu = IDGate(self.n).run_pauli_combinations(combined)
-        squared_rc_uiu = IDGate(self.n).run_pauli_combinations(squared_combined)
-
-        rho_1 = np.dot(rc_uiu, self.rho_0)
-        rho_2 = np.dot(squared_rc_uiu, self.rho_0)
+        combined = (context or CircuitEvaluationContext(self.obj_quantum_cir)).kik_operator(False)
+        return self.incoherent_infidelity(order, self.twirled_survival_probabilities(combined, order, True))
 
-        return self.incoherent_infidelity(2, [np.dot(self.rho_0, self.rho_0), np.dot(self.rho_0, rho_1), np.dot(self.rho_0, rho_2)])
-
-    def native_error(self):
+    @Profiler.profiled('kik.native_error')
+    def native_error(self, order=2, context=None):
         """
         Calculate the incoherent infidelity of the native noise.
         """
-        combined = np.dot(self.obj_quantum_cir.backward_circuit(), self.obj_quantum_cir.forward_circuit())
-        squared_combined = np.dot(combined, combined)
-
-        rho_1 = np.dot(combined, self.rho_0)
-        rho_2 = np.dot(squared_combined, self.rho_0)
-
-        return self.incoherent_infidelity(2, [np.dot(self.rho_0, self.rho_0), np.dot(self.rho_0, rho_1), np.dot(self.rho_0, rho_2)])
-
-    def calculate_values_of_all_errors(self, snA1, snA2, snA3, snA4):
-        A1 = self.pauli_and_total_coh_error()
-        A2 = self.pauli_and_unc_coh_error()
-        A3 = self.pauli_error()
-        A4 = self.native_error()
+        combined = (context or CircuitEvaluationContext(self.obj_quantum_cir)).kik_operator(False)
+        return self.incoherent_infidelity(order, self.survival_probabilities(combined, order))
+
+    @Profiler.profiled('kik.calculate_values_of_all_errors')
+    def calculate_values_of_all_errors(self, snA1, snA2, snA3, snA4, order=2):
+        # The four quantities share the RC and non-RC KIK operators of this parameter point
+        self.evaluation_context = CircuitEvaluationContext(self.obj_quantum_cir)
+        A1 = self.pauli_and_total_coh_error(order, self.evaluation_context)
+        A2 = self.pauli_and_unc_coh_error(order, self.evaluation_context)
+        A3 = self.pauli_error(order, self.evaluation_context)
+        A4 = self.native_error(order, self.evaluation_context)
 
         snA1.append(A1 - (A3 / 2) - (A2 / 2))
         snA2.append((A2 - A3) / 2)
@@ -116,30 +181,48 @@ class KikCalculation:
 
         return snA1, snA2, snA3, snA4
 
+    @Profiler.profiled('kik.calculate_values_of_all_errors_batch')
+    def calculate_values_of_all_errors_batch(self, cont, uncont, p, order=2):
+        """
+        Calculate the four error quantities of calculate_values_of_all_errors for many parameter points at once.
+        The circuits of all points are built as stacked superoperators, so the sweep costs a few batched matrix
+        products instead of one circuit build per point.
+
+        :param cont: Controllable coherent errors (theta_A) of the points.
+        :param uncont: Uncontrollable coherent errors (theta_B) of the points.
+        :param p: Strengths p of the ADC of the points.
+        :param order: Order of the expansion.
+        :return: Arrays of controllable coherent error, uncontrollable coherent error, Pauli error and native error.
+        """
+        cont, uncont, p = np.broadcast_arrays(np.atleast_1d(cont), np.atleast_1d(uncont), np.atleast_1d(p))
+
+        combined_rc = np.matmul(self.obj_quantum_cir.backward_circuit_batch(cont, uncont, p, True),
+                                self.obj_quantum_cir.forward_circuit_batch(cont, uncont, p, True))
+        combined = np.matmul(self.obj_quantum_cir.backward_circuit_batch(cont, uncont, p),
+                             self.obj_quantum_cir.forward_circuit_batch(cont, uncont, p))
+
+        A1 = self.incoherent_infidelity(order, self.survival_probabilities(combined_rc, order))
+        A2 = self.incoherent_infidelity(order, self.twirled_survival_probabilities(combined, order, False))
+        A3 = self.incoherent_infidelity(order, self.twirled_survival_probabilities(combined, order, True))
+        A4 = self.incoherent_infidelity(order, self.survival_probabilities(combined, order))
+
+        return A1 - (A3 / 2) - (A2 / 2), (A2 - A3) / 2, A3, A4
+
     def plot_controllable_and_uncontrollable_coh_vs_pauli_and_native_errors(self):
         """
         Plot the relation between strength of coherent errors and incoherent infidelity.
         In this case the strength of p of ADC is constant.
         """
+        # Imported here, so computing the errors does not load matplotlib
+        import matplotlib.pyplot as plt
+        import matplotlib.ticker as tck
+
         f, ax = plt.subplots(figsize=(10, 5))
-        print(self.obj_quantum_cir.two_qubit_error)
         max_ang = self.obj_quantum_cir.uncontrollable_coh_err_cx * np.pi
         A_x = np.linspace(0, max_ang, 20)
 
-        snA1, snA2, snA3, snA4, snAa1, snAa2 = [], [], [], [], [], []
-
-        for a in A_x:
-
-            self.obj_quantum_cir.controllable_coh_err_cx = pow(max_ang - a, 1)
-            self.obj_quantum_cir.uncontrollable_coh_err_cx = a
-
-            A1 = self.pauli_and_total_coh_error()
-            A2 = self.pauli_and_unc_coh_error()
-
-            snA1, snA2, snA3, snA4 = self.calculate_values_of_all_errors(snA1, snA2, snA3, snA4)
-
-            snAa1.append(A1)
-            snAa2.append(A2)
+        snA1, snA2, snA3, snA4 = self.calculate_values_of_all_errors_batch(pow(max_ang - A_x, 1), A_x,
+                                                                           self.obj_quantum_cir.two_qubit_error)
 
         ax.plot(A_x / np.pi, snA1,
                 label="Controlled CoError (" + r"$\theta_A$=" + str(max_ang/np.pi) + r"$\pi$-" + r"$\theta_B$)", color=COLOR[1],
@@ -168,14 +251,16 @@ class KikCalculation:
 
     def plot_pauli_and_native_vs_coh_errors(self):
 
+        # Imported here, so computing the errors does not load matplotlib
+        import matplotlib.pyplot as plt
+        import matplotlib.ticker as tck
+
         f, ax = plt.subplots(figsize=(10, 5))
         p_adc = np.linspace(0, self.obj_quantum_cir.two_qubit_error, 20)
 
-        snA1, snA2, snA3, snA4 = [], [], [], []
-
-        for p_ in p_adc:
-            self.obj_quantum_cir.two_qubit_error = p_
-            snA1, snA2, snA3, snA4 = self.calculate_values_of_all_errors(snA1, snA2, snA3, snA4)
+        snA1, snA2, snA3, snA4 = self.calculate_values_of_all_errors_batch(self.obj_quantum_cir.controllable_coh_err_cx,
+                                                                           self.obj_quantum_cir.uncontrollable_coh_err_cx,
+                                                                           p_adc)
 
         ax.plot(p_adc, snA1, label="Controlled CoError(" + r"$\theta_A$) = " + str(np.round(self.obj_quantum_cir.controllable_coh_err_cx/np.pi, 3)) + "$\pi$",
                 color=COLOR[1], markersize=28, linestyle='solid', linewidth=3)
@@ -1,21 +1,126 @@
-from kikCalculation import KikCalculation
-from initialState import InitialState
-from quantumFourierTransform import QuantumFourierTransform
+import sys
+import csv
+import argparse
+import numpy as np
+
+# The simulation modules are imported in the functions using them, so spawned worker processes, which re-import
+# this module, start without loading them twice; matplotlib is only imported when a plot is requested.
+
+COLUMNS = ['n', 'cont', 'uncont', 'p', 'state', 'A1', 'A2', 'A3', 'A4']
+PRECISIONS = {'double': np.complex128, 'single': np.complex64}
+
+
+def sweep_range(values):
+    """
+    Turn a command line range into the list of its values: a single value, or START STOP NUM as in np.linspace.
+    """
+    if len(values) == 1:
+        return [values[0]]
+    if len(values) == 3:
+        return list(np.linspace(values[0], values[1], int(values[2])))
+    raise ValueError("Expected VALUE or START STOP NUM, got " + str(values))
+
+
+def parse_arguments(argv=None):
+    from quantumFourierTransform import QuantumFourierTransform
+
+    parser = argparse.ArgumentParser(description="Compute the KIK error decomposition A1-A4 of the noisy QFT over a "
+                                                 "sweep of error parameters.")
+    parser.add_argument('--n', nargs='+', type=int, default=[2], help="Numbers of qubits.")
+    parser.add_argument('--cont', nargs='+', type=float,
+                        default=[QuantumFourierTransform.CONTROLLABLE_COHERENT_ERROR_CX],
+                        help="Controllable coherent error theta_A: VALUE or START STOP NUM.")
+    parser.add_argument('--uncont', nargs='+', type=float,
+                        default=[QuantumFourierTransform.UNCONTROLLABLE_COHERENT_ERROR_CX],
+                        help="Uncontrollable coherent error theta_B: VALUE or START STOP NUM.")
+    parser.add_argument('--p', nargs='+', type=float, default=[QuantumFourierTransform.AVG_TWO_QUBIT_ERROR],
+                        help="Strength p of the ADC: VALUE or START STOP NUM.")
+    parser.add_argument('--state', nargs='+', default=['excited'],
+                        help="Initial states: excited, ground, a basis state as bits with qubit 0 first, e.g. 01, or "
+                             "basis for all basis states.")
+    parser.add_argument('--output', help="Output file, .csv or .npz. Without it a CSV table is printed.")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes.")
+    parser.add_argument('--chunk-size', type=int, default=8, help="Number of sweep points evaluated together.")
+    parser.add_argument('--precision', choices=list(PRECISIONS), default='double',
+                        help="Precision of the superoperators, complex128 (double) or complex64 (single).")
+    parser.add_argument('--check-precision', action='store_true',
+                        help="Report the deviation of single from double precision for the given n at the first "
+                             "sweep point, instead of running the sweep.")
+    parser.add_argument('--trace', help="Write a Chrome trace of the run to this file. The profiler only records "
+                                        "in-process, so it needs --workers 1.")
+    parser.add_argument('--plot', choices=['coherent', 'incoherent'],
+                        help="Show one of the original plots for the first n instead of running the sweep.")
+    args = parser.parse_args(argv)
+    if args.trace and args.workers > 1:
+        parser.error("--trace records the calling process only, so it cannot be combined with --workers > 1")
+    return args
+
+
+def write_results(path, points, values):
+    """
+    Write the sweep points and their A1-A4 values to a .npz file or as CSV to a path or stream.
+    """
+    if isinstance(path, str) and path.endswith('.npz'):
+        columns = list(zip(*points))
+        np.savez(path, n=np.array(columns[0]), cont=np.array(columns[1]), uncont=np.array(columns[2]),
+                 p=np.array(columns[3]), state=np.array(columns[4]), A1=values[:, 0], A2=values[:, 1],
+                 A3=values[:, 2], A4=values[:, 3])
+        return
+
+    file = open(path, 'w', newline='') if isinstance(path, str) else path
+    try:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        for point, value in zip(points, values):
+            writer.writerow(list(point) + [repr(float(v)) for v in value])
+    finally:
+        if file is not path:
+            file.close()
+
+
+def plot(args):
+    from kikCalculation import KikCalculation
+    from initialState import InitialState
+    from quantumFourierTransform import QuantumFourierTransform
+
+    n_qubits = args.n[0]
+    rho_0 = InitialState(n_qubits).generate_excited_state()
+    kik_obj = KikCalculation(n_qubits, rho_0, QuantumFourierTransform(n_qubits))
+    if args.plot == 'coherent':
+        # Controllable and uncontrollable coherences versus the effects of Pauli and native errors
+        kik_obj.plot_controllable_and_uncontrollable_coh_vs_pauli_and_native_errors()
+    else:
+        # Pauli and native errors against coherence errors
+        kik_obj.plot_pauli_and_native_vs_coh_errors()
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    if args.plot:
+        plot(args)
+        return
+    if args.check_precision:
+        from precisionCheck import PrecisionCheck
+
+        check = PrecisionCheck(PRECISIONS['single'])
+        print(check.report(check.run(args.n, sweep_range(args.cont)[0], sweep_range(args.uncont)[0],
+                                     sweep_range(args.p)[0])))
+        return
+
+    from sweepRunner import SweepRunner
+    from profiler import Profiler
+
+    points = SweepRunner.make_grid(args.n, sweep_range(args.cont), sweep_range(args.uncont), sweep_range(args.p),
+                                   args.state)
+    if args.trace:
+        Profiler.enable(n=args.n, cont=args.cont, uncont=args.uncont, p=args.p, state=args.state)
+    runner = SweepRunner(max_workers=args.workers, chunk_size=args.chunk_size, dtype=PRECISIONS[args.precision])
+    values = runner.run(points)
+    if args.trace:
+        Profiler.disable()
+        Profiler.write_chrome_trace(args.trace)
+    write_results(args.output or sys.stdout, points, values)
+
 
 if __name__ == '__main__':
-    # Define the number of qubits to be used in the calculations
-    n_qubits = 2
-    
-    # Instantiate the KikCalculation class:
-    # 1. Specify the number of qubits.
-    # 2. Generate the initial excited state.
-    # 3. Apply the Quantum Fourier Transform.
-    kik_obj = KikCalculation(n_qubits, InitialState(n_qubits).generate_excited_state(), QuantumFourierTransform(n_qubits))
-
-    # Plot the comparison between controllable and uncontrollable coherences 
-    # versus the effects of Pauli and native errors.
-    kik_obj.plot_controllable_and_uncontrollable_coh_vs_pauli_and_native_errors()
-
-    # Uncomment the next line to plot the comparison of Pauli and native errors 
-    # against coherence errors.
-    # kik_obj.plot_pauli_and_native_vs_coh_errors()
+    main()
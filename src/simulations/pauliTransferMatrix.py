@@ -0,0 +1,221 @@
+import numpy as np
+from utilities import Utilities
+from profiler import Profiler
+
+
+class PauliTransferMatrix:
+    """
+    Contains static methods for moving superoperators between the Liouville representation used by the gate classes
+    and the Pauli-transfer-matrix (PTM) representation, and for Pauli twirling in the PTM basis.
+
+    The Liouville representation follows Utilities.make_liouville, i.e. vec(rho) is the row-major flattening of rho and
+    qubit 0 is the most significant one. The PTM is taken in the orthonormal basis sigma / sqrt(2) per qubit, so the
+    change of basis is unitary and a Pauli twirl keeps exactly the diagonal of the PTM.
+
+    All methods accept stacks of operators or states, with the batch axes leading.
+
+    Constants:
+        BASIS : 4x4 matrix whose columns are the normalised, vectorised single-qubit Paulis I, X, Y, Z.
+    """
+    BASIS = np.array([m.flatten() for m in [Utilities.I, Utilities.X, Utilities.Y, Utilities.Z]]).T / np.sqrt(2)
+
+    @staticmethod
+    def _apply_on_axis(tensor, matrix, axis):
+        """
+        Contract a 4x4 matrix with one axis of a tensor.
+
+        Args:
+            tensor (np.array): The tensor to transform.
+            matrix (np.array): The matrix acting on the given axis.
+            axis (int): The axis of the tensor, counted from the end (negative) so batch axes are left alone.
+
+        Returns:
+            np.array: The transformed tensor, with the axis kept in place.
+        """
+        # The basis is cast to the precision of the tensor, so single precision operators stay single precision
+        matrix = np.asarray(matrix, dtype=np.result_type(tensor.dtype, np.complex64))
+        return np.moveaxis(np.tensordot(matrix, tensor, axes=([1], [axis])), 0, axis)
+
+    @staticmethod
+    def _to_pairs(oper, n, n_sides):
+        """
+        Reshape a Liouville vector (n_sides=1) or matrix (n_sides=2) so that every axis is the (row, column) pair of
+        a single qubit.
+        """
+        oper = np.asarray(oper)
+        batch = oper.shape[:oper.ndim - n_sides]
+        tensor = np.reshape(oper, batch + (2,) * (2 * n * n_sides))
+        order = list(range(len(batch)))
+        for side in range(n_sides):
+            for q in range(n):
+                order += [len(batch) + 2 * n * side + q, len(batch) + 2 * n * side + n + q]
+        return np.reshape(np.transpose(tensor, order), batch + (4,) * (n * n_sides))
+
+    @staticmethod
+    def _from_pairs(tensor, n, n_sides):
+        """
+        Inverse of _to_pairs, returning the Liouville vector or matrix.
+        """
+        batch = tensor.shape[:tensor.ndim - n * n_sides]
+        tensor = np.reshape(tensor, batch + (2,) * (2 * n * n_sides))
+        order = list(range(len(batch)))
+        for side in range(n_sides):
+            offset = len(batch) + 2 * n * side
+            order += [offset + 2 * q for q in range(n)] + [offset + 2 * q + 1 for q in range(n)]
+        return np.reshape(np.transpose(tensor, order), batch + (4 ** n,) * n_sides)
+
+    @staticmethod
+    def liouville_to_ptm(oper, n):
+        """
+        Convert a superoperator from the Liouville representation to the PTM representation.
+
+        Args:
+            oper (np.array): The 4^n x 4^n Liouville matrix.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The 4^n x 4^n Pauli transfer matrix.
+        """
+        tensor = PauliTransferMatrix._to_pairs(oper, n, 2)
+        basis = PauliTransferMatrix.BASIS
+        for q in range(n):
+            tensor = PauliTransferMatrix._apply_on_axis(tensor, np.conj(basis.T), q - 2 * n)
+            tensor = PauliTransferMatrix._apply_on_axis(tensor, basis.T, q - n)
+        return np.reshape(tensor, tensor.shape[:tensor.ndim - 2 * n] + (4 ** n, 4 ** n))
+
+    @staticmethod
+    def ptm_to_liouville(ptm, n):
+        """
+        Convert a superoperator from the PTM representation back to the Liouville representation.
+
+        Args:
+            ptm (np.array): The 4^n x 4^n Pauli transfer matrix.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The 4^n x 4^n Liouville matrix.
+        """
+        ptm = np.asarray(ptm)
+        tensor = np.reshape(ptm, ptm.shape[:-2] + (4,) * (2 * n))
+        basis = PauliTransferMatrix.BASIS
+        for q in range(n):
+            tensor = PauliTransferMatrix._apply_on_axis(tensor, basis, q - 2 * n)
+            tensor = PauliTransferMatrix._apply_on_axis(tensor, np.conj(basis), q - n)
+        return PauliTransferMatrix._from_pairs(tensor, n, 2)
+
+    @staticmethod
+    def state_to_ptm(rho, n):
+        """
+        Convert a vectorised state from the Liouville representation to its Pauli coefficients.
+
+        Args:
+            rho (np.array): The state vector of length 4^n.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The Pauli coefficients of the state.
+        """
+        tensor = PauliTransferMatrix._to_pairs(rho, n, 1)
+        for q in range(n):
+            tensor = PauliTransferMatrix._apply_on_axis(tensor, np.conj(PauliTransferMatrix.BASIS.T), q - n)
+        return np.reshape(tensor, tensor.shape[:tensor.ndim - n] + (4 ** n,))
+
+    @staticmethod
+    def ptm_to_state(coefficients, n):
+        """
+        Convert Pauli coefficients of a state back to the vectorised Liouville representation.
+
+        Args:
+            coefficients (np.array): The Pauli coefficients of length 4^n.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The state vector of length 4^n.
+        """
+        coefficients = np.asarray(coefficients)
+        tensor = np.reshape(coefficients, coefficients.shape[:-1] + (4,) * n)
+        for q in range(n):
+            tensor = PauliTransferMatrix._apply_on_axis(tensor, PauliTransferMatrix.BASIS, q - n)
+        return PauliTransferMatrix._from_pairs(tensor, n, 1)
+
+    @staticmethod
+    @Profiler.profiled('ptm.twirl_diagonal')
+    def twirl_diagonal(oper, n, power=1):
+        """
+        Compute the Pauli twirl of oper^power. The twirl keeps only the diagonal of the PTM, so this is all that is
+        returned.
+
+        Args:
+            oper (np.array): The 4^n x 4^n Liouville matrix.
+            n (int): Total number of qubits.
+            power (int): Power of the operator to twirl, 1 or 2.
+
+        Returns:
+            np.array: The diagonal of the twirled channel in the PTM basis.
+        """
+        ptm = PauliTransferMatrix.liouville_to_ptm(oper, n)
+        if power == 1:
+            return np.diagonal(ptm, axis1=-2, axis2=-1).copy()
+        if power == 2:
+            # diag(R R)_i = sum_j R_ij R_ji, no need for the full product
+            return np.sum(ptm * np.swapaxes(ptm, -1, -2), axis=-1)
+        raise ValueError("power must be 1 or 2")
+
+    @staticmethod
+    @Profiler.profiled('ptm.twirl_power_diagonals')
+    def twirl_power_diagonals(oper, n, order, indices=None):
+        """
+        Compute the PTM diagonals of the Pauli twirls of oper^k for k = 1..order, restricted to the given Pauli
+        strings. Only the rows of the powers that are needed are propagated, one row-block times PTM product per order.
+
+        Args:
+            oper (np.array): The 4^n x 4^n Liouville matrix.
+            n (int): Total number of qubits.
+            order (int): Highest power of the operator.
+            indices (np.array): Indices of the Pauli strings to keep, all of them by default.
+
+        Returns:
+            list: The diagonals of the twirls of oper^1 .. oper^order on the given Pauli strings.
+        """
+        ptm = PauliTransferMatrix.liouville_to_ptm(oper, n)
+        if indices is None:
+            indices = np.arange(4 ** n)
+        rows = ptm[..., indices, :]
+        diagonals = [rows[..., np.arange(len(indices)), indices]]
+        for _ in range(order - 1):
+            rows = np.matmul(rows, ptm)
+            diagonals.append(rows[..., np.arange(len(indices)), indices])
+        return diagonals
+
+    @staticmethod
+    @Profiler.profiled('ptm.twirl')
+    def twirl(oper, n):
+        """
+        Compute the Pauli twirl of a superoperator, returned in the Liouville representation.
+
+        Args:
+            oper (np.array): The 4^n x 4^n Liouville matrix.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The twirled channel as a Liouville matrix.
+        """
+        diagonal = PauliTransferMatrix.twirl_diagonal(oper, n)
+        return PauliTransferMatrix.ptm_to_liouville(diagonal[..., None] * np.eye(4 ** n), n)
+
+    @staticmethod
+    def apply_twirled(diagonal, rho, n, k=1):
+        """
+        Apply a twirled channel, given by its PTM diagonal, k times to a vectorised state.
+
+        Args:
+            diagonal (np.array): The diagonal of the twirled channel in the PTM basis.
+            rho (np.array): The state vector of length 4^n.
+            n (int): Total number of qubits.
+            k (int): Number of applications.
+
+        Returns:
+            np.array: The resulting state vector of length 4^n.
+        """
+        coefficients = PauliTransferMatrix.state_to_ptm(rho, n)
+        return PauliTransferMatrix.ptm_to_state(np.power(diagonal, k) * coefficients, n)
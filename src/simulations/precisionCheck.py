@@ -0,0 +1,62 @@
+import numpy as np
+from kikCalculation import KikCalculation
+from initialState import InitialState
+from quantumFourierTransform import QuantumFourierTransform
+
+
+class PrecisionCheck:
+    """
+    Compares the four error quantities of KikCalculation computed in a reduced precision against complex128 at
+    small n, so the deviation in incoherent infidelity is known before a large run is made in that precision.
+
+    Attributes:
+        dtype (type): The reduced precision, np.complex64 by default.
+        circuit_class (type): The QuantumCircuitImplementation subclass to build.
+    """
+    NAMES = ['A1', 'A2', 'A3', 'A4']
+    REFERENCE_DTYPE = np.complex128
+
+    def __init__(self, dtype=np.complex64, circuit_class=QuantumFourierTransform):
+        self.dtype = dtype
+        self.circuit_class = circuit_class
+
+    def values(self, n, dtype, cont, uncont, p):
+        """Return A1..A4 of one parameter point in the given precision."""
+        kik_obj = KikCalculation(n, InitialState(n).generate_excited_state(), self.circuit_class(n, dtype=dtype))
+        return np.real(np.stack(kik_obj.calculate_values_of_all_errors_batch(cont, uncont, p), axis=-1))[0]
+
+    def run(self, n_qubits=(2, 3, 4), cont=QuantumFourierTransform.CONTROLLABLE_COHERENT_ERROR_CX,
+            uncont=QuantumFourierTransform.UNCONTROLLABLE_COHERENT_ERROR_CX,
+            p=QuantumFourierTransform.AVG_TWO_QUBIT_ERROR):
+        """
+        Compute A1..A4 in both precisions for every n.
+
+        Args:
+            n_qubits (list): Numbers of qubits to check.
+            cont (float): Controllable coherent error.
+            uncont (float): Uncontrollable coherent error.
+            p (float): Strength p of the ADC.
+
+        Returns:
+            list: For every n a dictionary with the reference values, the reduced precision values, the absolute
+            deviations and the deviations relative to the reference.
+        """
+        rows = []
+        for n in n_qubits:
+            reference = self.values(n, self.REFERENCE_DTYPE, cont, uncont, p)
+            reduced = self.values(n, self.dtype, cont, uncont, p)
+            deviation = np.abs(reduced - reference)
+            rows.append({"n": n, "reference": reference, "reduced": reduced, "absolute": deviation,
+                         "relative": deviation / np.maximum(np.abs(reference), np.finfo(float).tiny)})
+        return rows
+
+    def report(self, rows):
+        """Return the result of run as a table, one line per n and quantity."""
+        lines = ["%-3s %-4s %16s %16s %12s %12s" % ('n', '', 'complex128', np.dtype(self.dtype).name, 'absolute',
+                                                   'relative')]
+        for row in rows:
+            for i, name in enumerate(self.NAMES):
+                lines.append("%-3d %-4s %16.10g %16.10g %12.3e %12.3e" % (row["n"], name, row["reference"][i],
+                                                                        row["reduced"][i], row["absolute"][i],
+                                                                        row["relative"][i]))
+        return "\n".join(lines)
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import functools
+import threading
+import numpy as np
+import scipy.sparse as sp
+
+
+class Profiler:
+    """
+    Opt-in instrumentation of the simulation hot paths.
+
+    Functions decorated with Profiler.profiled(name) are recorded while the profiler is enabled: call count,
+    cumulative time, the shapes of their results, the bytes of the results and the estimated floating point
+    operations of the matrix products made inside them (counted by Utilities.compose through add_flops). Time and
+    FLOPs are inclusive of nested profiled calls. When the profiler is off, a decorated function costs one attribute
+    lookup more than the undecorated one.
+
+    The recorded spans can be written as a Chrome trace (chrome://tracing or Perfetto) and the totals per name as
+    JSON.
+    """
+    enabled = False
+    events = []
+    totals = {}
+    metadata = {}
+    MAX_SHAPES = 8
+    local = threading.local()
+
+    @staticmethod
+    def enable(**metadata):
+        """
+        Start recording, discarding earlier records.
+
+        Args:
+            **metadata: Description of the run, e.g. n and the error parameters, stored with the trace.
+        """
+        Profiler.reset()
+        Profiler.metadata = metadata
+        Profiler.enabled = True
+
+    @staticmethod
+    def disable():
+        """Stop recording and keep the records."""
+        Profiler.enabled = False
+
+    @staticmethod
+    def reset():
+        """Discard all records."""
+        Profiler.events = []
+        Profiler.totals = {}
+        Profiler.metadata = {}
+
+    @staticmethod
+    def result_bytes_and_shapes(result):
+        """Return the bytes and the shapes of a dense or sparse matrix, or of a tuple or list of them."""
+        if isinstance(result, (tuple, list)):
+            n_bytes, shapes = 0, []
+            for item in result:
+                item_bytes, item_shapes = Profiler.result_bytes_and_shapes(item)
+                n_bytes += item_bytes
+                shapes += item_shapes
+            return n_bytes, shapes
+        if sp.issparse(result):
+            return result.data.nbytes, [tuple(result.shape)]
+        if isinstance(result, np.ndarray):
+            return result.nbytes, [result.shape]
+        return 0, []
+
+    @staticmethod
+    def add_flops(flops):
+        """Add estimated floating point operations to the innermost profiled call."""
+        stack = getattr(Profiler.local, 'stack', None)
+        if stack:
+            stack[-1] += flops
+
+    @staticmethod
+    def matmul_flops(matrix1, matrix2):
+        """
+        Estimate the real floating point operations of matrix1 @ matrix2: 8 per complex multiply-add for dense
+        operands, and 8 per stored entry of the sparse operand times the columns of the other one.
+        """
+        if sp.issparse(matrix1) and sp.issparse(matrix2):
+            return 8 * matrix1.nnz * matrix2.nnz // max(matrix2.shape[0], 1)
+        if sp.issparse(matrix1):
+            return 8 * matrix1.nnz * (np.shape(matrix2)[-1] if np.ndim(matrix2) > 1 else 1)
+        if sp.issparse(matrix2):
+            return 8 * matrix2.nnz * np.shape(matrix1)[-2]
+        shape1, shape2 = np.shape(matrix1), np.shape(matrix2)
+        batch = int(np.prod(np.broadcast_shapes(shape1[:-2], shape2[:-2]))) if len(shape1) > 2 or len(shape2) > 2 else 1
+        return 8 * batch * shape1[-2] * shape1[-1] * (shape2[-1] if len(shape2) > 1 else 1)
+
+    @staticmethod
+    def profiled(name):
+        """
+        Decorator recording every call of the decorated function under the given name while the profiler is on.
+        Place it below @staticmethod or @classmethod.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not Profiler.enabled:
+                    return function(*args, **kwargs)
+                return Profiler.record(name, function, args, kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def record(name, function, args, kwargs):
+        """Call function and record the call under name."""
+        if not hasattr(Profiler.local, 'stack'):
+            Profiler.local.stack = []
+        stack = Profiler.local.stack
+        stack.append(0)
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            flops = stack.pop()
+            if stack:
+                stack[-1] += flops
+
+        n_bytes, shapes = Profiler.result_bytes_and_shapes(result)
+        total = Profiler.totals.setdefault(name, {"calls": 0, "seconds": 0.0, "flops": 0, "bytes": 0, "shapes": []})
+        total["calls"] += 1
+        total["seconds"] += seconds
+        total["flops"] += flops
+        total["bytes"] += n_bytes
+        for shape in shapes:
+            if list(shape) not in total["shapes"] and len(total["shapes"]) < Profiler.MAX_SHAPES:
+                total["shapes"].append(list(shape))
+        Profiler.events.append({"name": name, "cat": name.split('.')[0], "ph": "X", "ts": start * 1e6,
+                                "dur": seconds * 1e6, "pid": os.getpid(), "tid": threading.get_ident(),
+                                "args": {"shapes": [list(shape) for shape in shapes], "flops": flops,
+                                         "bytes": n_bytes}})
+        return result
+
+    @staticmethod
+    def summary():
+        """
+        Return the totals per name, sorted by cumulative time.
+
+        Returns:
+            dict: For every name the calls, seconds, estimated FLOPs, result bytes and up to MAX_SHAPES result shapes.
+        """
+        return dict(sorted(Profiler.totals.items(), key=lambda item: -item[1]["seconds"]))
+
+    @staticmethod
+    def write_chrome_trace(path):
+        """Write the recorded spans as a Chrome trace JSON file."""
+        with open(path, 'w') as file:
+            json.dump({"traceEvents": Profiler.events, "displayTimeUnit": "ms",
+                       "otherData": {key: str(value) for key, value in Profiler.metadata.items()}}, file)
+
+    @staticmethod
+    def write_summary(path):
+        """Write the run metadata and the totals per name as JSON."""
+        with open(path, 'w') as file:
+            json.dump({"metadata": {key: str(value) for key, value in Profiler.metadata.items()},
+                       "totals": Profiler.summary()}, file, indent=2)
@@ -51,6 +51,53 @@ class QuantumCircuitImplementation:
         """
         raise NotImplementedError("Backward circuit with RC method not implemented.")
 
+    def compile_plan(self, is_inverse, is_add_rc):
+        """
+        Abstract method returning a CircuitPlan of the forward or backward circuit, which can be evaluated for new
+        error parameters without building the circuit again.
+
+        Args:
+            is_inverse (bool): Whether the plan is of the backward circuit.
+            is_add_rc (bool): Whether the circuit is dressed by RC gates.
+
+        """
+        raise NotImplementedError("Circuit plan method not implemented.")
+
+    def forward_circuit_batch(self, cont, uncont, p, is_add_rc=False):
+        """
+        Abstract method for the forward circuit operation evaluated at many error parameters at once.
+
+        Args:
+            cont (numpy.ndarray): Controllable coherent error of each parameter point.
+            uncont (numpy.ndarray): Uncontrollable coherent error of each parameter point.
+            p (numpy.ndarray): Two qubit error of each parameter point.
+            is_add_rc (bool): Whether the circuit is dressed by RC gates.
+
+        """
+        raise NotImplementedError("Batched forward circuit method not implemented.")
+
+    def backward_circuit_batch(self, cont, uncont, p, is_add_rc=False):
+        """
+        Abstract method for the backward circuit operation evaluated at many error parameters at once.
+
+        Args:
+            cont (numpy.ndarray): Controllable coherent error of each parameter point.
+            uncont (numpy.ndarray): Uncontrollable coherent error of each parameter point.
+            p (numpy.ndarray): Two qubit error of each parameter point.
+            is_add_rc (bool): Whether the circuit is dressed by RC gates.
+
+        """
+        raise NotImplementedError("Batched backward circuit method not implemented.")
+
+    def invalidate(self, parameter):
+        """
+        Called by the error setters, so implementations can drop the intermediates depending on the parameter.
+
+        Args:
+            parameter (str): Name of the changed parameter: 'cont', 'uncont', 'p' or 'p_1q'.
+
+        """
+
     @property
     def two_qubit_error(self):
         """Property to get the average two qubit error."""
@@ -66,6 +113,7 @@ class QuantumCircuitImplementation:
 
         """
         self.avg_two_qubit_error = avg_2q_error
+        self.invalidate('p')
 
     @property
     def one_qubit_error(self):
@@ -82,3 +130,4 @@ class QuantumCircuitImplementation:
 
         """
         self.avg_one_qubit_error = avg_1q_error
+        self.invalidate('p_1q')
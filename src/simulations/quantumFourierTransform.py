@@ -4,6 +4,9 @@ from utilities import Utilities
 from cXGate import CXGate
 from iDGate import IDGate
 from zGate import ZGate
+from superoperatorCache import SuperoperatorCache
+from circuitPlan import CircuitPlan
+from profiler import Profiler
 
 
 class QuantumFourierTransform(QuantumCircuitImplementation):
@@ -19,13 +22,26 @@ class QuantumFourierTransform(QuantumCircuitImplementation):
     AVG_TWO_QUBIT_ERROR = 0.001
     rot_cont_coh_error_cx = [Utilities.X, Utilities.Y]
     rot_uncont_coh_error_cx = [Utilities.X, Utilities.Y]
+    # Shared by all instances, so gates are reused between the forward/backward circuits and across KikCalculation
+    gate_cache = SuperoperatorCache()
+    # Optional SuperoperatorStore for the full forward/backward circuits, shared between runs and processes
+    circuit_store = None
 
-    def __init__(self, n_qubits):
+    def __init__(self, n_qubits, is_sparse=False, dtype=np.complex128, is_fused=True):
         super().__init__(n_qubits)
+        # Fuse the gate sequence into 2-qubit blocks applied by local contractions; sparse circuits use the gates
+        self.is_fused = is_fused
+        self.plans = {}
+        # Build gates and compose circuits as scipy.sparse matrices until fill-in makes dense cheaper
+        self.is_sparse = is_sparse
+        # Gates are built in double precision and stored in dtype, so np.complex64 composes the circuits in single
+        # precision
+        self.dtype = np.dtype(dtype)
         self.controllable_coh_err = self.CONTROLLABLE_COHERENT_ERROR_CX
         self.uncontrollable_coh_err = self.UNCONTROLLABLE_COHERENT_ERROR_CX
         self.avg_one_qubit_error = self.AVG_ONE_QUBIT_ERROR
         self.avg_two_qubit_error = self.AVG_TWO_QUBIT_ERROR
+        self.gate_table = self.build_gate_table(n_qubits)
 
     # Setters and getters for coherent errors
     @property
@@ -35,6 +51,7 @@ class QuantumFourierTransform(QuantumCircuitImplementation):
     @controllable_coh_err_cx.setter
     def controllable_coh_err_cx(self, cont):
         self.controllable_coh_err = cont
+        self.invalidate('cont')
 
     @property
     def uncontrollable_coh_err_cx(self):
@@ -43,87 +60,264 @@ class QuantumFourierTransform(QuantumCircuitImplementation):
     @uncontrollable_coh_err_cx.setter
     def uncontrollable_coh_err_cx(self, un_cont):
         self.uncontrollable_coh_err = un_cont
+        self.invalidate('uncont')
 
-    def apply_gates(self, t, c, rn, is_inverse, is_add_rc):
+    def in_precision(self, oper):
         """
-            Return the operator in Liouville space with z-rotation, cx with error,
-            and ADC followed by further z-rotations.
+        Return a dense or sparse operator in the precision of the circuit.
         """
-        z_rot_bef = ZGate(self.n_qubits, rn, +1, t).get_liouville_matrix()
-        z_inv_rot_bef = ZGate(self.n_qubits, rn, -1, t).get_liouville_matrix()
-        cx_obj = CXGate(self.n_qubits, c, t)
-        cx_obj.set_rotation_as_coherent_error(self.rot_cont_coh_error_cx, self.rot_uncont_coh_error_cx)
-        cx_adc = cx_obj.apply_channel_in_ls(self.avg_two_qubit_error)
-        cx_err = cx_obj.add_coherent_error(is_inverse, self.controllable_coh_err, self.uncontrollable_coh_err, cx_adc)
+        return oper.astype(self.dtype, copy=False)
+
+    def invalidate(self, parameter):
+        """
+        Drop the intermediates of the compiled plans depending on the changed parameter.
+        """
+        for plan in self.plans.values():
+            plan.intermediates.invalidate(parameter)
+
+    @staticmethod
+    def build_gate_table(n):
+        """
+        Return the gate table of the QFT on n qubits, shared by the forward and the inverse circuit: per target qubit
+        t in time order of the QFT, the pairs (control, rn) of its controlled-phase blocks. Every block is followed by
+        the Hadamard on t. The inverse QFT runs through the table backwards with the adjoint gates.
+        """
+        return [(t, [(t + 1 + k, np.pi / pow(2, (2 + k))) for k in range(n - 1 - t)]) for t in range(n)]
+
+    @Profiler.profiled('qft.z_rotation')
+    def z_rotation_in_ls(self, rn, sign_rot, target):
+        """
+        Return the Z-rotation on the target qubit in Liouville space, built once per cache entry. The rotation with
+        sign_rot -1 is the adjoint of the one with +1, which is diagonal, so it is taken as its complex conjugate.
+        """
+        def build():
+            if sign_rot < 0:
+                return self.z_rotation_in_ls(rn, +1, target).conj()
+            return self.in_precision(ZGate(self.n_qubits, rn, sign_rot, target, self.is_sparse).get_liouville_matrix())
+
+        return self.gate_cache.get_or_build(('z', self.n_qubits, target, rn, sign_rot, self.is_sparse, self.dtype.str),
+                                            build)
+
+    @Profiler.profiled('qft.hadamard')
+    def hadamard_in_ls(self, target):
+        """
+        Return the Hadamard gate on the target qubit in Liouville space, built once per cache entry.
+        """
+        return self.gate_cache.get_or_build(('h', self.n_qubits, target, self.is_sparse, self.dtype.str),
+                                            lambda: self.in_precision(Utilities.single_q_gate_for_n_q_in_ls(
+                                                target, self.n_qubits, Utilities.H, self.is_sparse)))
+
+    def identity_in_ls(self):
+        """
+        Return the identity in Liouville space, the starting point of every circuit.
+        """
+        return self.gate_cache.get_or_build(('id', self.n_qubits, self.is_sparse, self.dtype.str),
+                                            lambda: self.in_precision(IDGate(self.n_qubits,
+                                                                             self.is_sparse).get_liouville_matrix()))
+
+    @Profiler.profiled('qft.noisy_cx')
+    def noisy_cx_in_ls(self, c, t, is_inverse, is_add_rc, batch=None):
+        """
+        Return the cx with ADC and coherent error in Liouville space, optionally dressed by RC gates.
+        The cache key holds every error parameter the gate depends on.
+
+        If batch is given as arrays (controllable error, uncontrollable error, p of ADC), a stack of gates with one
+        gate per parameter point is returned instead, bypassing the cache.
+        """
+        key = ('cx', self.n_qubits, c, t, is_inverse, is_add_rc, self.is_sparse, self.dtype.str) + self.error_key()
+
+        def build():
+            # Stacks of gates for batched sweeps are always dense
+            return self.in_precision(self.build_noisy_cx(self.n_qubits, c, t, is_inverse, is_add_rc, batch,
+                                                         self.is_sparse and batch is None))
+
+        if batch is not None:
+            return build()
+        return self.gate_cache.get_or_build(key, build)
+
+    def error_key(self):
+        """
+        Return the error parameters the noisy gates depend on, as part of a cache key.
+        """
+        return (self.controllable_coh_err, self.uncontrollable_coh_err, self.avg_two_qubit_error,
+                tuple(m.tobytes() for m in self.rot_cont_coh_error_cx),
+                tuple(m.tobytes() for m in self.rot_uncont_coh_error_cx))
+
+    def build_noisy_cx(self, n, c, t, is_inverse, is_add_rc, batch=None, is_sparse=False):
+        """
+        Build the cx with ADC and coherent error in Liouville space on n qubits, optionally dressed by RC gates.
+        With batch given as in noisy_cx_in_ls, a stack of gates is built.
+        """
+        if batch is None:
+            cont, uncont, p = self.controllable_coh_err, self.uncontrollable_coh_err, self.avg_two_qubit_error
+        else:
+            cont, uncont, p = batch
 
+        cx_obj = CXGate(n, c, t, is_sparse)
+        cx_obj.set_rotation_as_coherent_error(self.rot_cont_coh_error_cx, self.rot_uncont_coh_error_cx)
+        cx_adc = cx_obj.apply_channel_in_ls(p)
+        cx_err = cx_obj.add_coherent_error(is_inverse, cont, uncont, cx_adc)
         if is_add_rc:
             cx_err = cx_obj.dress_by_rc_gate(cx_err)
+        return cx_err
 
-        z_inv_rot_aft = ZGate(self.n_qubits, rn, -1, c).get_liouville_matrix()
-        z_rot_aft = ZGate(self.n_qubits, rn, +1, c).get_liouville_matrix()
+    def gate_sequence(self, is_inverse):
+        """
+        Return the gates of compute_qft, or of compute_inverse_qft, in time order, in the form used by GateFusion.
+        Both are read from gate_table; the inverse is the forward sequence reversed, with every gate adjointed.
+        """
+        sequence = []
+        for t, pairs in self.gate_table:
+            for c, rn in pairs:
+                sequence += self.gates_of_block(t, c, rn, False)
+            sequence.append(('h', t))
+        if is_inverse:
+            return [self.adjoint_gate(gate) for gate in reversed(sequence)]
+        return sequence
 
+    @staticmethod
+    def adjoint_gate(gate):
+        """
+        Return the adjoint of a gate in the form used by GateFusion: a Z-rotation with the opposite sign, the
+        Hadamard itself, or the CNOT of the other direction, which carries the other coherent error.
+        """
+        if gate[0] == 'z':
+            return gate[:3] + (-gate[3],)
+        if gate[0] == 'cx':
+            return gate[:3] + (not gate[3],)
+        return gate
+
+    @staticmethod
+    def gates_of_block(t, c, rn, is_inverse):
+        """
+        Return the gates of apply_gates in time order.
+        """
         if is_inverse:
-            return np.dot(np.dot(np.dot(np.dot(z_inv_rot_bef, cx_err), z_rot_aft), cx_err), z_inv_rot_aft)
-        return np.dot(np.dot(np.dot(np.dot(z_rot_aft, cx_err), z_inv_rot_aft), cx_err), z_rot_bef)
+            return [('z', c, rn, -1), ('cx', c, t, True), ('z', c, rn, +1), ('cx', c, t, True), ('z', t, rn, -1)]
+        return [('z', t, rn, +1), ('cx', c, t, False), ('z', c, rn, -1), ('cx', c, t, False), ('z', c, rn, +1)]
 
-    def build_inverse_qft_block(self, last_q, target_q, is_add_rc):
+    def compute_fused(self, is_inverse, is_add_rc, batch=None):
         """
-        Constructs a block for the inverse Quantum Fourier Transform.
+        Compute the QFT or its inverse by evaluating its CircuitPlan, which fuses the gate sequence into blocks applied
+        with local contractions. The plan is evaluated at the error parameters of the circuit, or at those of batch
+        given as in noisy_cx_in_ls.
         """
-        qft_i = IDGate(self.n_qubits).get_liouville_matrix()
-        for i in range(last_q - target_q):
-            control = last_q - i
-            rn = np.pi / pow(2, (self.n_qubits - target_q - i))
-            qft_i = np.dot(self.apply_gates(target_q, control, rn, True, is_add_rc), qft_i)
-        return qft_i
+        if batch is None:
+            batch = (self.controllable_coh_err, self.uncontrollable_coh_err, self.avg_two_qubit_error)
+        return self.compile_plan(is_inverse, is_add_rc).evaluate(*batch)
 
-    def build_qft_block(self, last_q, target_q, is_add_rc):
+    @Profiler.profiled('qft.apply_gates')
+    def apply_gates(self, t, c, rn, is_inverse, is_add_rc, batch=None):
         """
-        Constructs a block for the Quantum Fourier Transform.
+            Return the operator in Liouville space with z-rotation, cx with error,
+            and ADC followed by further z-rotations.
         """
-        qft = IDGate(self.n_qubits).get_liouville_matrix()
-        for i in range(last_q - target_q):
-            control = target_q + 1 + i
-            rn = np.pi / pow(2, (2 + i))
-            qft = np.dot(self.apply_gates(target_q, control, rn, False, is_add_rc), qft)
-        return qft
+        # The inverse block applies the adjoints of the forward Z-rotations in reverse order
+        sign = -1 if is_inverse else +1
+        z_rot_t = self.z_rotation_in_ls(rn, sign, t)
+        z_rot_c = self.z_rotation_in_ls(rn, sign, c)
+        z_inv_rot_c = self.z_rotation_in_ls(rn, -sign, c)
+        cx_err = self.noisy_cx_in_ls(c, t, is_inverse, is_add_rc, batch)
 
-    def compute_qft(self, is_add_rc):
+        if is_inverse:
+            return Utilities.compose(Utilities.compose(Utilities.compose(Utilities.compose(z_rot_t, cx_err), z_inv_rot_c), cx_err), z_rot_c)
+        return Utilities.compose(Utilities.compose(Utilities.compose(Utilities.compose(z_rot_c, cx_err), z_inv_rot_c), cx_err), z_rot_t)
+
+    def build_block(self, target_q, pairs, is_inverse, is_add_rc, batch=None):
+        """
+        Constructs the controlled-phase block of a target qubit from its pairs (control, rn) in gate_table, for the
+        Quantum Fourier Transform or, with the pairs in reverse order, for its inverse.
+        """
+        block = self.identity_in_ls()
+        for control, rn in (reversed(pairs) if is_inverse else pairs):
+            block = Utilities.compose(self.apply_gates(target_q, control, rn, is_inverse, is_add_rc, batch), block)
+        return block
+
+    @Profiler.profiled('qft.compute_qft')
+    def compute_qft(self, is_add_rc, batch=None):
         """
         Compute the Quantum Fourier Transform.
+        With batch given as in noisy_cx_in_ls, a stack of circuits with one circuit per parameter point is returned.
         """
-        qft = IDGate(self.n_qubits).get_liouville_matrix()
-        for i in range(self.n_qubits):
-            bloc = self.build_qft_block(self.n_qubits - 1, i, is_add_rc)
-            qft = np.dot(bloc, qft)
-            uH = Utilities.single_q_gate_for_n_q_in_ls(i, self.n_qubits, Utilities.H)
-            qft = np.dot(uH, qft)
+        if self.is_fused and not self.is_sparse:
+            return self.compute_fused(False, is_add_rc, batch)
+        qft = self.identity_in_ls()
+        for i, pairs in self.gate_table:
+            bloc = self.build_block(i, pairs, False, is_add_rc, batch)
+            qft = Utilities.compose(bloc, qft)
+            uH = self.hadamard_in_ls(i)
+            qft = Utilities.compose(uH, qft)
         return qft
 
-    def compute_inverse_qft(self, is_add_randomised_compiling):
+    @Profiler.profiled('qft.compute_inverse_qft')
+    def compute_inverse_qft(self, is_add_randomised_compiling, batch=None):
         """
         Compute the inverse Quantum Fourier Transform.
+        With batch given as in noisy_cx_in_ls, a stack of circuits with one circuit per parameter point is returned.
         """
-        qft_i = IDGate(self.n_qubits).get_liouville_matrix()
-        i = self.n_qubits - 1
-        while i >= 0:
-            uH = Utilities.single_q_gate_for_n_q_in_ls(i, self.n_qubits, Utilities.H)
-            qft_i = np.dot(uH, qft_i)
-            bloc = self.build_inverse_qft_block(self.n_qubits - 1, i, is_add_randomised_compiling)
-            qft_i = np.dot(bloc, qft_i)
-            i = i - 1
+        if self.is_fused and not self.is_sparse:
+            return self.compute_fused(True, is_add_randomised_compiling, batch)
+        qft_i = self.identity_in_ls()
+        for i, pairs in reversed(self.gate_table):
+            uH = self.hadamard_in_ls(i)
+            qft_i = Utilities.compose(uH, qft_i)
+            bloc = self.build_block(i, pairs, True, is_add_randomised_compiling, batch)
+            qft_i = Utilities.compose(bloc, qft_i)
         return qft_i
 
+    def stored_circuit(self, is_inverse, is_add_rc):
+        """
+        Return the QFT or its inverse, mapped from circuit_store when it was built before.
+        The key holds n and every error parameter the circuit depends on; the rotation angles follow from n.
+        """
+        def build():
+            return self.compute_inverse_qft(is_add_rc) if is_inverse else self.compute_qft(is_add_rc)
+
+        if self.circuit_store is None or self.is_sparse:
+            return build()
+        key = ('qft', self.n_qubits, is_inverse, is_add_rc, self.dtype.str, float(self.controllable_coh_err),
+               float(self.uncontrollable_coh_err), float(self.avg_two_qubit_error), float(self.avg_one_qubit_error),
+               tuple(np.asarray(m, dtype=complex).tobytes() for m in self.rot_cont_coh_error_cx),
+               tuple(np.asarray(m, dtype=complex).tobytes() for m in self.rot_uncont_coh_error_cx))
+        return self.circuit_store.get_or_build(key, build)
+
     def forward_circuit(self):
-        return self.compute_qft(False)
+        return self.stored_circuit(False, False)
 
     def backward_circuit(self):
-        return self.compute_inverse_qft(False)
+        return self.stored_circuit(True, False)
 
     def forward_circuit_with_rc(self):
-        return self.compute_qft(True)
+        return self.stored_circuit(False, True)
 
     def backward_circuit_with_rc(self):
-        return self.compute_inverse_qft(True)
+        return self.stored_circuit(True, True)
+
+    def compile_plan(self, is_inverse, is_add_rc):
+        """
+        Return the CircuitPlan of the QFT or its inverse, compiled on first use. Plans depend on the rotation axes of
+        the coherent errors and the precision, but not on the error strengths. The plan of the inverse is the
+        adjoint of the forward plan, so its static superoperators are not rebuilt.
+        """
+        key = (is_inverse, is_add_rc, self.dtype.str, tuple(m.tobytes() for m in self.rot_cont_coh_error_cx),
+               tuple(m.tobytes() for m in self.rot_uncont_coh_error_cx))
+        if key not in self.plans:
+            if is_inverse:
+                self.plans[key] = self.compile_plan(False, is_add_rc).adjoint()
+            else:
+                self.plans[key] = CircuitPlan.compile(self.gate_sequence(False), self.n_qubits,
+                                                      self.rot_cont_coh_error_cx, self.rot_uncont_coh_error_cx,
+                                                      is_add_rc, self.dtype)
+        return self.plans[key]
+
+    def forward_circuit_batch(self, cont, uncont, p, is_add_rc=False):
+        if self.is_fused:
+            return self.compute_fused(False, is_add_rc, (cont, uncont, p))
+        return self.compute_qft(is_add_rc, (cont, uncont, p))
+
+    def backward_circuit_batch(self, cont, uncont, p, is_add_rc=False):
+        if self.is_fused:
+            return self.compute_fused(True, is_add_rc, (cont, uncont, p))
+        return self.compute_inverse_qft(is_add_rc, (cont, uncont, p))
 
 
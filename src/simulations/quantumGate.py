@@ -6,13 +6,15 @@ class QuantumGate:
     This class represents a quantum gate and its associated errors. 
     It provides methods for working with quantum gates and their error channels.
     """
-    def __init__(self, n_qubits):
+    def __init__(self, n_qubits, is_sparse=False):
         """
         Initialize the QuantumGate with the given number of qubits.
 
         :param n_qubits: The number of qubits the gate operates on.
+        :param is_sparse: Whether the gate is built as scipy.sparse matrices.
         """
         self.n = n_qubits
+        self.is_sparse = is_sparse
         self.rotate_cont_coh_error = [0] * n_qubits
         self.rotate_uncont_coh_error = [0] * n_qubits
 
@@ -0,0 +1,138 @@
+import numpy as np
+from utilities import Utilities
+
+
+class StateVectorEngine:
+    """
+    Contains static methods for evolving a batch of n-qubit state vectors (quantum trajectories) by applying
+    operators only to the qubits they act on.
+
+    The batch is kept as a tensor of shape (T,) + (2,) * n, where T is the number of trajectories and axis 1 + q
+    holds qubit q. Qubit 0 is the most significant one, as in DensityMatrixEngine. Operators are either shared by all
+    trajectories or given as a stack with one operator per trajectory. Operators are cast to the type of the batch,
+    so a complex64 batch stays in single precision.
+    """
+
+    PAULI_BASIS = np.array([Utilities.I, Utilities.X, Utilities.Y, Utilities.Z])
+
+    @staticmethod
+    def to_tensor(psi, n, n_trajectories=1, dtype=complex):
+        """
+        Reshape a state vector of length 2^n into a batch of n_trajectories copies of it.
+
+        Args:
+            psi (np.array): The state vector.
+            n (int): Total number of qubits.
+            n_trajectories (int): Number of trajectories.
+            dtype (type): Complex type of the batch.
+
+        Returns:
+            np.array: The batch as a tensor of shape (n_trajectories,) + (2,) * n.
+        """
+        psi = np.reshape(np.asarray(psi, dtype=dtype), (1,) + (2,) * n)
+        return np.repeat(psi, n_trajectories, axis=0)
+
+    @staticmethod
+    def split_qubits(psi, qubits, n):
+        """
+        Move the given qubits to the last axes and flatten, giving a tensor of shape (T, 2^(n-k), 2^k).
+        """
+        k = len(qubits)
+        moved = np.moveaxis(psi, [1 + q for q in qubits], list(range(n + 1 - k, n + 1)))
+        return np.reshape(moved, (psi.shape[0], -1, 2 ** k))
+
+    @staticmethod
+    def merge_qubits(flat, qubits, n):
+        """
+        Undo split_qubits.
+        """
+        k = len(qubits)
+        moved = np.reshape(flat, (flat.shape[0],) + (2,) * n)
+        return np.moveaxis(moved, list(range(n + 1 - k, n + 1)), [1 + q for q in qubits])
+
+    @staticmethod
+    def apply_operator(psi, oper, qubits, n):
+        """
+        Compute oper * psi for an operator acting on the given qubits only.
+
+        Args:
+            psi (np.array): The batch of states as a tensor of shape (T,) + (2,) * n.
+            oper (np.array): The 2^k x 2^k operator with qubits[0] as its most significant qubit, or a stack of
+                T such operators, one per trajectory.
+            qubits (list): The k qubits the operator acts on.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The transformed batch of states.
+        """
+        flat = StateVectorEngine.split_qubits(psi, qubits, n)
+        flat = np.matmul(flat, np.swapaxes(oper, -1, -2).astype(flat.dtype, copy=False))
+        return StateVectorEngine.merge_qubits(flat, qubits, n)
+
+    @staticmethod
+    def reduced_density_matrices(psi, qubits, n):
+        """
+        Return the reduced density matrix of the given qubits for every trajectory, of shape (T, 2^k, 2^k).
+        """
+        flat = StateVectorEngine.split_qubits(psi, qubits, n)
+        return np.einsum('tri,trj->tij', flat, np.conj(flat))
+
+    @staticmethod
+    def apply_kraus_jump(psi, kraus, qubits, n, rng):
+        """
+        Apply a channel given by its Kraus operators as a quantum jump.
+
+        Every trajectory applies one Kraus operator K_j, chosen with probability ||K_j psi||^2, and is normalised
+        again, so the average over trajectories reproduces the channel. The probabilities are computed from the
+        reduced density matrix of the qubits, so no copy of the state is made per Kraus operator.
+
+        Args:
+            psi (np.array): The batch of normalised states as a tensor of shape (T,) + (2,) * n.
+            kraus (list): The Kraus operators of the channel.
+            qubits (list): The qubits the channel acts on.
+            n (int): Total number of qubits.
+            rng (np.random.Generator): The random number generator.
+
+        Returns:
+            np.array: The batch of states after the jumps.
+        """
+        kraus = np.asarray(kraus)
+        rdm = StateVectorEngine.reduced_density_matrices(psi, qubits, n)
+        # ||K_j psi||^2 = Tr(K_j rho K_j^dagger), shape (T, number of Kraus operators)
+        weights = np.real(np.einsum('jab,tbc,jac->tj', kraus, rdm, np.conj(kraus)))
+        cumulative = np.cumsum(weights, axis=-1)
+        draws = rng.random(psi.shape[0]) * cumulative[:, -1]
+        choice = np.minimum(np.sum(cumulative < draws[:, None], axis=-1), len(kraus) - 1)
+        norms = np.sqrt(weights[np.arange(psi.shape[0]), choice])
+        return StateVectorEngine.apply_operator(psi, kraus[choice] / norms[:, None, None], qubits, n)
+
+    @staticmethod
+    def sample_pauli_strings(n_trajectories, n, rng):
+        """
+        Draw one uniformly random n-qubit Pauli string per trajectory, as digits 0..3 for I, X, Y, Z.
+        """
+        return rng.integers(4, size=(n_trajectories, n))
+
+    @staticmethod
+    def apply_pauli_strings(psi, digits, n):
+        """
+        Apply the Pauli string of every trajectory, given as digits of shape (T, n), to its state.
+        """
+        for q in range(n):
+            psi = StateVectorEngine.apply_operator(psi, StateVectorEngine.PAULI_BASIS[digits[:, q]], [q], n)
+        return psi
+
+    @staticmethod
+    def overlap_probabilities(psi, phi):
+        """
+        Return |<phi|psi>|^2 for every trajectory.
+
+        Args:
+            psi (np.array): The batch of states as a tensor of shape (T,) + (2,) * n.
+            phi (np.array): The reference states, of the same shape or broadcastable to it.
+
+        Returns:
+            np.array: Array of length T.
+        """
+        axes = tuple(range(1, psi.ndim))
+        return np.abs(np.sum(np.conj(phi) * psi, axis=axes)) ** 2
@@ -0,0 +1,90 @@
+import scipy.sparse as sp
+from collections import OrderedDict
+
+
+class SuperoperatorCache:
+    """
+    Bounded least-recently-used cache of gate superoperators.
+
+    Entries are evicted from the least recently used end once the total size of the stored arrays exceeds max_bytes.
+    Stored arrays are made read-only, since the same object is handed out to every caller. Sparse matrices are
+    accounted by the size of their data and index arrays.
+
+    Attributes:
+        max_bytes (int): Upper bound on the memory held by the cached arrays.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to build the superoperator.
+        evictions (int): Number of entries dropped to respect max_bytes.
+    """
+    MAX_BYTES = 2 ** 30
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_bytes (int): Upper bound on the memory held by the cached arrays.
+        """
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, key, builder):
+        """
+        Return the superoperator stored under key, building and storing it on a miss.
+
+        Args:
+            key (tuple): Hashable description of the gate, e.g. gate type, qubits, angle, sign, n and error parameters.
+            builder (callable): Function without arguments returning the superoperator.
+
+        Returns:
+            numpy.ndarray: The cached superoperator.
+        """
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        value = builder()
+        if sp.issparse(value):
+            value.data.flags.writeable = False
+        else:
+            value.flags.writeable = False
+        if self.size_of(value) <= self.max_bytes:
+            self.entries[key] = value
+            self.n_bytes += self.size_of(value)
+            while self.n_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.n_bytes -= self.size_of(evicted)
+                self.evictions += 1
+        return value
+
+    @staticmethod
+    def size_of(value):
+        """Return the number of bytes held by a dense or sparse matrix."""
+        if sp.issparse(value):
+            value = value.tocsr()
+            return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+        return value.nbytes
+
+    def clear(self):
+        """Drop all entries and reset the statistics."""
+        self.entries.clear()
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Return the hit/miss statistics of the cache.
+
+        Returns:
+            dict: Hits, misses, evictions, number of entries and bytes in use.
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self.entries), "bytes": self.n_bytes}
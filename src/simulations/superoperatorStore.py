@@ -0,0 +1,141 @@
+import os
+import hashlib
+import numpy as np
+import scipy.sparse as sp
+
+
+class SuperoperatorStore:
+    """
+    Content-addressed on-disk store of large superoperators, shared between runs and processes.
+
+    Every entry is an .npy file named by the SHA-256 hash of its key. Lookups map the file read-only with
+    np.load(mmap_mode='r'), so a stored circuit is never copied into memory as a whole. New entries are written to a
+    temporary file and renamed into place, so concurrent processes never see a partially written entry. Once the
+    files in the directory exceed max_bytes, the least recently used ones are deleted; a hit refreshes the
+    modification time of its file. Sparse superoperators are small and are returned without being stored.
+
+    The key only describes what a superoperator is, not the code that built it, so FORMAT_VERSION is hashed along
+    with it. Bump it whenever the gate matrices, the Liouville convention or the qubit ordering change, so that
+    entries written by older code are no longer found and age out through the LRU eviction.
+
+    Attributes:
+        directory (str): Directory holding the .npy files.
+        max_bytes (int): Upper bound on the size of the stored files.
+        hits (int): Number of lookups served from disk.
+        misses (int): Number of lookups that had to build the superoperator.
+        evictions (int): Number of files deleted to respect max_bytes.
+    """
+    DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'kik_superoperators')
+    MAX_BYTES = 16 * 2 ** 30
+    FORMAT_VERSION = 1
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=MAX_BYTES):
+        """
+        Initializes the store, creating its directory if needed.
+
+        Args:
+            directory (str): Directory holding the .npy files.
+            max_bytes (int): Upper bound on the size of the stored files.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path_of(self, key):
+        """Return the file of the given key under the current FORMAT_VERSION."""
+        return os.path.join(self.directory,
+                            hashlib.sha256(repr((self.FORMAT_VERSION, key)).encode()).hexdigest() + '.npy')
+
+    def get_or_build(self, key, builder):
+        """
+        Return the superoperator stored under key, building and storing it on a miss.
+
+        Args:
+            key (tuple): Hashable description of the superoperator, e.g. circuit, n, angles and error parameters.
+                Its repr must be the same in every process.
+            builder (callable): Function without arguments returning the superoperator.
+
+        Returns:
+            numpy.memmap: The stored superoperator, mapped read-only.
+        """
+        path = self.path_of(key)
+        try:
+            value = np.load(path, mmap_mode='r')
+            os.utime(path)
+            self.hits += 1
+            return value
+        except FileNotFoundError:
+            pass
+
+        self.misses += 1
+        value = builder()
+        if sp.issparse(value) or value.nbytes > self.max_bytes:
+            return value
+
+        temporary = path + '.' + str(os.getpid()) + '.tmp'
+        stored = np.lib.format.open_memmap(temporary, mode='w+', dtype=value.dtype, shape=value.shape)
+        stored[...] = value
+        stored.flush()
+        del stored
+        os.replace(temporary, path)
+        self.evict(keep=path)
+        return np.load(path, mmap_mode='r')
+
+    def entries(self):
+        """
+        Return the stored files as (modification time, size, path), least recently used first.
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                path = os.path.join(self.directory, name)
+                try:
+                    status = os.stat(path)
+                except FileNotFoundError:
+                    # Evicted by another process in the meantime
+                    continue
+                files.append((status.st_mtime, status.st_size, path))
+        return sorted(files)
+
+    def evict(self, keep=None):
+        """
+        Delete the least recently used files until the store fits in max_bytes. The file keep is never deleted.
+        """
+        files = self.entries()
+        n_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if n_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            n_bytes -= size
+
+    def clear(self):
+        """Delete all stored files and reset the statistics."""
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Return the hit/miss statistics of this process and the current content of the store.
+
+        Returns:
+            dict: Hits, misses, evictions, number of stored files and their total size in bytes.
+        """
+        files = self.entries()
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(files), "bytes": sum(size for _, size, _ in files)}
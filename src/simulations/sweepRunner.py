@@ -0,0 +1,156 @@
+import os
+import itertools
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from kikCalculation import KikCalculation
+from initialState import InitialState
+from quantumFourierTransform import QuantumFourierTransform
+
+
+def evaluate_chunk(circuit_class, chunk, dtype=np.complex128):
+    """
+    Evaluate a chunk of sweep points sharing the same number of qubits and initial state.
+    Defined at module level so it can be sent to the worker processes.
+
+    Args:
+        circuit_class (type): The QuantumCircuitImplementation subclass to build.
+        chunk (list): Points (n, cont, uncont, p, state) with the same n and state.
+        dtype (type): Precision of the circuit superoperators, np.complex128 or np.complex64.
+
+    Returns:
+        np.ndarray: Array of shape (len(chunk), 4) with the four error quantities of each point.
+    """
+    n, state = chunk[0][0], chunk[0][4]
+    rho_0 = SweepRunner.initial_state(n, state)
+    cont, uncont, p = (np.array([point[i] for point in chunk]) for i in (1, 2, 3))
+    kik_obj = KikCalculation(n, rho_0, circuit_class(n, dtype=dtype))
+    values = kik_obj.calculate_values_of_all_errors_batch(cont, uncont, p)
+    return np.real(np.stack(values, axis=-1))
+
+
+class SweepRunner:
+    """
+    Runs KIK error decompositions over a grid of (n, theta_A, theta_B, p_adc, initial state) points in a pool of
+    worker processes.
+
+    Points are grouped into chunks with the same n and initial state, every chunk is evaluated with
+    KikCalculation.calculate_values_of_all_errors_batch in one worker, and the results are returned in the order of
+    the points. Each worker is started with its BLAS thread count pinned, so the workers do not oversubscribe the
+    cores.
+
+    An initial state is a name of INITIAL_STATES or a computational basis state given by its bits with qubit 0
+    first, e.g. '0101'. make_grid expands BASIS_STATES into all 2^n basis states.
+
+    Attributes:
+        circuit_class (type): The QuantumCircuitImplementation subclass to build, QuantumFourierTransform by default.
+        max_workers (int): Number of worker processes, all cores by default. With 1 the sweep runs in-process.
+        blas_threads (int): Number of BLAS threads of every worker.
+        chunk_size (int): Maximum number of points evaluated together in one task.
+        dtype (type): Precision of the circuit superoperators, np.complex128 or np.complex64.
+    """
+    INITIAL_STATES = {'excited': 'generate_excited_state', 'ground': 'generate_ground_state'}
+    BASIS_STATES = 'basis'
+    BLAS_THREAD_VARIABLES = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+                             'NUMEXPR_NUM_THREADS']
+
+    def __init__(self, circuit_class=QuantumFourierTransform, max_workers=None, blas_threads=1, chunk_size=8,
+                 dtype=np.complex128):
+        self.circuit_class = circuit_class
+        self.max_workers = max_workers or os.cpu_count()
+        self.blas_threads = blas_threads
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+
+    @staticmethod
+    def make_grid(n_qubits, cont, uncont, p, states=('excited',)):
+        """
+        Build the full grid of sweep points.
+
+        Args:
+            n_qubits (list): Numbers of qubits.
+            cont (list): Controllable coherent errors (theta_A).
+            uncont (list): Uncontrollable coherent errors (theta_B).
+            p (list): Strengths p of the ADC.
+            states (list): Initial states, keys of INITIAL_STATES, bit strings, or BASIS_STATES for all basis states
+                of every n.
+
+        Returns:
+            list: Points (n, cont, uncont, p, state), ordered by n, state, cont, uncont and p, with p varying fastest.
+        """
+        return [(n, a, b, p_, state) for n in n_qubits for state in SweepRunner.expand_states(n, states)
+                for a, b, p_ in itertools.product(cont, uncont, p)]
+
+    @staticmethod
+    def expand_states(n, states):
+        """
+        Return the initial states of n qubits, with BASIS_STATES replaced by the bit strings of all basis states.
+        """
+        expanded = []
+        for state in states:
+            if state == SweepRunner.BASIS_STATES:
+                expanded += [format(index, '0%db' % n) for index in range(2 ** n)]
+            else:
+                expanded.append(state)
+        return expanded
+
+    @staticmethod
+    def initial_state(n, state):
+        """
+        Return the initial state of n qubits given by a key of INITIAL_STATES or a bit string.
+
+        Raises:
+            ValueError: If the state is neither a known name nor a bit string of n bits.
+        """
+        if state in SweepRunner.INITIAL_STATES:
+            return getattr(InitialState(n), SweepRunner.INITIAL_STATES[state])()
+        try:
+            return InitialState(n).generate_basis_state(state)
+        except (TypeError, ValueError):
+            raise ValueError("Unknown initial state of %d qubits: %s" % (n, state)) from None
+
+    def make_chunks(self, points):
+        """
+        Split the points into consecutive chunks with the same n and initial state.
+        """
+        chunks = []
+        for _, group in itertools.groupby(points, key=lambda point: (point[0], point[4])):
+            group = list(group)
+            chunks += [group[i:i + self.chunk_size] for i in range(0, len(group), self.chunk_size)]
+        return chunks
+
+    def run(self, points):
+        """
+        Evaluate all sweep points.
+
+        Args:
+            points (list): Points (n, cont, uncont, p, state), e.g. from make_grid.
+
+        Returns:
+            np.ndarray: Array of shape (len(points), 4) with the controllable coherent error, uncontrollable coherent
+            error, Pauli error and native error of each point, in the order of the points.
+        """
+        for n, state in {(point[0], point[4]) for point in points}:
+            self.initial_state(n, state)
+
+        chunks = self.make_chunks(points)
+        if not chunks:
+            return np.zeros((0, 4))
+        if self.max_workers == 1:
+            return np.concatenate([evaluate_chunk(self.circuit_class, chunk, self.dtype) for chunk in chunks])
+
+        # Spawned workers inherit the environment, so BLAS reads the pinned thread count when it loads
+        saved = {name: os.environ.get(name) for name in self.BLAS_THREAD_VARIABLES}
+        os.environ.update({name: str(self.blas_threads) for name in self.BLAS_THREAD_VARIABLES})
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(chunks)),
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                results = list(executor.map(evaluate_chunk, itertools.repeat(self.circuit_class), chunks,
+                                            itertools.repeat(self.dtype)))
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        return np.concatenate(results)
@@ -0,0 +1,35 @@
+import json
+import unittest
+from benchmarkSuite import BenchmarkSuite
+
+
+class TestCompare(unittest.TestCase):
+    """Regressions are flagged from stored runs, without timing anything."""
+    BASELINE = json.loads('''{"meta": {"repeat": 3}, "results": [
+        {"case": "compute_qft", "n": 3, "seconds": 0.5, "peak_bytes": 1000},
+        {"case": "compute_qft", "n": 4, "seconds": 2.0, "peak_bytes": 8000}]}''')
+
+    @staticmethod
+    def run_of(seconds, peak_bytes, n=3):
+        return {"meta": {"repeat": 3}, "results": [{"case": "compute_qft", "n": n, "seconds": seconds,
+                                                    "peak_bytes": peak_bytes}]}
+
+    def test_slowdown_above_threshold(self):
+        regressions = BenchmarkSuite.compare(self.run_of(0.65, 1000), self.BASELINE, threshold=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("compute_qft n=3 seconds", regressions[0])
+
+    def test_slowdown_below_threshold(self):
+        self.assertEqual(BenchmarkSuite.compare(self.run_of(0.55, 1100), self.BASELINE, threshold=0.2), [])
+
+    def test_memory_above_threshold(self):
+        regressions = BenchmarkSuite.compare(self.run_of(0.5, 1500), self.BASELINE, threshold=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("peak_bytes", regressions[0])
+
+    def test_case_missing_from_baseline(self):
+        self.assertEqual(BenchmarkSuite.compare(self.run_of(10.0, 10 ** 6, n=5), self.BASELINE), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import importlib.util
+import numpy as np
+import scipy.sparse as sp
+from cXGate import CXGate
+
+HAS_QISKIT = importlib.util.find_spec('qiskit') is not None
+
+
+class TestControlledNot(unittest.TestCase):
+    """The CNOT built from bit manipulation matches the qiskit-built CNOT of the baseline."""
+    # (c, t) to (cc, tt) mappings of the baseline get_matrix
+    BASELINE_TRANSFORMATIONS = {3: {(1, 0): (2, 1), (2, 1): (1, 0)},
+                                4: {(1, 0): (3, 2), (2, 0): (3, 1), (3, 1): (2, 0), (3, 2): (1, 0)}}
+
+    @staticmethod
+    def pairs(n):
+        return [(c, t) for c in range(n) for t in range(n) if c != t]
+
+    def baseline_matrix(self, c, t, n):
+        import qiskit.quantum_info as qi
+        from qiskit import QuantumCircuit, QuantumRegister
+        qc = QuantumCircuit(QuantumRegister(n))
+        cc, tt = self.BASELINE_TRANSFORMATIONS.get(n, {}).get((c, t), (c, t))
+        qc.cx(tt, cc)
+        return qi.Operator(qc).data.real
+
+    @unittest.skipUnless(HAS_QISKIT, "qiskit is not installed")
+    def test_matches_baseline(self):
+        # The baseline only built the CNOTs of the QFT correctly, whose control index is above the target index
+        for n in (2, 3, 4):
+            for c, t in self.pairs(n):
+                if c > t:
+                    np.testing.assert_array_equal(CXGate(n, c, t).get_matrix(), self.baseline_matrix(c, t, n))
+
+    @unittest.skipUnless(HAS_QISKIT, "qiskit is not installed")
+    def test_matches_qiskit(self):
+        import qiskit.quantum_info as qi
+        from qiskit import QuantumCircuit
+        for n in (2, 3, 4):
+            for c, t in self.pairs(n):
+                qc = QuantumCircuit(n)
+                # qiskit counts qubits from the least significant bit, here qubit 0 is the most significant one
+                qc.cx(n - 1 - c, n - 1 - t)
+                np.testing.assert_array_equal(CXGate(n, c, t).get_matrix(), qi.Operator(qc).data.real)
+
+    def test_sparse_and_permutation(self):
+        for n in (2, 3, 4):
+            for c, t in self.pairs(n):
+                matrix = CXGate(n, c, t).get_matrix()
+                np.testing.assert_array_equal(CXGate(n, c, t, is_sparse=True).get_matrix().toarray(), matrix)
+                perm = CXGate(n, c, t).get_permutation()
+                np.testing.assert_array_equal(matrix[perm, np.arange(2 ** n)], np.ones(2 ** n))
+
+
+class TestRcDressing(unittest.TestCase):
+    """The sparse RC dressing agrees with the dense one."""
+
+    def test_sparse_matches_dense(self):
+        rng = np.random.default_rng(0)
+        for n, c, t in [(2, 0, 1), (2, 1, 0), (3, 0, 2), (3, 2, 1), (4, 3, 0)]:
+            size = 4 ** n
+            obj = rng.normal(size=(size, size)) + 1j * rng.normal(size=(size, size))
+            obj[rng.random((size, size)) < 0.9] = 0
+            dense = CXGate(n, c, t).dress_by_rc_gate(obj)
+            dressed = CXGate(n, c, t, is_sparse=True).dress_by_rc_gate(sp.csr_matrix(obj))
+            self.assertTrue(sp.issparse(dressed))
+            np.testing.assert_allclose(dressed.toarray(), dense, atol=1e-14)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+from kikCalculation import KikCalculation
+from initialState import InitialState
+from quantumFourierTransform import QuantumFourierTransform
+from densityMatrixFourierTransform import DensityMatrixFourierTransform
+from densityMatrixKikCalculation import DensityMatrixKikCalculation
+
+
+class TestDensityMatrixKikCalculation(unittest.TestCase):
+    """The density-matrix engine agrees with the superoperator path and rejects what it does not support."""
+    N = 3
+
+    def test_batch(self):
+        rho_0 = InitialState(self.N).generate_excited_state()
+        points = ([0.02, 0.05], [0.01, 0.03], [1e-3, 2e-3])
+        circuit = DensityMatrixFourierTransform(self.N)
+        values = DensityMatrixKikCalculation(self.N, rho_0, circuit).calculate_values_of_all_errors_batch(*points)
+        expected = KikCalculation(self.N, rho_0, QuantumFourierTransform(self.N)).calculate_values_of_all_errors_batch(
+            *points)
+        for value, reference in zip(values, expected):
+            np.testing.assert_allclose(np.real(value), np.real(reference), rtol=1e-10, atol=1e-15)
+        self.assertEqual(circuit.two_qubit_error, DensityMatrixFourierTransform.AVG_TWO_QUBIT_ERROR)
+
+    def test_stacked_state(self):
+        with self.assertRaises(ValueError):
+            DensityMatrixKikCalculation(self.N, InitialState(self.N).generate_basis_states(),
+                                        DensityMatrixFourierTransform(self.N))
+
+    def test_max_pauli_strings(self):
+        kik_obj = DensityMatrixKikCalculation(self.N, InitialState(self.N).generate_excited_state(),
+                                              DensityMatrixFourierTransform(self.N), max_pauli_strings=2 ** self.N - 1)
+        with self.assertRaises(ValueError):
+            kik_obj.pauli_error()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from math import factorial
+import numpy as np
+from kikCalculation import KikCalculation
+from initialState import InitialState
+from quantumFourierTransform import QuantumFourierTransform
+
+
+class TestCoefficientTable(unittest.TestCase):
+    """The running-product coefficient table matches the factorial formula of the expansion."""
+
+    @staticmethod
+    def factorial_coefficient(n, k):
+        if k == 0:
+            return 2 - (1 / n)
+        return (-1) ** k * (2 * (2 * n - 1) / n) * (factorial(n) ** 2) / (factorial(n - k) * factorial(n + k))
+
+    def test_table(self):
+        for order in range(1, 30):
+            expected = [self.factorial_coefficient(order, k) for k in range(order + 1)]
+            np.testing.assert_allclose(KikCalculation.coefficient_table(order), expected, rtol=1e-12, atol=1e-300)
+
+    def test_co_(self):
+        kik_obj = KikCalculation(1, InitialState(1).generate_ground_state(), None)
+        for order in (1, 2, 5):
+            for k in range(order + 1):
+                self.assertAlmostEqual(kik_obj.co_(order, k), self.factorial_coefficient(order, k), places=14)
+
+
+class TestErrorParity(unittest.TestCase):
+    """A1-A4 agree between the fused, unfused, sparse, batched and single precision evaluations."""
+    N = 3
+    POINTS = ([0.02, 0.05], [0.01, 0.03], [1e-3, 2e-3])
+
+    def errors(self, point, **kwargs):
+        circuit = QuantumFourierTransform(self.N, **kwargs)
+        circuit.controllable_coh_err_cx, circuit.uncontrollable_coh_err_cx, circuit.two_qubit_error = point
+        kik_obj = KikCalculation(self.N, InitialState(self.N).generate_excited_state(), circuit)
+        return np.real(np.ravel(kik_obj.calculate_values_of_all_errors([], [], [], [])))
+
+    def points(self):
+        return list(zip(*self.POINTS))
+
+    def test_unfused_and_sparse(self):
+        for point in self.points():
+            expected = self.errors(point)
+            np.testing.assert_allclose(self.errors(point, is_fused=False), expected, rtol=1e-10, atol=1e-15)
+            np.testing.assert_allclose(self.errors(point, is_sparse=True), expected, rtol=1e-10, atol=1e-15)
+
+    def test_batch(self):
+        kik_obj = KikCalculation(self.N, InitialState(self.N).generate_excited_state(),
+                                 QuantumFourierTransform(self.N))
+        values = np.real(np.stack(kik_obj.calculate_values_of_all_errors_batch(*self.POINTS), axis=-1))
+        for value, point in zip(values, self.points()):
+            np.testing.assert_allclose(value, self.errors(point), rtol=1e-10, atol=1e-15)
+
+    def test_single_precision(self):
+        for point in self.points():
+            np.testing.assert_allclose(self.errors(point, dtype=np.complex64), self.errors(point), rtol=1e-3,
+                                       atol=1e-6)
+
+
+class TestComplexInitialState(unittest.TestCase):
+    """A complex rho_0 keeps its imaginary part in every precision and backend."""
+    # |+i><+i| (x) |0><0|, with the values of the double precision run before the precision mode was added
+    PLUS_I = np.array([[1, -1j], [1j, 1]]) / 2
+    NATIVE_ERROR = -9.972489596963e-4
+    PAULI_ERROR = -9.988603852894e-4
+
+    def errors(self, **kwargs):
+        rho_0 = np.kron(self.PLUS_I, np.diag([1, 0])).flatten()
+        kik_obj = KikCalculation(2, rho_0, QuantumFourierTransform(2, **kwargs))
+        return kik_obj.native_error(), kik_obj.pauli_error()
+
+    def test_double(self):
+        native, pauli = self.errors()
+        self.assertAlmostEqual(np.real(native), self.NATIVE_ERROR, places=12)
+        self.assertAlmostEqual(np.real(pauli), self.PAULI_ERROR, places=12)
+
+    def test_sparse(self):
+        native, pauli = self.errors(is_sparse=True)
+        self.assertAlmostEqual(np.real(native), self.NATIVE_ERROR, places=12)
+        self.assertAlmostEqual(np.real(pauli), self.PAULI_ERROR, places=12)
+
+    def test_single(self):
+        native, pauli = self.errors(dtype=np.complex64)
+        self.assertAlmostEqual(np.real(native), self.NATIVE_ERROR, delta=1e-7)
+        self.assertAlmostEqual(np.real(pauli), self.PAULI_ERROR, delta=1e-7)
+
+
+if __name__ == '__main__':
+    unittest.main()
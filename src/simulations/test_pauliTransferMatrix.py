@@ -0,0 +1,59 @@
+import itertools
+import unittest
+import numpy as np
+from utilities import Utilities
+from pauliTransferMatrix import PauliTransferMatrix
+
+
+class TestPauliTransferMatrix(unittest.TestCase):
+    """The PTM basis change and the twirls built on it agree with the Pauli sums they replace."""
+
+    @staticmethod
+    def random_superoperator(n, seed=0):
+        rng = np.random.default_rng(seed)
+        return rng.normal(size=(4 ** n, 4 ** n)) + 1j * rng.normal(size=(4 ** n, 4 ** n))
+
+    @staticmethod
+    def pauli_sum_twirl(oper, n):
+        """The twirl of run_pauli_combinations of the baseline, summing oper dressed by all 4^n Pauli strings."""
+        twirled = 0
+        for indices in itertools.product(range(4), repeat=n):
+            sigma = Utilities.make_liouville(Utilities.recursive_kron([Utilities.pauli[i] for i in indices]))
+            twirled = twirled + sigma @ oper @ sigma
+        return twirled / 4 ** n
+
+    def test_round_trip(self):
+        for n in (1, 2, 3):
+            oper = self.random_superoperator(n)
+            ptm = PauliTransferMatrix.liouville_to_ptm(oper, n)
+            np.testing.assert_allclose(PauliTransferMatrix.ptm_to_liouville(ptm, n), oper, atol=1e-12)
+
+    def test_twirl_matches_pauli_sum(self):
+        for n in (1, 2, 3):
+            oper = self.random_superoperator(n, seed=n)
+            np.testing.assert_allclose(PauliTransferMatrix.twirl(oper, n), self.pauli_sum_twirl(oper, n), atol=1e-12)
+
+    def test_twirl_diagonal_of_square(self):
+        n = 2
+        oper = self.random_superoperator(n)
+        np.testing.assert_allclose(PauliTransferMatrix.twirl_diagonal(oper, n, power=2),
+                                   PauliTransferMatrix.twirl_diagonal(oper @ oper, n), atol=1e-10)
+        # For a Pauli channel the PTM is diagonal, so the twirl of the square is the square of its diagonal
+        pauli_channel = PauliTransferMatrix.twirl(oper, n)
+        diagonal = PauliTransferMatrix.twirl_diagonal(pauli_channel, n)
+        np.testing.assert_allclose(PauliTransferMatrix.twirl_diagonal(pauli_channel, n, power=2), diagonal ** 2,
+                                   atol=1e-10)
+
+    def test_twirl_power_diagonals(self):
+        n = 2
+        oper = self.random_superoperator(n) / 8
+        indices = np.array([0, 5, 15])
+        diagonals = PauliTransferMatrix.twirl_power_diagonals(oper, n, 3, indices)
+        power = np.eye(4 ** n)
+        for diagonal in diagonals:
+            power = power @ oper
+            np.testing.assert_allclose(diagonal, PauliTransferMatrix.twirl_diagonal(power, n)[indices], atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
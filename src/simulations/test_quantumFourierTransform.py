@@ -0,0 +1,48 @@
+import unittest
+from unittest import mock
+import numpy as np
+from kikCalculation import KikCalculation
+from initialState import InitialState
+from quantumFourierTransform import QuantumFourierTransform
+
+
+class TestInvalidate(unittest.TestCase):
+    """Changing an error through the setters drops the stale intermediates of the compiled plans."""
+    N = 3
+
+    def pauli_and_total_coh_error(self, circuit):
+        kik_obj = KikCalculation(self.N, InitialState(self.N).generate_excited_state(), circuit)
+        return np.real(kik_obj.pauli_and_total_coh_error())
+
+    def fresh(self, attribute, value, **kwargs):
+        circuit = QuantumFourierTransform(self.N, **kwargs)
+        setattr(circuit, attribute, value)
+        return self.pauli_and_total_coh_error(circuit)
+
+    def test_setters_rebuild(self):
+        for attribute, parameter, value in [('controllable_coh_err_cx', 'cont', 0.05),
+                                            ('uncontrollable_coh_err_cx', 'uncont', 0.03),
+                                            ('two_qubit_error', 'p', 2e-3)]:
+            circuit = QuantumFourierTransform(self.N)
+            before = self.pauli_and_total_coh_error(circuit)
+            self.assertTrue(circuit.plans)
+            with mock.patch.object(circuit, 'invalidate', wraps=circuit.invalidate) as invalidate:
+                setattr(circuit, attribute, value)
+            invalidate.assert_called_once_with(parameter)
+            after = self.pauli_and_total_coh_error(circuit)
+            self.assertNotAlmostEqual(after, before, places=8)
+            self.assertAlmostEqual(after, self.fresh(attribute, value), places=14)
+
+    def test_plan_intermediates_are_dropped(self):
+        circuit = QuantumFourierTransform(self.N)
+        self.pauli_and_total_coh_error(circuit)
+        plan = next(iter(circuit.plans.values()))
+        self.assertTrue(any('cont' in entry[0] for entry in plan.intermediates.entries.values()))
+        circuit.controllable_coh_err_cx = 0.05
+        dependencies = [entry[0] for entry in plan.intermediates.entries.values()]
+        self.assertTrue(dependencies)
+        self.assertFalse(any('cont' in names for names in dependencies))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from superoperatorStore import SuperoperatorStore
+
+
+class TestSuperoperatorStore(unittest.TestCase):
+    """Round trip and least-recently-used eviction of the on-disk store."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def superoperator(seed, size=16):
+        rng = np.random.default_rng(seed)
+        return rng.normal(size=(size, size)) + 1j * rng.normal(size=(size, size))
+
+    def test_round_trip(self):
+        store = SuperoperatorStore(self.directory)
+        expected = self.superoperator(0)
+        built = store.get_or_build(('qft', 2, False), lambda: expected)
+        stored = store.get_or_build(('qft', 2, False), lambda: self.fail("Built on a hit"))
+        np.testing.assert_array_equal(built, expected)
+        np.testing.assert_array_equal(stored, expected)
+        self.assertEqual(stored.dtype, expected.dtype)
+        self.assertFalse(stored.flags.writeable)
+        self.assertEqual((store.hits, store.misses), (1, 1))
+
+    def test_shared_between_stores(self):
+        expected = self.superoperator(1)
+        SuperoperatorStore(self.directory).get_or_build('key', lambda: expected)
+        store = SuperoperatorStore(self.directory)
+        np.testing.assert_array_equal(store.get_or_build('key', lambda: self.fail("Built on a hit")), expected)
+        self.assertEqual(store.stats()['entries'], 1)
+
+    def test_eviction(self):
+        value_bytes = self.superoperator(0).nbytes
+        store = SuperoperatorStore(self.directory, max_bytes=int(2.5 * value_bytes))
+        for key in range(2):
+            store.get_or_build(key, lambda: self.superoperator(key))
+        # Make entry 0 the most recently used, so entry 1 is evicted by the third one
+        os.utime(store.path_of(1), (0, 0))
+        store.get_or_build(0, lambda: self.fail("Built on a hit"))
+        store.get_or_build(2, lambda: self.superoperator(2))
+
+        self.assertEqual(store.evictions, 1)
+        self.assertFalse(os.path.exists(store.path_of(1)))
+        self.assertTrue(os.path.exists(store.path_of(0)) and os.path.exists(store.path_of(2)))
+        self.assertLessEqual(store.stats()['bytes'], store.max_bytes)
+
+    def test_version_bump_misses(self):
+        SuperoperatorStore(self.directory).get_or_build('key', lambda: self.superoperator(0))
+        store = SuperoperatorStore(self.directory)
+        store.FORMAT_VERSION = SuperoperatorStore.FORMAT_VERSION + 1
+        expected = self.superoperator(1)
+        np.testing.assert_array_equal(store.get_or_build('key', lambda: expected), expected)
+        self.assertEqual((store.hits, store.misses), (0, 1))
+
+    def test_too_large_is_not_stored(self):
+        store = SuperoperatorStore(self.directory, max_bytes=100)
+        expected = self.superoperator(0)
+        np.testing.assert_array_equal(store.get_or_build('key', lambda: expected), expected)
+        self.assertEqual(store.stats()['entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+from kikCalculation import KikCalculation
+from initialState import InitialState
+from quantumFourierTransform import QuantumFourierTransform
+from sweepRunner import SweepRunner
+
+
+class TestSweepRunner(unittest.TestCase):
+    """Results come back in grid order, the same for one and several workers."""
+
+    def setUp(self):
+        self.points = SweepRunner.make_grid([2], [0.01, 0.05], [0.02], [1e-3, 4e-3], states=('excited',))
+
+    def expected(self):
+        values = []
+        for n, cont, uncont, p, state in self.points:
+            circuit = QuantumFourierTransform(n)
+            circuit.controllable_coh_err_cx, circuit.uncontrollable_coh_err_cx = cont, uncont
+            circuit.two_qubit_error = p
+            kik_obj = KikCalculation(n, SweepRunner.initial_state(n, state), circuit)
+            values.append(np.real(np.ravel(kik_obj.calculate_values_of_all_errors([], [], [], []))))
+        return np.array(values)
+
+    def test_grid_order(self):
+        self.assertEqual(len(self.points), 4)
+        self.assertEqual([point[3] for point in self.points], [1e-3, 4e-3, 1e-3, 4e-3])
+        values = SweepRunner(max_workers=1, chunk_size=1).run(self.points)
+        np.testing.assert_allclose(values, self.expected(), rtol=1e-10, atol=1e-15)
+
+    def test_workers(self):
+        serial = SweepRunner(max_workers=1, chunk_size=1).run(self.points)
+        parallel = SweepRunner(max_workers=2, chunk_size=1).run(self.points)
+        np.testing.assert_array_equal(parallel, serial)
+
+    def test_basis_states(self):
+        points = SweepRunner.make_grid([2], [0.01], [0.02], [1e-3], states=('basis',))
+        self.assertEqual([point[4] for point in points], ['00', '01', '10', '11'])
+        values = SweepRunner(max_workers=1).run(points)
+        reference = SweepRunner(max_workers=1).run(SweepRunner.make_grid([2], [0.01], [0.02], [1e-3],
+                                                                          states=('ground', 'excited')))
+        np.testing.assert_allclose(values[[0, 3]], reference, rtol=1e-12, atol=1e-15)
+
+    def test_unknown_state(self):
+        with self.assertRaises(ValueError):
+            SweepRunner(max_workers=1).run(SweepRunner.make_grid([2], [0.01], [0.02], [1e-3], states=('101',)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from initialState import InitialState
+from kikCalculation import KikCalculation
+from sweepRunner import SweepRunner
+from precisionCheck import PrecisionCheck
+from densityMatrixFourierTransform import DensityMatrixFourierTransform
+from densityMatrixKikCalculation import DensityMatrixKikCalculation
+from trajectoryFourierTransform import TrajectoryFourierTransform
+from trajectoryKikCalculation import TrajectoryKikCalculation
+
+
+class TestTrajectoryKikCalculation(unittest.TestCase):
+    """The trajectory estimates agree with the exact density-matrix values within their confidence intervals."""
+    N = 2
+    P = 0.05
+
+    def estimate(self, mode, dtype=np.complex128):
+        circuit = TrajectoryFourierTransform(self.N, dtype=dtype)
+        circuit.two_qubit_error = self.P
+        psi_0 = np.zeros(2 ** self.N)
+        psi_0[-1] = 1
+        kik_obj = TrajectoryKikCalculation(self.N, psi_0, circuit, n_trajectories=2000, batch_size=500,
+                                           confidence=0.99, seed=1)
+        return kik_obj.incoherent_infidelity_with_interval(mode, 2)
+
+    def exact(self):
+        circuit = DensityMatrixFourierTransform(self.N)
+        circuit.two_qubit_error = self.P
+        return DensityMatrixKikCalculation(self.N, InitialState(self.N).generate_excited_state(), circuit)
+
+    def test_rc_interval_contains_exact(self):
+        mean, half_width = self.estimate('rc')
+        self.assertLess(abs(mean - np.real(self.exact().pauli_and_total_coh_error())), half_width)
+
+    def test_native_interval_contains_exact(self):
+        mean, half_width = self.estimate('native')
+        self.assertLess(abs(mean - np.real(self.exact().native_error())), half_width)
+
+    def test_single_precision(self):
+        mean, half_width = self.estimate('rc', np.complex64)
+        self.assertLess(abs(mean - np.real(self.exact().pauli_and_total_coh_error())), half_width)
+
+
+class TestCircuitKeywords(unittest.TestCase):
+    """TrajectoryFourierTransform takes the keywords of the other circuits, so they can be swapped for it."""
+
+    def test_dtype(self):
+        circuit = TrajectoryFourierTransform(2, dtype=np.complex64)
+        self.assertEqual(circuit.dtype, np.complex64)
+        kik_obj = KikCalculation(2, InitialState(2).generate_excited_state(), circuit)
+        self.assertEqual(kik_obj.obj_quantum_cir.forward_circuit().dtype, np.complex64)
+
+    def test_sweep_runner_and_precision_check(self):
+        points = SweepRunner.make_grid([2], [0.02], [0.01], [1e-3])
+        np.testing.assert_allclose(SweepRunner(TrajectoryFourierTransform, max_workers=1).run(points),
+                                   SweepRunner(max_workers=1).run(points), rtol=1e-10, atol=1e-15)
+        rows = PrecisionCheck(circuit_class=TrajectoryFourierTransform).run([2], 0.02, 0.01, 1e-3)
+        self.assertTrue(rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
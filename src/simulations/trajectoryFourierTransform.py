@@ -0,0 +1,101 @@
+import numpy as np
+from densityMatrixFourierTransform import DensityMatrixFourierTransform
+from stateVectorEngine import StateVectorEngine
+from utilities import Utilities
+from cXGate import CXGate
+from zGate import ZGate
+
+
+class TrajectoryFourierTransform(DensityMatrixFourierTransform):
+    """
+    Quantum-trajectory (Monte Carlo wavefunction) engine for the Quantum Fourier Transform (QFT) and its inverse.
+
+    Runs the gate sequence of DensityMatrixFourierTransform on a batch of 2^n state vectors. The ADC is applied as a
+    stochastic Kraus jump and every RC-dressed CNOT draws its own Pauli frame per trajectory, so the density matrix
+    and the RC average are only recovered as the average over trajectories. Memory grows as 2^n per trajectory.
+
+    The state vectors are evolved in the precision dtype. The superoperator methods inherited from
+    QuantumFourierTransform still work, so KikCalculation, SweepRunner and PrecisionCheck evaluate the circuit
+    exactly; TrajectoryKikCalculation samples its trajectories.
+
+    Attributes:
+        rng (np.random.Generator): Random number generator for the jumps and the RC frames.
+    """
+    RC_FRAMES = None
+
+    def __init__(self, n_qubits, seed=None, is_sparse=False, dtype=np.complex128):
+        """
+        Initializes the engine.
+
+        Args:
+            n_qubits (int): The number of qubits in the quantum system.
+            seed (int): Seed of the random number generator.
+            is_sparse (bool): Whether the inherited superoperator methods build scipy.sparse matrices.
+            dtype (type): Precision of the state vectors and superoperators, np.complex128 or np.complex64.
+        """
+        super().__init__(n_qubits, is_sparse=is_sparse, dtype=dtype)
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def rc_frames(cls):
+        """
+        Return the left and right RC gates of the CNOT on its control and target qubits, as two stacks of shape
+        (NUM_RC_CX, 4, 4), built on first use.
+        """
+        if cls.RC_FRAMES is None:
+            cls.RC_FRAMES = tuple(np.array([np.kron(rc[CXGate.LEFT_RC], rc[CXGate.RIGHT_RC]) for rc in frames])
+                                  for frames in (Utilities.lr, Utilities.rr))
+        return cls.RC_FRAMES
+
+    def apply_cx(self, psi, c, t, is_inverse, is_add_rc):
+        """
+        Apply the CNOT gate with coherent error and ADC, optionally dressed by RC gates, to a batch of states.
+        With RC every trajectory draws one of the NUM_RC_CX frames.
+
+        Args:
+            psi (np.array): The batch of states as a tensor of shape (T,) + (2,) * n.
+            c (int): The control qubit.
+            t (int): The target qubit.
+            is_inverse (bool): Indicates if the gate belongs to the inverse circuit.
+            is_add_rc (bool): Indicates if the gate is dressed by Randomized Compiling gates.
+
+        Returns:
+            np.array: The transformed batch of states.
+        """
+        before, after = self.noisy_cx_unitaries(c, t, is_inverse)
+        if is_add_rc:
+            ul, ur = self.rc_frames()
+            frames = self.rng.integers(CXGate.NUM_RC_CX, size=psi.shape[0])
+            before, after = np.matmul(before, ur[frames]), np.matmul(ul[frames], after)
+        return self.apply_noisy_cx(psi, before, after, c, t)
+
+    def apply_noisy_cx(self, psi, before, after, c, t):
+        """
+        Apply the unitary before the ADC, a sampled ADC jump on both qubits and the unitary after it.
+        """
+        kraus = CXGate.adc_kraus(self.avg_two_qubit_error)
+        psi = StateVectorEngine.apply_operator(psi, before, [c, t], self.n_qubits)
+        psi = StateVectorEngine.apply_kraus_jump(psi, kraus, [t], self.n_qubits, self.rng)
+        psi = StateVectorEngine.apply_kraus_jump(psi, kraus, [c], self.n_qubits, self.rng)
+        return StateVectorEngine.apply_operator(psi, after, [c, t], self.n_qubits)
+
+    def apply_z(self, psi, rn, sign_rot, target):
+        """
+        Apply a Z-rotation to the target qubit of a batch of states.
+        """
+        return StateVectorEngine.apply_operator(psi, ZGate(1, rn, sign_rot, 0).get_matrix(), [target], self.n_qubits)
+
+    def apply_h(self, psi, target):
+        """
+        Apply a Hadamard gate to the target qubit of a batch of states.
+        """
+        return StateVectorEngine.apply_operator(psi, Utilities.H, [target], self.n_qubits)
+
+    def apply_twirled_kik(self, psi):
+        """
+        Apply the KIK operator conjugated by a random Pauli string per trajectory, one sample of its Pauli twirl.
+        """
+        digits = StateVectorEngine.sample_pauli_strings(psi.shape[0], self.n_qubits, self.rng)
+        psi = StateVectorEngine.apply_pauli_strings(psi, digits, self.n_qubits)
+        psi = self.apply_kik(psi, False)
+        return StateVectorEngine.apply_pauli_strings(psi, digits, self.n_qubits)
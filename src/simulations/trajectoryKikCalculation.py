@@ -0,0 +1,153 @@
+import itertools
+import multiprocessing
+import numpy as np
+from scipy.stats import norm
+from concurrent.futures import ProcessPoolExecutor
+from kikCalculation import KikCalculation
+from stateVectorEngine import StateVectorEngine
+
+
+def simulate_trajectories(obj_quantum_cir, psi_0, mode, order, n_trajectories, seed):
+    """
+    Run a batch of trajectories and record their survival probabilities after 0..order KIK applications.
+    Defined at module level so it can be sent to the worker processes.
+
+    Args:
+        obj_quantum_cir (TrajectoryFourierTransform): The trajectory engine of the circuit.
+        psi_0 (np.array): The initial state vector of length 2^n.
+        mode (str): One of TrajectoryKikCalculation.MODES.
+        order (int): Order of the expansion.
+        n_trajectories (int): Number of trajectories in the batch.
+        seed (np.random.SeedSequence): Seed of the batch.
+
+    Returns:
+        np.array: Array of shape (n_trajectories, order + 1) with the survival probability of every trajectory.
+    """
+    n = obj_quantum_cir.n_qubits
+    obj_quantum_cir.rng = np.random.default_rng(seed)
+    psi = StateVectorEngine.to_tensor(psi_0, n, n_trajectories, obj_quantum_cir.dtype)
+    reference = psi
+    if mode == 'twirl_of_powers':
+        # One Pauli string per trajectory conjugates all powers of the KIK operator
+        digits = StateVectorEngine.sample_pauli_strings(n_trajectories, n, obj_quantum_cir.rng)
+        psi = reference = StateVectorEngine.apply_pauli_strings(psi, digits, n)
+
+    list_sp = [StateVectorEngine.overlap_probabilities(psi, reference)]
+    for _ in range(order):
+        if mode == 'power_of_twirl':
+            psi = obj_quantum_cir.apply_twirled_kik(psi)
+        else:
+            psi = obj_quantum_cir.apply_kik(psi, mode == 'rc')
+        list_sp.append(StateVectorEngine.overlap_probabilities(psi, reference))
+    return np.stack(list_sp, axis=-1)
+
+
+class TrajectoryKikCalculation(KikCalculation):
+    """
+    Estimates the four incoherent infidelities of KikCalculation from quantum trajectories of a
+    TrajectoryFourierTransform, for numbers of qubits where no superoperator or density matrix fits in memory.
+
+    The initial state is a pure state vector. Every trajectory records its survival probabilities after 0..order
+    applications of the KIK operator, and since the incoherent infidelity is linear in them, every trajectory also
+    gives one sample of the infidelity. Means are reported with normal confidence intervals. The Pauli twirl of the
+    KIK operator is sampled with one random Pauli string per trajectory (twirl of powers) or per application (power of
+    the twirl).
+
+    Trajectories run in batches of batch_size states; the batches are spread over max_workers processes.
+    """
+    MODES = ('rc', 'power_of_twirl', 'twirl_of_powers', 'native')
+
+    def __init__(self, n, psi_0, obj_quantum_cir, n_trajectories=1000, batch_size=16, max_workers=1,
+                 confidence=0.95, seed=None):
+        """
+        Initializes a new instance of the TrajectoryKikCalculation class.
+
+        :param n: Number of qubits.
+        :param psi_0: Initial state vector of length 2^n.
+        :param obj_quantum_cir: The TrajectoryFourierTransform of the circuit.
+        :param n_trajectories: Number of trajectories per estimate.
+        :param batch_size: Number of trajectories evolved together.
+        :param max_workers: Number of worker processes. With 1 the trajectories run in-process.
+        :param confidence: Confidence level of the reported intervals.
+        :param seed: Seed of the trajectories.
+        """
+        super().__init__(n, None, obj_quantum_cir)
+        self.psi_0 = np.asarray(psi_0, dtype=complex)
+        self.n_trajectories = n_trajectories
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.confidence = confidence
+        self.seed_sequence = np.random.SeedSequence(seed)
+
+    def trajectory_survival_probabilities(self, mode, order):
+        """
+        Run n_trajectories trajectories and return their survival probabilities.
+
+        :param mode: One of MODES.
+        :param order: Order of the expansion.
+        :return: Array of shape (n_trajectories, order + 1).
+        """
+        if mode not in self.MODES:
+            raise ValueError("Unknown trajectory mode: " + str(mode))
+        sizes = [min(self.batch_size, self.n_trajectories - i) for i in range(0, self.n_trajectories, self.batch_size)]
+        seeds = self.seed_sequence.spawn(len(sizes))
+        arguments = (itertools.repeat(self.obj_quantum_cir), itertools.repeat(self.psi_0), itertools.repeat(mode),
+                     itertools.repeat(order), sizes, seeds)
+
+        if self.max_workers == 1:
+            return np.concatenate(list(map(simulate_trajectories, *arguments)))
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(sizes)),
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            return np.concatenate(list(executor.map(simulate_trajectories, *arguments)))
+
+    def mean_with_interval(self, samples):
+        """
+        Return the mean over the trajectories and the half width of its confidence interval.
+        """
+        z = norm.ppf((1 + self.confidence) / 2)
+        return np.mean(samples, axis=0), z * np.std(samples, axis=0, ddof=1) / np.sqrt(len(samples))
+
+    def survival_probabilities_with_interval(self, mode, order):
+        """
+        Estimate the survival probabilities of order 0..order.
+
+        :param mode: One of MODES.
+        :param order: Order of the expansion.
+        :return: Means and confidence interval half widths, two arrays of length order + 1.
+        """
+        return self.mean_with_interval(self.trajectory_survival_probabilities(mode, order))
+
+    def incoherent_infidelity_with_interval(self, mode, order):
+        """
+        Estimate the incoherent infidelity of the given mode.
+
+        :param mode: One of MODES.
+        :param order: Order of the expansion.
+        :return: The mean and the confidence interval half width.
+        """
+        samples = self.trajectory_survival_probabilities(mode, order)
+        return self.mean_with_interval(self.incoherent_infidelity(order, samples.T))
+
+    def pauli_and_total_coh_error(self, order=2, context=None):
+        """
+        Estimate incoherent infidelity containing information about total coherent error and incoherent Pauli error.
+        """
+        return self.incoherent_infidelity_with_interval('rc', order)[0]
+
+    def pauli_and_unc_coh_error(self, order=2, context=None):
+        """
+        Estimate incoherent infidelity containing information about uncontrollable coherent errors and incoherent Pauli error.
+        """
+        return self.incoherent_infidelity_with_interval('power_of_twirl', order)[0]
+
+    def pauli_error(self, order=2, context=None):
+        """
+        Estimate the incoherent infidelity containing information about incoherent Pauli error only.
+        """
+        return self.incoherent_infidelity_with_interval('twirl_of_powers', order)[0]
+
+    def native_error(self, order=2, context=None):
+        """
+        Estimate the incoherent infidelity of the native noise.
+        """
+        return self.incoherent_infidelity_with_interval('native', order)[0]
@@ -1,4 +1,6 @@
 import numpy as np
+import scipy.sparse as sp
+from profiler import Profiler
 
 
 class Utilities:
@@ -12,6 +14,7 @@ class Utilities:
         lr, rr : Sets of 2-qubit operators for left and right operators.
         cnot1 : CNOT matrix with control qubit 1.
         pauli : List of Pauli matrices.
+        SPARSE_FILL_IN : Fraction of non-zero entries above which a sparse product is converted to a dense matrix.
     """
     # Constants and Globals
     X, Y, Z, I = [np.array([[0, 1], [1, 0]]),
@@ -28,7 +31,10 @@ class Utilities:
 
     pauli = [X, Y, Z, I]
 
+    SPARSE_FILL_IN = 0.1
+
     @staticmethod
+    @Profiler.profiled('linalg.make_liouville')
     def make_liouville(oper):
         """
         Compute the Liouville representation of a given operator.
@@ -39,7 +45,29 @@ class Utilities:
         Returns:
             np.array: The Liouville representation of the operator.
         """
-        return np.kron(oper, np.conj(oper))
+        return Utilities.kron(oper, oper.conj() if sp.issparse(oper) else np.conj(oper))
+
+    @staticmethod
+    def kron(matrix1, matrix2):
+        """
+        Compute the Kronecker product over the last two axes, broadcasting any leading (batch) axes.
+        If either matrix is a scipy.sparse matrix the product is a sparse CSR matrix.
+
+        Args:
+            matrix1 (np.array): First matrix or stack of matrices.
+            matrix2 (np.array): Second matrix or stack of matrices.
+
+        Returns:
+            np.array: The Kronecker product, stacked like the inputs.
+        """
+        if sp.issparse(matrix1) or sp.issparse(matrix2):
+            return sp.kron(matrix1, matrix2, format='csr')
+        matrix1, matrix2 = np.asarray(matrix1), np.asarray(matrix2)
+        if matrix1.ndim == 2 and matrix2.ndim == 2:
+            return np.kron(matrix1, matrix2)
+        product = matrix1[..., :, None, :, None] * matrix2[..., None, :, None, :]
+        return np.reshape(product, product.shape[:-4] + (product.shape[-4] * product.shape[-3],
+                                                         product.shape[-2] * product.shape[-1]))
 
     @staticmethod
     def recursive_kron(matrices):
@@ -73,11 +101,95 @@ class Utilities:
         product = matrix1 if position == 0 else Utilities.I
         for i in range(1, n):
             next_matrix = matrix2 if position == i else Utilities.I
-            product = np.kron(product, next_matrix)
+            product = Utilities.kron(product, next_matrix)
         return product
 
     @staticmethod
-    def single_q_gate_for_n_q(t, n, oper):
+    def embed_operator(oper, qubits, n):
+        """
+        Return the n-qubit matrix of an operator acting on the given qubits, with identity on the others.
+
+        Args:
+            oper (np.array): The 2^k x 2^k operator with qubits[0] as its most significant qubit, or a stack of them.
+            qubits (list): The k qubits the operator acts on.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The 2^n x 2^n operator, stacked like oper.
+        """
+        oper = np.asarray(oper)
+        k = len(qubits)
+        batch = oper.shape[:-2]
+        local = np.reshape(oper, batch + (2,) * (2 * k))
+        identity = np.reshape(np.eye(2 ** n), (2,) * (2 * n))
+        # Acting on the rows of the identity leaves the output axes of oper in front of the untouched ones
+        full = np.tensordot(local, identity, axes=(list(range(len(batch) + k, len(batch) + 2 * k)), list(qubits)))
+        full = np.moveaxis(full, list(range(len(batch), len(batch) + k)), [len(batch) + q for q in qubits])
+        return np.reshape(full, batch + (2 ** n, 2 ** n))
+
+    @staticmethod
+    @Profiler.profiled('linalg.apply_local')
+    def apply_local_superoperator(oper, matrix, qubits, n):
+        """
+        Compute S @ matrix for a superoperator S acting on the given qubits only, without building S on n qubits.
+        The cost is 4^k times the size of matrix instead of a full 4^n x 4^n product.
+
+        Args:
+            oper (np.array): The 4^k x 4^k Liouville matrix with qubits[0] as its most significant qubit, or a stack
+                of them.
+            matrix (np.array): The 4^n x m matrix, or a stack of them.
+            qubits (list): The k qubits the superoperator acts on.
+            n (int): Total number of qubits.
+
+        Returns:
+            np.array: The product, stacked like oper and matrix.
+        """
+        # vec(rho) is row-major, so qubit q appears as bit q of the row index and bit n + q of the column index
+        axes = list(qubits) + [n + q for q in qubits]
+        k = len(axes)
+        lead = matrix.ndim - 2
+        tensor = np.reshape(matrix, matrix.shape[:-2] + (2,) * (2 * n) + matrix.shape[-1:])
+        tensor = np.moveaxis(tensor, [lead + a for a in axes], list(range(lead, lead + k)))
+        local_shape = tensor.shape[lead:]
+        flat = np.reshape(tensor, matrix.shape[:-2] + (2 ** k, -1))
+        if Profiler.enabled:
+            Profiler.add_flops(Profiler.matmul_flops(oper, flat))
+        flat = np.matmul(oper, flat)
+        lead = flat.ndim - 2
+        tensor = np.reshape(flat, flat.shape[:-2] + local_shape)
+        tensor = np.moveaxis(tensor, list(range(lead, lead + k)), [lead + a for a in axes])
+        return np.reshape(tensor, flat.shape[:-2] + matrix.shape[-2:])
+
+    @staticmethod
+    def controlled_not(control, target, n, as_permutation=False, is_sparse=False):
+        """
+        Return the CNOT gate for an n-qubit system, built directly from bit manipulation.
+
+        Args:
+            control (int): Control qubit.
+            target (int): Target qubit.
+            n (int): Total number of qubits.
+            as_permutation (bool): If True return the index permutation instead of the matrix.
+            is_sparse (bool): If True return the matrix as a sparse CSR matrix.
+
+        Returns:
+            np.array: The 2^n x 2^n CNOT matrix, or the permutation perm such that the gate maps basis state i to
+            basis state perm[i].
+        """
+        # Qubit 0 is the most significant bit, as in single_q_gate_for_n_q
+        index = np.arange(2 ** n)
+        perm = index ^ (((index >> (n - 1 - control)) & 1) << (n - 1 - target))
+        if as_permutation:
+            return perm
+        if is_sparse:
+            return sp.csr_matrix((np.ones(2 ** n), (perm, index)), shape=(2 ** n, 2 ** n))
+
+        matrix = np.zeros((2 ** n, 2 ** n))
+        matrix[perm, index] = 1
+        return matrix
+
+    @staticmethod
+    def single_q_gate_for_n_q(t, n, oper, is_sparse=False):
         """
         Return a single qubit gate for an n-qubit system.
 
@@ -85,34 +197,72 @@ class Utilities:
             t (int): Target qubit.
             n (int): Total number of qubits.
             oper (np.array): The single qubit gate.
+            is_sparse (bool): If True return the gate as a sparse CSR matrix.
 
         Returns:
             np.array: The single qubit gate for the n-qubit system.
         """
         # Create a list of identity matrices
-        matrices = [Utilities.I] * n
+        matrices = [sp.csr_matrix(Utilities.I) if is_sparse else Utilities.I] * n
 
         # Replace the t-th matrix with the operator
-        matrices[t] = oper
+        matrices[t] = sp.csr_matrix(oper) if is_sparse else oper
 
         # Compute the Kronecker product
         result = matrices[0]
         for mat in matrices[1:]:
-            result = np.kron(result, mat)
+            result = Utilities.kron(result, mat)
 
         return result
 
-    def single_q_gate_for_n_q_in_ls(t, n, oper):
-                """
+    @staticmethod
+    def single_q_gate_for_n_q_in_ls(t, n, oper, is_sparse=False):
+        """
         Return a single qubit gate for an n-qubit system in Liouville space.
 
         Args:
             t (int): Target qubit.
             n (int): Total number of qubits.
             oper (np.array): The single qubit gate.
+            is_sparse (bool): If True return the gate as a sparse CSR matrix.
 
         Returns:
             np.array: The single qubit gate for the n-qubit system in Liouville space.
         """
-        return Utilities.make_liouville(Utilities.single_q_gate_for_n_q(t, n, oper))
+        return Utilities.make_liouville(Utilities.single_q_gate_for_n_q(t, n, oper, is_sparse))
+
+    @staticmethod
+    @Profiler.profiled('linalg.compose')
+    def compose(matrix1, matrix2):
+        """
+        Compute the product of two dense, stacked or sparse matrices.
+        A sparse product is converted to a dense matrix once its fill-in passes SPARSE_FILL_IN, where dense
+        products become cheaper.
+
+        Args:
+            matrix1 (np.array): Left matrix.
+            matrix2 (np.array): Right matrix.
+
+        Returns:
+            np.array: The product matrix1 @ matrix2.
+        """
+        if Profiler.enabled:
+            Profiler.add_flops(Profiler.matmul_flops(matrix1, matrix2))
+        product = matrix1 @ matrix2
+        if sp.issparse(product) and product.nnz > Utilities.SPARSE_FILL_IN * product.shape[0] * product.shape[1]:
+            return product.toarray()
+        return product
+
+    @staticmethod
+    def to_dense(matrix):
+        """
+        Return a dense array for a dense or sparse matrix.
+
+        Args:
+            matrix (np.array): Dense or sparse matrix.
+
+        Returns:
+            np.array: The dense matrix.
+        """
+        return matrix.toarray() if sp.issparse(matrix) else matrix
 
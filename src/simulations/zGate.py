@@ -4,8 +4,8 @@ from utilities import Utilities
 
 
 class ZGate(QuantumGate):
-    def __init__(self, n_qubits, theta, sign_rot, target):
-        super().__init__(n_qubits)
+    def __init__(self, n_qubits, theta, sign_rot, target, is_sparse=False):
+        super().__init__(n_qubits, is_sparse)
         self.theta = theta
         self.sign_rot = sign_rot
         self.target = target
@@ -13,5 +13,5 @@ class ZGate(QuantumGate):
     def get_matrix(self):
         """Return Z-rotation matrix for given angle theta."""
         zr = [[np.exp(-1j * self.sign_rot * (self.theta / 2)), 0], [0, np.exp(1j * self.sign_rot * (self.theta / 2))]]
-        return Utilities.single_q_gate_for_n_q(self.target, self.n, zr)
+        return Utilities.single_q_gate_for_n_q(self.target, self.n, zr, self.is_sparse)
 